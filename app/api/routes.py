@@ -2,9 +2,15 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
 from app import summarizer
+from app.catch_up import CatchUp
 from app.chat_state import state
 from app.date_experiment import experiments, get_or_create
+from app.dialog_index import DialogIndex
+from app.services.ai_client import AIClient
+from app.services.send_queue import SendQueue
 from app.services.telegram_service import TelegramService
+from app.transcript import compaction_report
+from app.triggers.queue import trigger_queue
 
 router = APIRouter()
 
@@ -33,11 +39,12 @@ async def whoami():
 
 @router.get("/chats")
 async def list_dialogs():
-    tg = TelegramService.get()
-    dialogs = await tg.client.get_dialogs(limit=50)
+    index = DialogIndex.get()
+    if not index.reconciled_at:
+        await index.reconcile(TelegramService.get().client)
     return [
-        {"id": d.id, "name": d.name, "unread": d.unread_count}
-        for d in dialogs
+        {"id": d["id"], "name": d["name"], "unread": d["unread"]}
+        for d in index.recent(50)
     ]
 
 
@@ -77,6 +84,36 @@ async def summarize_chat(body: SummarizeRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/ai/cache")
+async def ai_cache_stats():
+    return AIClient.get().cache_stats()
+
+
+@router.get("/ai/usage")
+async def ai_usage_stats():
+    return AIClient.get().usage_stats()
+
+
+@router.get("/transcripts/compaction")
+async def transcript_compaction_stats():
+    return compaction_report.snapshot()
+
+
+@router.get("/triggers/queues")
+async def trigger_queue_stats():
+    return trigger_queue.stats()
+
+
+@router.get("/catch-up")
+async def catch_up_status():
+    return CatchUp.get().stats()
+
+
+@router.get("/telegram/send-queue")
+async def send_queue_stats():
+    return SendQueue.get().stats()
+
+
 @router.post("/daily-report")
 async def trigger_daily_report():
     """Manually trigger the daily summary report (same as the cron job)."""
@@ -0,0 +1,108 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from app.utils import parse_bitrix_dt
+
+logger = logging.getLogger("smartsummary")
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_busy_intervals(slots: list[dict]) -> list[tuple[datetime, datetime]]:
+    """Busy intervals from `calendar.accessibility.get` slots, shifted by the user offsets."""
+    intervals = []
+    for slot in slots:
+        if slot.get("ACCESSIBILITY", "busy") == "free":
+            continue
+        try:
+            dt_from = parse_bitrix_dt(slot["DATE_FROM"])
+            dt_to = parse_bitrix_dt(slot["DATE_TO"])
+            dt_from -= timedelta(seconds=int(slot.get("~USER_OFFSET_FROM", 0)))
+            dt_to -= timedelta(seconds=int(slot.get("~USER_OFFSET_TO", 0)))
+        except Exception as e:
+            logger.warning("Skip slot parse error: %s | %s", e, slot)
+            continue
+        intervals.append((dt_from, dt_to))
+    return intervals
+
+
+class AvailabilityGrid:
+    """Minute-resolution availability over a horizon of days.
+
+    Each user becomes a boolean row (True = busy) over every minute from
+    midnight of the first day to the end of the last one, in the reference
+    timezone `tz` (naive datetimes are interpreted in it). Common free time
+    for N users is then a single `any` over the stacked rows.
+    """
+
+    def __init__(self, days: list[date], tz: ZoneInfo, work_start: int = 9, work_end: int = 19):
+        self.days = sorted(days)
+        self.tz = tz
+        self.work_start = work_start
+        self.work_end = work_end
+        self.origin = datetime.combine(self.days[0], time.min)
+        self.size = ((self.days[-1] - self.days[0]).days + 1) * MINUTES_PER_DAY
+
+    def _minute(self, dt: datetime) -> int:
+        return int((dt - self.origin).total_seconds() // 60)
+
+    def busy_row(self, intervals: list[tuple[datetime, datetime]]) -> np.ndarray:
+        """Boolean busy row from (start, end) intervals, via a difference array."""
+        if not intervals:
+            return np.zeros(self.size, dtype=bool)
+        bounds = np.array(
+            [(self._minute(s), self._minute(e)) for s, e in intervals], dtype=np.int64
+        ).clip(0, self.size)
+        diff = np.zeros(self.size + 1, dtype=np.int32)
+        np.add.at(diff, bounds[:, 0], 1)
+        np.add.at(diff, bounds[:, 1], -1)
+        return np.cumsum(diff[:-1]) > 0
+
+    def working_row(self, user_tz: ZoneInfo | None = None) -> np.ndarray:
+        """Boolean row of the working hours of a user living in `user_tz`."""
+        row = np.zeros(self.size, dtype=bool)
+        user_tz = user_tz or self.tz
+        for day in self.days:
+            start = datetime.combine(day, time(self.work_start), user_tz)
+            end = datetime.combine(day, time(self.work_end), user_tz)
+            start = start.astimezone(self.tz).replace(tzinfo=None)
+            end = end.astimezone(self.tz).replace(tzinfo=None)
+            row[max(0, self._minute(start)):max(0, min(self.size, self._minute(end)))] = True
+        return row
+
+    def common_free(
+        self,
+        busy: dict[int, list[tuple[datetime, datetime]]],
+        min_minutes: int = 30,
+        user_tz: dict[int, ZoneInfo] | None = None,
+        not_before: datetime | None = None,
+    ) -> dict[date, list[tuple[datetime, datetime]]]:
+        """Slots of at least `min_minutes` when every user is free and within working hours.
+
+        Time before `not_before` (naive, in `tz`) is treated as busy.
+        Returns slots grouped by the day they start on.
+        """
+        user_tz = user_tz or {}
+        user_ids = list(busy)
+
+        busy_matrix = np.stack([self.busy_row(busy[uid]) for uid in user_ids])
+        zones = {user_tz.get(uid) for uid in user_ids} or {None}
+        working = np.logical_and.reduce([self.working_row(z) for z in zones])
+        free = working & ~busy_matrix.any(axis=0)
+        if not_before is not None:
+            free[:max(0, self._minute(not_before))] = False
+
+        edges = np.diff(np.concatenate(([0], free.view(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        keep = (ends - starts) >= min_minutes
+
+        result: dict[date, list[tuple[datetime, datetime]]] = {day: [] for day in self.days}
+        for s, e in zip(starts[keep], ends[keep]):
+            slot_start = self.origin + timedelta(minutes=int(s))
+            slot_end = self.origin + timedelta(minutes=int(e))
+            result.setdefault(slot_start.date(), []).append((slot_start, slot_end))
+        return result
@@ -0,0 +1,127 @@
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta, timezone
+
+from telethon import TelegramClient
+from telethon.tl.custom import Message
+
+from app.config import settings
+from app.message_store import MessageStore
+
+logger = logging.getLogger("smartsummary")
+
+Handler = Callable[..., Awaitable]
+
+
+class CatchUp:
+    """Replays messages missed while the service was down, in the background.
+
+    Every processed message advances a per-chat "handled" mark in the
+    MessageStore. On startup the marks are snapshotted; the catch-up then
+    fetches only messages after the mark and before the first live update of
+    each chat, no older than `catch_up_max_age_minutes` and at most
+    `catch_up_max_messages` in total (the newest win); messages cut by the
+    per-chat or total limit are counted in `dropped` and logged. Chats without a mark
+    are only stored, never fed to triggers, so nothing handled before is
+    fired twice. Replayed messages advance the marks too, so an interrupted
+    catch-up resumes where it stopped.
+    """
+
+    _instance: "CatchUp | None" = None
+
+    def __init__(self):
+        self._marks = MessageStore.get().handled_marks()
+        self._first_live: dict[int, int] = {}
+        self._status = {
+            "state": "pending",
+            "dialogs": 0,
+            "replayed": 0,
+            "stored_only": 0,
+            "dropped": 0,
+            "truncated_chats": 0,
+            "seconds": None,
+        }
+
+    @classmethod
+    def get(cls) -> "CatchUp":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def note_live(self, chat_id: int, msg_id: int):
+        """Remember the first live message of a chat: catch-up stops below it."""
+        self._first_live.setdefault(chat_id, msg_id)
+
+    def stats(self) -> dict:
+        return dict(self._status)
+
+    async def run(self, client: TelegramClient, handler: Handler):
+        """Replay missed messages oldest first through `handler(message, fire_triggers=...)`.
+
+        The fetched Message is passed as is: it is bound to the client and
+        carries its sender and chat, and exposes everything the router reads
+        from a NewMessage event.
+        """
+        started = time.monotonic()
+        self._status["state"] = "running"
+        try:
+            pending = await self._collect(client)
+            for msg, fire in pending:
+                first_live = self._first_live.get(msg.chat_id)
+                if first_live is not None and msg.id >= first_live:
+                    continue  # уже пришло живым апдейтом после сбора
+                await handler(msg, fire_triggers=fire)
+                self._status["replayed" if fire else "stored_only"] += 1
+            self._status["state"] = "done"
+        except Exception as e:
+            self._status["state"] = "failed"
+            logger.error("Catch-up failed: %s", e, exc_info=True)
+        finally:
+            self._status["seconds"] = round(time.monotonic() - started, 1)
+            logger.info("Catch-up %s: %s", self._status["state"], self._status)
+
+    async def _collect(self, client: TelegramClient) -> list[tuple[Message, bool]]:
+        since = datetime.now(timezone.utc) - timedelta(minutes=settings.catch_up_max_age_minutes)
+        pending: list[tuple[Message, bool]] = []
+        async for dialog in client.iter_dialogs(limit=settings.catch_up_max_dialogs):
+            if not dialog.date or dialog.date < since:
+                if dialog.pinned:
+                    continue  # закреплённые идут первыми независимо от даты
+                break
+            self._status["dialogs"] += 1
+            mark = self._marks.get(dialog.id)
+            fetched = [
+                m async for m in client.iter_messages(
+                    dialog.entity,
+                    min_id=mark or 0,
+                    max_id=self._first_live.get(dialog.id, 0),
+                    limit=settings.catch_up_max_per_chat,
+                )
+            ]
+            msgs = [m for m in fetched if m.date >= since]
+            if len(fetched) == settings.catch_up_max_per_chat and fetched[-1].date >= since:
+                self._note_truncated(dialog, mark, fetched[-1].id)
+            pending.extend((m, mark is not None) for m in msgs)
+
+        pending.sort(key=lambda p: (p[0].date, p[0].id))
+        if len(pending) > settings.catch_up_max_messages:
+            over = len(pending) - settings.catch_up_max_messages
+            self._status["dropped"] += over
+            logger.warning("Catch-up: %d oldest messages over the total limit skipped", over)
+            pending = pending[-settings.catch_up_max_messages:]
+        return pending
+
+    def _note_truncated(self, dialog, mark: int | None, oldest_id: int):
+        """Count messages older than the newest `catch_up_max_per_chat` of a chat, which are skipped."""
+        self._status["truncated_chats"] += 1
+        # id сообщений сквозные в каналах и супергруппах; в личках и малых группах
+        # они общие на аккаунт, и разница id — лишь верхняя граница
+        skipped = oldest_id - mark - 1 if mark else None
+        if skipped and dialog.is_channel:
+            self._status["dropped"] += skipped
+        logger.warning(
+            "Catch-up: chat %s has more than %d missed messages, older ones skipped (%s)",
+            dialog.id, settings.catch_up_max_per_chat,
+            f"up to {skipped}" if skipped else "count unknown, no handled mark",
+        )
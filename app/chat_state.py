@@ -1,11 +1,11 @@
-from collections import defaultdict, deque
 from datetime import datetime
 
+from app.message_store import MessageStore
+
 
 class ChatState:
     def __init__(self):
         self.monitored: set[int] = set()
-        self.buffer: dict[int, deque] = defaultdict(lambda: deque(maxlen=500))
         self.today_active: set[int] = set()
         self.today_incoming: set[int] = set()
 
@@ -15,13 +15,16 @@ class ChatState:
     def track_incoming(self, chat_id: int):
         self.today_incoming.add(chat_id)
 
-    def buffer_message(self, chat_id: int, sender_id: int, text: str, date: datetime):
-        if chat_id in self.monitored:
-            self.buffer[chat_id].append({
-                "sender_id": sender_id,
-                "text": text,
-                "date": date.isoformat(),
-            })
+    def buffer_message(
+        self,
+        chat_id: int,
+        msg_id: int,
+        sender_id: int,
+        sender: str | None,
+        text: str,
+        date: datetime,
+    ):
+        MessageStore.get().add(chat_id, msg_id, sender_id, sender, text, date)
 
     def clear_daily(self):
         self.today_active.clear()
@@ -42,8 +45,8 @@ class ChatState:
     def get_incoming_chats(self) -> list[int]:
         return list(self.today_incoming)
 
-    def get_messages(self, chat_id: int) -> list[dict]:
-        return list(self.buffer.get(chat_id, []))
+    def get_messages(self, chat_id: int, limit: int = 500) -> list[dict]:
+        return MessageStore.get().get_recent(chat_id, limit)
 
 
 state = ChatState()
@@ -3,6 +3,7 @@ import random
 
 from app.config import settings
 from app.services.ai_client import AIClient
+from app.services.send_queue import BULK, SendQueue
 from app.services.telegram_service import TelegramService
 from app.utils import strip_numbered_item
 
@@ -36,7 +37,7 @@ async def send_compliment():
 
     try:
         ai = AIClient.get()
-        text = await ai.complete(COMPLIMENT_PROMPT, max_tokens=500, temperature=1.1)
+        text = await ai.complete(COMPLIMENT_PROMPT, max_tokens=500, temperature=1.1, cache=False)
         logger.info("<<< COMPLIMENT GPT RESPONSE:\n%s", text)
 
         variants = [line.strip() for line in text.split("\n") if line.strip()]
@@ -44,7 +45,7 @@ async def send_compliment():
         logger.info("=== Selected compliment: %s", compliment)
 
         tg = TelegramService.get()
-        await tg.client.send_message(settings.wife_chat_id, compliment)
+        await SendQueue.get().send_message(tg.client, settings.wife_chat_id, compliment, priority=BULK)
         logger.info("=== Compliment sent to wife (chat=%s)", settings.wife_chat_id)
 
     except Exception as e:
@@ -10,6 +10,20 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     openai_model: str = "gpt-5.2"
 
+    # лимиты OpenAI: запросы и токены в минуту, ретраи, адаптивная параллельность
+    openai_rpm: int = 500
+    openai_tpm: int = 200000
+    openai_max_retries: int = 5
+    openai_initial_concurrency: int = 4
+    openai_max_concurrency: int = 16
+    openai_usage_log_size: int = 100  # последние вызовы с расходом токенов — в /api/ai/usage
+
+    # кэш ответов LLM (память + data/llm_cache.db)
+    llm_cache_enabled: bool = True
+    llm_cache_ttl: int = 86400
+    llm_cache_memory_size: int = 256
+    llm_cache_disk_size: int = 5000
+
     my_user_id: int = 33570147
     wife_chat_id: int = 578839877
     summary_hour: int = 23
@@ -18,17 +32,92 @@ class Settings(BaseSettings):
     compliment_minute: int = 0
     timezone: str = "Asia/Novosibirsk"
 
+    # суммаризация: дописывать дневное саммари только новыми сообщениями
+    incremental_summaries: bool = True
+    # саммари по триггеру печатается по мере генерации (правка сообщения не чаще раза в N сек)
+    summary_streaming: bool = True
+    telegram_edit_interval: float = 1.5
+    # исходящие сообщения: общий темп (в сек), пауза между сообщениями в один личный чат / группу,
+    # FloodWait дольше telegram_max_flood_wait сек — ошибка вместо ожидания
+    telegram_send_per_second: float = 20
+    telegram_peer_interval: float = 1.0
+    telegram_group_interval: float = 3.0
+    telegram_max_flood_wait: int = 600
+    # длинные переписки режутся на куски и суммаризируются map-reduce
+    summary_chunk_tokens: int = 12000
+    summary_map_concurrency: int = 4
+    # токены считаются локально (tiktoken, если установлен): последние сообщения чата — не больше
+    # N токенов переписки в несжатом виде (после сжатия в промпте выходит меньше);
+    # ответ модели — доля от размера входа в пределах min..max токенов
+    summary_fetch_tokens: int = 24000
+    summary_output_ratio: float = 0.15
+    summary_min_output_tokens: int = 768
+    summary_max_output_tokens: int = 2048
+    # сжатие переписки для промпта: время HH:MM, серия сообщений автора (паузы до N мин) — один блок,
+    # длинные имена — инициалы, длинные ссылки — домен, без точных повторов и сообщений из одних эмодзи
+    transcript_compaction: bool = True
+    transcript_group_minutes: int = 10
+    transcript_alias_min_length: int = 12
+    transcript_url_max_length: int = 40
+
+    # триггеры выполняются вне обработчика апдейтов: очередь на чат + общий лимит воркеров
+    trigger_workers: int = 8
+    trigger_queue_depth: int = 10
+    trigger_queue_total: int = 200
+
+    # поиск свободного времени: рабочие часы, горизонт (рабочих дней), минимальный слот
+    work_day_start: int = 9
+    work_day_end: int = 19
+    free_slot_days: int = 5
+    free_slot_min_minutes: int = 30
+    free_slot_max_days: int = 60  # предел для "на N недель"
+    # дальний поиск: календари запрашиваются кусками (пользователи × рабочие дни), несколько кусков сразу
+    free_slot_chunk_users: int = 10
+    free_slot_chunk_days: int = 5
+    free_slot_parallel_chunks: int = 3
+
     # Bitrix24 OAuth
     bitrix_client_id: str = ""
     bitrix_client_secret: str = ""
     bitrix_domain: str = ""  # например "company.bitrix24.ru"
     bitrix_refresh_token: str = ""  # начальный refresh_token
+    bitrix_token_refresh_ahead: int = 300  # обновлять access_token за N сек до истечения
+    # вызовы REST в пределах окна (сек) склеиваются в один batch
+    bitrix_batching: bool = True
+    bitrix_batch_window: float = 0.01
+    # локальный справочник пользователей: новые и изменённые — раз в N минут, полная пересинхронизация — раз в N часов
+    bitrix_directory_refresh_minutes: int = 10
+    bitrix_directory_full_sync_hours: int = 6
+    # email-гости: параллельность скана ID, период фонового досканирования
+    # и минимальный интервал досканирования по промаху в resolve_email_user
+    bitrix_guest_scan_concurrency: int = 20
+    bitrix_guest_refresh_minutes: int = 30
+    bitrix_guest_miss_rescan_minutes: int = 5
+    # кэш занятости calendar.accessibility.get по (пользователь, день), сек
+    bitrix_accessibility_ttl: int = 120
 
     # Jira Server (Basic auth)
     jira_url: str = ""  # https://jira.dclouds.ru
     jira_username: str = ""
     jira_password: str = ""
 
+    # локальное хранилище сообщений: хранить N дней (0 — не чистить)
+    message_retention_days: int = 7
+
+    # догонялка после простоя (в фоне): не старше N минут, не больше N сообщений всего / на чат
+    catch_up_enabled: bool = True
+    catch_up_max_age_minutes: int = 60
+    catch_up_max_messages: int = 500
+    catch_up_max_per_chat: int = 100
+    catch_up_max_dialogs: int = 200
+
+    # полная сверка индекса диалогов с get_dialogs, раз в N часов
+    dialog_reconcile_hours: int = 6
+
+    # дневной отчёт: сколько чатов одновременно читать из Telegram и отдавать в AI
+    report_fetch_concurrency: int = 5
+    report_ai_concurrency: int = 3
+
     # группы для дневного отчёта (справочники)
     report_group_ids: list[int] = [-1001408128567]  # Digital Clouds
 
@@ -10,6 +10,7 @@ from telethon import TelegramClient, events
 
 from app.config import settings
 from app.services.ai_client import AIClient
+from app.services.send_queue import SendQueue
 
 logger = logging.getLogger("smartsummary")
 
@@ -51,7 +52,7 @@ class DateExperiment:
         messages = [{"role": "system", "content": self.system_prompt}] + self.conversation
 
         ai = AIClient.get()
-        reply = await ai.chat(messages, max_tokens=200, temperature=0.9)
+        reply = await ai.chat(messages, max_tokens=200, temperature=0.9, cache=False)
         self.conversation.append({"role": "assistant", "content": reply})
         logger.info("<<< EXPERIMENT [%s] GPT reply: %s", self.name, reply)
         return reply
@@ -69,7 +70,7 @@ class DateExperiment:
         first_msg = await self._generate_reply()
         self.conversation = [{"role": "assistant", "content": first_msg}]
 
-        await client.send_message(self.chat_id, first_msg)
+        await SendQueue.get().send_message(client, self.chat_id, first_msg)
         logger.info(">>> EXPERIMENT [%s] started, first message: %s", self.name, first_msg)
 
     async def handle_reply(self, event: events.NewMessage.Event):
@@ -85,20 +86,20 @@ class DateExperiment:
         text_lower = text.lower()
         if any(w in text_lower for w in STOP_WORDS):
             logger.info(">>> EXPERIMENT [%s]: stop word, ending", self.name)
-            await event.reply("Ок, без проблем! Хорошего дня 👋")
+            await SendQueue.get().reply(event, "Ок, без проблем! Хорошего дня 👋")
             self.stop()
             return
 
         self._reply_count += 1
         if self._reply_count >= self._max_replies:
             logger.info(">>> EXPERIMENT [%s]: max replies, ending", self.name)
-            await event.reply("Ладно, побегу работать. Хорошего дня!")
+            await SendQueue.get().reply(event, "Ладно, побегу работать. Хорошего дня!")
             self.stop()
             return
 
         reply = await self._generate_reply(text)
         await asyncio.sleep(2)
-        await event.reply(reply)
+        await SendQueue.get().reply(event, reply)
 
     async def nudge(self, client: TelegramClient):
         if not self.active:
@@ -112,7 +113,7 @@ class DateExperiment:
             m for m in self.conversation
             if m.get("content") != "(она молчит, напиши ей ещё раз — напомни о себе, коротко и с юмором)"
         ]
-        await client.send_message(self.chat_id, reply)
+        await SendQueue.get().send_message(client, self.chat_id, reply)
         logger.info(">>> EXPERIMENT [%s] nudge sent: %s", self.name, reply)
         return reply
 
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from telethon import TelegramClient
+
+logger = logging.getLogger("smartsummary")
+
+INDEX_FILE = Path(__file__).resolve().parent.parent / "data" / "dialogs.json"
+
+
+class DialogIndex:
+    """Last activity of every dialog, kept current from update events.
+
+    Answers "which chats were active since T" without a Telegram round trip.
+    A full `get_dialogs` scan (`reconcile`) runs only occasionally to pick up
+    names, unread counters and anything missed while the service was down.
+    Persisted under data/ by `flush`, which only writes when something changed.
+    """
+
+    _instance: "DialogIndex | None" = None
+
+    def __init__(self, path: Path = INDEX_FILE):
+        self._path = path
+        self._dialogs: dict[int, dict] = {}
+        self._reconciled_at = 0.0
+        self._dirty = False
+        self._lock = asyncio.Lock()
+        self._load()
+
+    @classmethod
+    def get(cls) -> "DialogIndex":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __len__(self) -> int:
+        return len(self._dialogs)
+
+    @property
+    def reconciled_at(self) -> float:
+        return self._reconciled_at
+
+    @property
+    def last_seen(self) -> float:
+        """Time of the newest activity or reconcile the index knows of.
+
+        Read before live updates start, it is roughly when the service last
+        saw Telegram, i.e. where the downtime gap begins.
+        """
+        newest = max((d["last_activity"] for d in self._dialogs.values()), default=0.0)
+        return max(self._reconciled_at, newest)
+
+    # ── Updates ───────────────────────────────────────────────────
+
+    def touch(
+        self,
+        chat_id: int,
+        date: datetime,
+        kind: str,
+        name: str | None = None,
+        incoming: bool = False,
+    ):
+        """Record a message in `chat_id`; `kind` is 'user', 'group' or 'channel'."""
+        dialog = self._dialogs.get(chat_id)
+        if dialog is None:
+            dialog = self._dialogs[chat_id] = {
+                "id": chat_id, "name": "", "kind": kind, "last_activity": 0.0, "unread": 0,
+            }
+        dialog["last_activity"] = max(dialog["last_activity"], date.timestamp())
+        if name:
+            dialog["name"] = name
+        # ответ в чате означает, что входящие прочитаны
+        dialog["unread"] = dialog["unread"] + 1 if incoming else 0
+        self._dirty = True
+
+    def mark_read(self, chat_id: int):
+        dialog = self._dialogs.get(chat_id)
+        if dialog and dialog["unread"]:
+            dialog["unread"] = 0
+            self._dirty = True
+
+    # ── Queries ───────────────────────────────────────────────────
+
+    def active_since(self, since: datetime) -> list[dict]:
+        ts = since.timestamp()
+        return [d for d in self._dialogs.values() if d["last_activity"] >= ts]
+
+    def recent(self, limit: int = 50) -> list[dict]:
+        return sorted(self._dialogs.values(), key=lambda d: d["last_activity"], reverse=True)[:limit]
+
+    # ── Reconcile ─────────────────────────────────────────────────
+
+    async def reconcile(self, client: TelegramClient):
+        """Rebuild the index from a full dialog list, keeping newer live activity."""
+        async with self._lock:
+            started = time.monotonic()
+            fresh: dict[int, dict] = {}
+            scan_start = time.time()
+            async for d in client.iter_dialogs():
+                fresh[d.id] = {
+                    "id": d.id,
+                    "name": d.name or "",
+                    "kind": "user" if d.is_user else "group" if d.is_group else "channel",
+                    "last_activity": d.date.timestamp() if d.date else 0.0,
+                    "unread": d.unread_count,
+                }
+            # события, пришедшие во время скана, могут быть новее списка диалогов
+            for chat_id, live in self._dialogs.items():
+                if chat_id in fresh:
+                    dialog = fresh[chat_id]
+                    dialog["last_activity"] = max(dialog["last_activity"], live["last_activity"])
+                elif live["last_activity"] >= scan_start:
+                    fresh[chat_id] = live
+            self._dialogs = fresh
+            self._reconciled_at = time.time()
+            self._dirty = True
+            self.flush()
+            logger.info(
+                "Dialog index reconciled: %d dialogs in %.1fs", len(fresh), time.monotonic() - started
+            )
+
+    # ── Persistence ───────────────────────────────────────────────
+
+    def _load(self):
+        if not self._path.exists():
+            return
+        try:
+            data = json.loads(self._path.read_text())
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error("Failed to load dialog index: %s", e)
+            return
+        self._dialogs = {d["id"]: d for d in data.get("dialogs", [])}
+        self._reconciled_at = data.get("reconciled_at", 0.0)
+        logger.info("Dialog index loaded: %d dialogs", len(self._dialogs))
+
+    def flush(self):
+        if not self._dirty:
+            return
+        data = {"reconciled_at": self._reconciled_at, "dialogs": list(self._dialogs.values())}
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False))
+        os.replace(tmp, self._path)
+        self._dirty = False
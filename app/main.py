@@ -1,20 +1,34 @@
 import asyncio
+import importlib
 import logging
+import signal
+import time
 from contextlib import asynccontextmanager
-from datetime import datetime
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app import metrics
 from app.api.routes import router
+from app.catch_up import CatchUp
 from app.config import settings
 from app.date_experiment import setup_experiment_handler
+from app.dialog_index import DialogIndex
+from app.message_store import MessageStore
+from app.readiness import readiness
+from app.services.ai_client import AIClient
 from app.services.bitrix_client import BitrixClient
 from app.services.jira_client import JiraClient
+from app.services.send_queue import BULK, SendQueue
 from app.services.telegram_service import TelegramService
-from app.triggers import register_all
+from app.tokenizer import Tokenizer
+from app.triggers import on_new_message, register_all
+from app.triggers.queue import trigger_queue
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,27 +45,50 @@ async def get_today_dialogs() -> list[int]:
     tz = ZoneInfo(settings.timezone)
     start_of_day = datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
 
-    tg = TelegramService.get()
-    dialogs = await tg.client.get_dialogs()
+    index = DialogIndex.get()
+    if not index.reconciled_at:
+        await index.reconcile(TelegramService.get().client)
+
     today_chats = []
-    for d in dialogs:
-        if not d.date or d.date.astimezone(tz) < start_of_day:
-            continue
-        if d.is_user:
-            today_chats.append(d.id)
-        elif d.id in settings.report_group_ids:
-            today_chats.append(d.id)
+    personal = 0
+    for d in index.active_since(start_of_day):
+        if d["kind"] == "user":
+            today_chats.append(d["id"])
+            personal += 1
+        elif d["id"] in settings.report_group_ids:
+            today_chats.append(d["id"])
 
     logger.info(
         "=== Found %d dialogs for report (%d personal + groups from config)",
         len(today_chats),
-        sum(1 for d in dialogs if d.is_user and d.date and d.date.astimezone(tz) >= start_of_day),
+        personal,
     )
     return today_chats
 
 
+async def catch_up_job():
+    with metrics.JOB_SECONDS.time(job="catch_up"):
+        await CatchUp.get().run(TelegramService.get().client, on_new_message)
+
+
+async def reconcile_dialogs_job():
+    with metrics.JOB_SECONDS.time(job="dialog_reconcile"):
+        await DialogIndex.get().reconcile(TelegramService.get().client)
+
+
+async def prune_messages_job():
+    with metrics.JOB_SECONDS.time(job="message_store_prune"):
+        now = datetime.now(ZoneInfo(settings.timezone))
+        MessageStore.get().prune(now - timedelta(days=settings.message_retention_days))
+
+
 async def daily_summary_job():
     """Summarizes each chat with today's messages, then sends overall analysis."""
+    with metrics.JOB_SECONDS.time(job="daily_summary"):
+        await _daily_summary()
+
+
+async def _daily_summary():
     from app.summarizer import build_daily_overview, summarize_single_chat
 
     today_chats = await get_today_dialogs()
@@ -64,29 +101,38 @@ async def daily_summary_job():
     chat_summaries = []
     parts = []
 
-    for chat_id in today_chats:
+    fetch_limit = asyncio.Semaphore(settings.report_fetch_concurrency)
+    ai_limit = asyncio.Semaphore(settings.report_ai_concurrency)
+
+    async def summarize_one(chat_id: int):
         try:
-            result = await summarize_single_chat(chat_id)
-            if result is None:
-                continue
-            name, link, summary = result
-            summary_html = tg.clean_html(summary)
-            block = f"#summary\n📋 <b>{name}</b>\n{link}\n\n{summary_html}"
-            parts.append(block)
-            chat_summaries.append((name, summary))
-            logger.info("=== Summarized chat: %s", name)
+            return await summarize_single_chat(chat_id, fetch_limit, ai_limit)
         except Exception as e:
             logger.error("=== DAILY SUMMARY ERROR for chat %s: %s", chat_id, e, exc_info=True)
+            return None
+
+    results = await asyncio.gather(*(summarize_one(chat_id) for chat_id in today_chats))
+
+    for result in results:
+        if result is None:
+            continue
+        name, link, summary = result
+        summary_html = tg.clean_html(summary)
+        block = f"#summary\n📋 <b>{name}</b>\n{link}\n\n{summary_html}"
+        parts.append(block)
+        chat_summaries.append((name, summary))
+        logger.info("=== Summarized chat: %s", name)
 
     if not chat_summaries:
-        await tg.client.send_message("me", "📋 Дневной отчёт: за сегодня нет чатов с сообщениями.")
+        await SendQueue.get().send_message(
+            tg.client, "me", "📋 Дневной отчёт: за сегодня нет чатов с сообщениями.", priority=BULK
+        )
         return
 
     full_text = "\n\n━━━━━━━━━━━━━━━\n\n".join(parts)
     await tg.send_long_message(full_text)
     logger.info("=== Daily summaries sent: %d chats", len(chat_summaries))
 
-    await asyncio.sleep(2)
     try:
         overview = await build_daily_overview(chat_summaries)
         overview_html = tg.clean_html(overview)
@@ -96,8 +142,7 @@ async def daily_summary_job():
         logger.error("=== DAILY OVERVIEW ERROR: %s", e, exc_info=True)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
+async def _start_telegram():
     tg = TelegramService.get()
     await tg.connect()
     if not await tg.is_authorized():
@@ -106,25 +151,148 @@ async def lifespan(app: FastAPI):
             "Telegram session not authorized. Run 'python auth.py' first."
         )
 
+    # индекс диалогов живёт на событиях; полный проход по get_dialogs — редко и в фоне.
+    # Если простой начался раньше окна catch-up, активные за простой чаты известны
+    # только из get_dialogs — сверяемся сразу, не дожидаясь планового прохода.
+    dialog_index = DialogIndex.get()
+    reconcile_every = settings.dialog_reconcile_hours * 3600
+    covered_from = time.time()
+    if settings.catch_up_enabled:
+        covered_from -= settings.catch_up_max_age_minutes * 60
+    next_reconcile = dialog_index.reconciled_at + reconcile_every
+    if dialog_index.last_seen < covered_from:
+        next_reconcile = time.time()
+    scheduler.add_job(
+        reconcile_dialogs_job,
+        IntervalTrigger(hours=settings.dialog_reconcile_hours),
+        id="dialog_reconcile",
+        next_run_time=datetime.fromtimestamp(max(time.time(), next_reconcile), ZoneInfo(settings.timezone)),
+    )
+
     register_all(tg.client)
     setup_experiment_handler(tg.client)
-    await tg.client.catch_up()
 
+    if settings.catch_up_enabled:
+        # пропущенное за время простоя догоняется в фоне, старт от длины простоя не зависит
+        scheduler.add_job(
+            catch_up_job, id="catch_up", next_run_time=datetime.now(ZoneInfo(settings.timezone))
+        )
+
+
+async def _warm_ai():
+    await asyncio.to_thread(importlib.import_module, "openai")
+    AIClient.get()
+
+
+async def _warm_tokenizer():
+    await asyncio.to_thread(Tokenizer.get().load)
+
+
+async def _warm_free_slots():
+    await asyncio.to_thread(importlib.import_module, "app.availability")
+
+
+async def _warm_bitrix():
+    bitrix = BitrixClient.get()
+    scheduler.add_job(
+        bitrix.sync_directory,
+        IntervalTrigger(minutes=settings.bitrix_directory_refresh_minutes),
+        id="bitrix_directory",
+        next_run_time=datetime.now(ZoneInfo(settings.timezone)),
+    )
+    scheduler.add_job(
+        bitrix.refresh_email_guests,
+        IntervalTrigger(minutes=settings.bitrix_guest_refresh_minutes),
+        id="bitrix_email_guests",
+        next_run_time=datetime.now(ZoneInfo(settings.timezone)),
+    )
+
+
+REQUIRED_COMPONENTS = ("telegram",)
+
+
+def _components() -> dict:
+    components = {
+        "message_store": MessageStore.get,
+        "dialog_index": DialogIndex.get,
+        "telegram": _start_telegram,
+        "ai": _warm_ai,
+        "free_slots": _warm_free_slots,
+        "tokenizer": _warm_tokenizer,
+    }
+    if settings.bitrix_client_id:
+        components["bitrix"] = _warm_bitrix
+    if settings.jira_url:
+        components["jira"] = JiraClient.get
+    return components
+
+
+async def _warm_up(components: dict):
+    """Connect and warm every component concurrently, after the API is already serving.
+
+    Without Telegram (e.g. an unauthorized session) the service has nothing
+    to do, so its failure shuts the server down, like a failed startup did
+    before warm-up moved to the background.
+    """
+
+    async def warm(name: str, fn):
+        if not await readiness.warm(name, fn) and name in REQUIRED_COMPONENTS:
+            logger.critical("Required component %s failed to start, shutting down", name)
+            signal.raise_signal(signal.SIGTERM)  # uvicorn завершается штатно, с кодом по сигналу
+
+    await asyncio.gather(*(warm(name, fn) for name, fn in components.items()))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
     scheduler.add_job(
         daily_summary_job,
         CronTrigger(hour=23, minute=15, timezone=settings.timezone),
         id="daily_summary",
     )
+    scheduler.add_job(
+        lambda: DialogIndex.get().flush(), IntervalTrigger(minutes=1), id="dialog_index_flush"
+    )
+    scheduler.add_job(
+        lambda: MessageStore.get().flush(), IntervalTrigger(minutes=1), id="message_store_flush"
+    )
+    if settings.message_retention_days:
+        scheduler.add_job(
+            prune_messages_job, CronTrigger(hour=4, timezone=settings.timezone), id="message_store_prune"
+        )
     scheduler.start()
     logger.info("=== Scheduler started: daily at 23:15 [%s]", settings.timezone)
+    components = _components()
+    readiness.register(*components)
+    warm_up = asyncio.create_task(_warm_up(components))
 
     yield
 
+    warm_up.cancel()
+    await asyncio.gather(warm_up, return_exceptions=True)
     scheduler.shutdown()
-    await tg.disconnect()
-    await BitrixClient.get().close()
-    await JiraClient.get().close()
+    await trigger_queue.close()
+    await SendQueue.get().close()
+    await TelegramService.get().disconnect()
+    # закрываем только то, что успело создаться
+    for client in (BitrixClient, JiraClient, AIClient):
+        if client._instance is not None:
+            await client._instance.close()
+    MessageStore.get().close()
+    DialogIndex.get().flush()
 
 
 app = FastAPI(title="SmartSummary", lifespan=lifespan)
 app.include_router(router, prefix="/api")
+
+
+@app.get("/ready")
+async def ready():
+    """200 once every component has warmed up, 503 with per-component state before that."""
+    snapshot = readiness.snapshot()
+    return JSONResponse(snapshot, status_code=200 if snapshot["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
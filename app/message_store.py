@@ -0,0 +1,251 @@
+import logging
+import sqlite3
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+logger = logging.getLogger("smartsummary")
+
+DB_FILE = Path(__file__).resolve().parent.parent / "data" / "messages.db"
+CHANNEL_ID_BASE = -1000000000000  # id каналов и супергрупп в формате Telethon — меньше этого
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    chat_id   INTEGER NOT NULL,
+    msg_id    INTEGER NOT NULL,
+    sender_id INTEGER,
+    sender    TEXT,
+    text      TEXT NOT NULL,
+    date      REAL NOT NULL,
+    PRIMARY KEY (chat_id, msg_id)
+);
+CREATE INDEX IF NOT EXISTS idx_messages_chat_date ON messages (chat_id, date);
+
+CREATE TABLE IF NOT EXISTS summary_checkpoints (
+    chat_id     INTEGER NOT NULL,
+    day         TEXT NOT NULL,
+    last_msg_id INTEGER NOT NULL,
+    summary     TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (chat_id, day)
+);
+
+CREATE TABLE IF NOT EXISTS handled (
+    chat_id     INTEGER PRIMARY KEY,
+    last_msg_id INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS coverage (
+    chat_id      INTEGER PRIMARY KEY,
+    covered_from REAL NOT NULL
+);
+"""
+
+
+class MessageStore:
+    """Persistent SQLite store of chat messages seen by the userbot.
+
+    A chat window [since, now] is served locally only if the store is known
+    to hold every message of it: either the process has been ingesting live
+    updates since before `since`, or the window was backfilled from Telegram
+    during this run. Coverage is reset on startup, since messages sent while
+    the service was down are not in the store.
+
+    Single-message writes (new, edited, deleted messages) are committed by
+    `flush`, called periodically, rather than one commit each. `prune` drops
+    messages and checkpoints older than the retention window; windows
+    reaching before it are fetched from Telegram again.
+    """
+
+    _instance: "MessageStore | None" = None
+
+    def __init__(self, path: Path = DB_FILE):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.execute("DELETE FROM coverage")
+        self._db.commit()
+        self._live_since = time.time()
+        self._kept_from = 0.0  # всё, что старше, удалено prune
+        self._handled: dict[int, int] = {}  # ещё не записанные отметки mark_handled
+
+    @classmethod
+    def get(cls) -> "MessageStore":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+    def add(
+        self,
+        chat_id: int,
+        msg_id: int,
+        sender_id: int | None,
+        sender: str | None,
+        text: str,
+        date: datetime,
+    ):
+        """Store a live message; committed with the next `flush`."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?)",
+            (chat_id, msg_id, sender_id, sender, text, date.timestamp()),
+        )
+
+    def edit(self, chat_id: int, msg_id: int, text: str):
+        """Apply an edit to a stored message (one left without text is dropped)."""
+        if text:
+            self._db.execute(
+                "UPDATE messages SET text = ? WHERE chat_id = ? AND msg_id = ?", (text, chat_id, msg_id)
+            )
+        else:
+            self.delete(chat_id, [msg_id])
+
+    def delete(self, chat_id: int | None, msg_ids: list[int]):
+        """Drop deleted messages.
+
+        Telegram reports deletions in private chats and basic groups without
+        a chat: their message ids are unique per account, so they are matched
+        in every chat except channels and supergroups.
+        """
+        marks = ",".join("?" * len(msg_ids))
+        if chat_id is not None:
+            self._db.execute(
+                f"DELETE FROM messages WHERE chat_id = ? AND msg_id IN ({marks})", (chat_id, *msg_ids)
+            )
+        else:
+            self._db.execute(
+                f"DELETE FROM messages WHERE chat_id > ? AND msg_id IN ({marks})", (CHANNEL_ID_BASE, *msg_ids)
+            )
+
+    def add_many(self, chat_id: int, msgs: list[dict]):
+        """Store messages in the format returned by `get_since`."""
+        self._db.executemany(
+            "INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    chat_id, m["id"], m.get("sender_id"), m.get("sender"), m["text"],
+                    datetime.fromisoformat(m["date"]).timestamp(),
+                )
+                for m in msgs
+            ],
+        )
+        self._db.commit()
+
+    def mark_covered(self, chat_id: int, since: datetime):
+        """Record that every message of `chat_id` after `since` is in the store."""
+        ts = since.timestamp()
+        self._db.execute(
+            "INSERT INTO coverage VALUES (?, ?) "
+            "ON CONFLICT(chat_id) DO UPDATE SET covered_from = MIN(covered_from, excluded.covered_from)",
+            (chat_id, ts),
+        )
+        self._db.commit()
+
+    def covers(self, chat_id: int, since: datetime) -> bool:
+        ts = since.timestamp()
+        if ts < self._kept_from:
+            return False
+        if ts >= self._live_since:
+            return True
+        row = self._db.execute(
+            "SELECT covered_from FROM coverage WHERE chat_id = ?", (chat_id,)
+        ).fetchone()
+        return row is not None and row[0] <= ts
+
+    def mark_handled(self, chat_id: int, msg_id: int):
+        """Advance the chat's mark of messages already seen by the trigger router.
+
+        Kept in memory and written by `flush`, so the update path does not
+        pay for a commit per message.
+        """
+        if msg_id > self._handled.get(chat_id, 0):
+            self._handled[chat_id] = msg_id
+
+    def flush(self):
+        self._write_handled()
+        if self._db.in_transaction:
+            self._db.commit()
+
+    def prune(self, before: datetime):
+        """Delete messages and summary checkpoints older than `before`."""
+        ts = before.timestamp()
+        deleted = self._db.execute("DELETE FROM messages WHERE date < ?", (ts,)).rowcount
+        self._db.execute("DELETE FROM summary_checkpoints WHERE day < ?", (before.date().isoformat(),))
+        # покрытие теперь начинается не раньше границы хранения
+        self._db.execute("UPDATE coverage SET covered_from = ? WHERE covered_from < ?", (ts, ts))
+        self._db.commit()
+        self._kept_from = max(self._kept_from, ts)
+        logger.info("Message store: pruned %d messages older than %s", deleted, before.date())
+
+    def _write_handled(self):
+        if not self._handled:
+            return
+        self._db.executemany(
+            "INSERT INTO handled VALUES (?, ?) "
+            "ON CONFLICT(chat_id) DO UPDATE SET last_msg_id = MAX(last_msg_id, excluded.last_msg_id)",
+            self._handled.items(),
+        )
+        self._handled = {}
+
+    def handled_marks(self) -> dict[int, int]:
+        """Last handled message id per chat (stored messages count as handled)."""
+        self.flush()
+        marks = dict(self._db.execute(
+            "SELECT chat_id, MAX(msg_id) FROM messages GROUP BY chat_id"
+        ).fetchall())
+        for chat_id, msg_id in self._db.execute("SELECT chat_id, last_msg_id FROM handled"):
+            marks[chat_id] = max(marks.get(chat_id, 0), msg_id)
+        return marks
+
+    def get_since(self, chat_id: int, since: datetime) -> list[dict]:
+        """Messages of a chat after `since`, oldest first."""
+        rows = self._db.execute(
+            "SELECT msg_id, sender_id, sender, text, date FROM messages "
+            "WHERE chat_id = ? AND date >= ? ORDER BY date, msg_id",
+            (chat_id, since.timestamp()),
+        ).fetchall()
+        return [self._row_to_dict(r) for r in rows]
+
+    def get_recent(self, chat_id: int, limit: int = 500) -> list[dict]:
+        """Last `limit` messages of a chat, oldest first."""
+        rows = self._db.execute(
+            "SELECT msg_id, sender_id, sender, text, date FROM messages "
+            "WHERE chat_id = ? ORDER BY date DESC, msg_id DESC LIMIT ?",
+            (chat_id, limit),
+        ).fetchall()
+        return [self._row_to_dict(r) for r in reversed(rows)]
+
+    def get_checkpoint(self, chat_id: int, day: date) -> tuple[int, str] | None:
+        """(last_summarized_msg_id, summary_so_far) for a chat's day, if any."""
+        row = self._db.execute(
+            "SELECT last_msg_id, summary FROM summary_checkpoints WHERE chat_id = ? AND day = ?",
+            (chat_id, day.isoformat()),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def save_checkpoint(self, chat_id: int, day: date, last_msg_id: int, summary: str):
+        self._db.execute(
+            "INSERT OR REPLACE INTO summary_checkpoints VALUES (?, ?, ?, ?, ?)",
+            (chat_id, day.isoformat(), last_msg_id, summary, time.time()),
+        )
+        self._db.execute(
+            "DELETE FROM summary_checkpoints WHERE chat_id = ? AND day < ?",
+            (chat_id, day.isoformat()),
+        )
+        self._db.commit()
+
+    @staticmethod
+    def _row_to_dict(row: tuple) -> dict:
+        msg_id, sender_id, sender, text, ts = row
+        return {
+            "id": msg_id,
+            "sender_id": sender_id,
+            "sender": sender or str(sender_id),
+            "text": text,
+            "date": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+        }
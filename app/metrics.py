@@ -0,0 +1,200 @@
+"""Minimal Prometheus-style metrics, rendered in the text exposition format at /metrics."""
+
+import math
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry: list["_Metric"] = []
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: "Histogram", labels: dict):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        self.__exit__(*exc)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(buckets) + (math.inf,)
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self._buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def time(self, **labels) -> _Timer:
+        """Context manager (sync or async) observing the elapsed wall time."""
+        return _Timer(self, labels)
+
+    def render(self) -> list[str]:
+        lines = super().render()
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self._buckets, counts):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render() -> str:
+    lines: list[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ── Metrics ───────────────────────────────────────────────────────
+
+MESSAGES_RECEIVED = Counter(
+    "smartsummary_messages_received_total", "Telegram messages seen by the trigger router"
+)
+TRIGGER_SECONDS = Histogram(
+    "smartsummary_trigger_seconds", "Trigger handler latency", ("trigger",)
+)
+TRIGGER_QUEUE_DEPTH = Gauge(
+    "smartsummary_trigger_queue_depth", "Trigger jobs waiting in per-chat queues"
+)
+TRIGGER_QUEUE_WAIT_SECONDS = Histogram(
+    "smartsummary_trigger_queue_wait_seconds", "Time a trigger job waited before running", ("trigger",)
+)
+TRIGGER_QUEUE_DROPPED = Counter(
+    "smartsummary_trigger_queue_dropped_total", "Trigger jobs rejected because queues were full"
+)
+AI_REQUEST_SECONDS = Histogram(
+    "smartsummary_ai_request_seconds", "OpenAI request duration until the full response is received", ("mode",)
+)
+AI_FIRST_TOKEN_SECONDS = Histogram(
+    "smartsummary_ai_first_token_seconds", "OpenAI streaming time to the first text delta"
+)
+AI_REQUESTS = Counter(
+    "smartsummary_ai_requests_total", "OpenAI requests by outcome", ("outcome",)
+)
+AI_TOKENS = Counter(
+    "smartsummary_ai_tokens_total", "OpenAI token usage", ("kind",)
+)
+TRANSCRIPT_TOKENS = Counter(
+    "smartsummary_transcript_tokens_total", "Estimated prompt transcript tokens before/after compaction", ("stage",)
+)
+AI_CALL_TOKENS = Histogram(
+    "smartsummary_ai_call_tokens", "OpenAI tokens per call", ("kind",),
+    buckets=(100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000),
+)
+BITRIX_REQUEST_SECONDS = Histogram(
+    "smartsummary_bitrix_request_seconds", "Bitrix REST call latency", ("method",)
+)
+JIRA_REQUEST_SECONDS = Histogram(
+    "smartsummary_jira_request_seconds", "Jira REST call latency", ("operation",)
+)
+TELEGRAM_FETCH_SECONDS = Histogram(
+    "smartsummary_telegram_fetch_seconds", "Chat history fetch latency", ("source",)
+)
+TELEGRAM_SEND_SECONDS = Histogram(
+    "smartsummary_telegram_send_seconds", "Telegram send/edit latency", ("kind",)
+)
+TELEGRAM_SEND_QUEUE_DEPTH = Gauge(
+    "smartsummary_telegram_send_queue_depth", "Outbound Telegram sends queued or in flight"
+)
+TELEGRAM_FLOOD_WAITS = Counter(
+    "smartsummary_telegram_flood_waits_total", "FloodWaitError responses to outbound sends"
+)
+JOB_SECONDS = Histogram(
+    "smartsummary_job_seconds", "Scheduler job duration", ("job",),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600),
+)
@@ -0,0 +1,50 @@
+import inspect
+import logging
+import time
+from collections.abc import Callable
+
+logger = logging.getLogger("smartsummary")
+
+
+class Readiness:
+    """Warm-up state of the service components, reported by /ready.
+
+    Each component goes pending → warming → ready (or failed). The service
+    is ready once every registered component is ready.
+    """
+
+    def __init__(self):
+        self._components: dict[str, dict] = {}
+
+    def register(self, *names: str):
+        for name in names:
+            self._components.setdefault(name, {"state": "pending"})
+
+    async def warm(self, name: str, warm_up: Callable) -> bool:
+        """Run `warm_up()` (sync or async) for a component, recording its state and duration."""
+        self.register(name)
+        component = self._components[name] = {"state": "warming"}
+        started = time.monotonic()
+        try:
+            result = warm_up()
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            component.update(state="failed", error=str(e))
+            logger.error("Warm-up of %s failed: %s", name, e, exc_info=True)
+            return False
+        finally:
+            component["seconds"] = round(time.monotonic() - started, 3)
+        component["state"] = "ready"
+        logger.info("Warm-up: %s ready in %.2fs", name, component["seconds"])
+        return True
+
+    @property
+    def ready(self) -> bool:
+        return all(c["state"] == "ready" for c in self._components.values())
+
+    def snapshot(self) -> dict:
+        return {"ready": self.ready, "components": {n: dict(c) for n, c in self._components.items()}}
+
+
+readiness = Readiness()
@@ -1,8 +1,25 @@
+import asyncio
 import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING
 
-from openai import AsyncOpenAI
+import httpx
 
 from app.config import settings
+from app.metrics import AI_CALL_TOKENS, AI_FIRST_TOKEN_SECONDS, AI_REQUEST_SECONDS, AI_REQUESTS, AI_TOKENS
+from app.services.llm_cache import LLMCache
+from app.services.rate_limit import (
+    AdaptiveConcurrency,
+    TokenBucket,
+    backoff_delay,
+    retry_after_seconds,
+)
+from app.tokenizer import count_tokens
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 logger = logging.getLogger("smartsummary")
 
@@ -13,7 +30,27 @@ class AIClient:
     _instance: "AIClient | None" = None
 
     def __init__(self):
-        self._client = AsyncOpenAI(api_key=settings.openai_api_key)
+        from openai import AsyncOpenAI  # тяжёлый импорт — только при первом обращении
+
+        # ретраи делаем сами, с учётом лимитов и Retry-After
+        self._client = AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0)
+        self._requests = TokenBucket(settings.openai_rpm)
+        self._tokens = TokenBucket(settings.openai_tpm)
+        self._concurrency = AdaptiveConcurrency(
+            initial=settings.openai_initial_concurrency,
+            minimum=1,
+            maximum=settings.openai_max_concurrency,
+        )
+        self._paused_until = 0.0
+        self._calls: deque[dict] = deque(maxlen=settings.openai_usage_log_size)
+        self._usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "truncated": 0}
+        self._cache: LLMCache | None = None
+        if settings.llm_cache_enabled:
+            self._cache = LLMCache(
+                ttl=settings.llm_cache_ttl,
+                memory_size=settings.llm_cache_memory_size,
+                disk_size=settings.llm_cache_disk_size,
+            )
 
     @classmethod
     def get(cls) -> "AIClient":
@@ -22,28 +59,245 @@ class AIClient:
         return cls._instance
 
     async def complete(
-        self, prompt: str, max_tokens: int = 1024, temperature: float = 1.0
+        self,
+        prompt: str,
+        max_tokens: int = 1024,
+        temperature: float = 1.0,
+        cache: bool = True,
     ) -> str:
-        response = await self._client.chat.completions.create(
+        return await self._create(
+            [{"role": "user", "content": prompt}], max_tokens, temperature, cache
+        )
+
+    async def chat(
+        self,
+        messages: list[dict],
+        max_tokens: int = 1024,
+        temperature: float = 0.9,
+        cache: bool = True,
+    ) -> str:
+        return await self._create(messages, max_tokens, temperature, cache)
+
+    async def stream(
+        self,
+        prompt: str,
+        max_tokens: int = 1024,
+        temperature: float = 1.0,
+        cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """Like `complete`, but yields the answer in text deltas as they are generated.
+
+        The concurrency slot is held until the stream is fully read. A failure
+        before the first delta (at connect or mid-stream) is retried like in
+        `_call`; after it the error is raised, since a retry would repeat text
+        the caller already has.
+        """
+        messages = [{"role": "user", "content": prompt}]
+        key = None
+        if cache and self._cache is not None:
+            key = LLMCache.make_key(settings.openai_model, messages, temperature, max_tokens)
+            cached = self._cache.get(key)
+            if cached is not None:
+                logger.info("LLM cache hit (%s...)", key[:12])
+                yield cached
+                return
+
+        import openai
+
+        kwargs = dict(
             model=settings.openai_model,
             max_completion_tokens=max_tokens,
             temperature=temperature,
-            messages=[{"role": "user", "content": prompt}],
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
         )
-        return response.choices[0].message.content.strip()
+        prompt_tokens = _prompt_tokens(messages)
+        parts: list[str] = []
+        for attempt in range(settings.openai_max_retries + 1):
+            await self._admit(max_tokens + prompt_tokens)
+            usage = finish_reason = None
+            started = False
+            try:
+                # слот держим до конца потока: длинный ответ занимает его всё время генерации
+                async with self._concurrency:
+                    with AI_REQUEST_SECONDS.time(mode="stream"):
+                        sent_at = time.perf_counter()
+                        response = await self._client.chat.completions.create(**kwargs)
+                        started = True
+                        async for chunk in response:
+                            if chunk.usage is not None:
+                                usage = chunk.usage
+                            if not chunk.choices:
+                                continue
+                            finish_reason = chunk.choices[0].finish_reason or finish_reason
+                            delta = chunk.choices[0].delta.content
+                            if delta:
+                                if not parts:
+                                    AI_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - sent_at)
+                                parts.append(delta)
+                                yield delta
+            except (openai.APIError, httpx.TransportError) as e:
+                if not started and not isinstance(e, _retryable_errors()):
+                    raise
+                if parts:
+                    # начало ответа уже отдано — повтор его бы задублировал
+                    AI_REQUESTS.inc(outcome="error")
+                    raise
+                await self._backoff(e, attempt)
+            else:
+                AI_REQUESTS.inc(outcome="ok")
+                self._concurrency.on_success()
+                break
 
-    async def chat(
-        self, messages: list[dict], max_tokens: int = 1024, temperature: float = 0.9
+        self._record_usage(usage, prompt_tokens, max_tokens, finish_reason, mode="stream")
+        if key is not None:
+            self._cache.put(key, "".join(parts).strip())
+
+    async def _create(
+        self, messages: list[dict], max_tokens: int, temperature: float, cache: bool
     ) -> str:
-        response = await self._client.chat.completions.create(
+        """Call the model, serving byte-identical requests from the response cache.
+
+        Pass `cache=False` for prompts that are expected to give a different
+        answer every time (high-temperature creative generation).
+        """
+        key = None
+        if cache and self._cache is not None:
+            key = LLMCache.make_key(settings.openai_model, messages, temperature, max_tokens)
+            cached = self._cache.get(key)
+            if cached is not None:
+                logger.info("LLM cache hit (%s...)", key[:12])
+                return cached
+
+        prompt_tokens = _prompt_tokens(messages)
+        response = await self._call(
+            prompt_tokens,
             model=settings.openai_model,
             max_completion_tokens=max_tokens,
             temperature=temperature,
             messages=messages,
         )
-        return response.choices[0].message.content.strip()
+        self._record_usage(
+            response.usage, prompt_tokens, max_tokens, response.choices[0].finish_reason, mode="complete"
+        )
+        result = response.choices[0].message.content.strip()
+
+        if key is not None:
+            self._cache.put(key, result)
+        return result
+
+    async def _call(self, prompt_tokens: int, **kwargs):
+        """chat.completions.create behind the rate limiters, with retries.
+
+        `prompt_tokens` is the local count of the prompt, reserved from the
+        tokens/min bucket together with the answer budget.
+
+        Requests/min and tokens/min are paced client-side by token buckets.
+        Throttling (429) halves the adaptive concurrency limit and pauses all
+        callers for the server's Retry-After; transient errors are retried
+        with jittered exponential backoff.
+        """
+        for attempt in range(settings.openai_max_retries + 1):
+            await self._admit(kwargs["max_completion_tokens"] + prompt_tokens)
+            try:
+                async with self._concurrency:
+                    with AI_REQUEST_SECONDS.time(mode="complete"):
+                        response = await self._client.chat.completions.create(**kwargs)
+            except _retryable_errors() as e:
+                await self._backoff(e, attempt)
+            else:
+                AI_REQUESTS.inc(outcome="ok")
+                self._concurrency.on_success()
+                return response
+
+    async def _admit(self, estimated_tokens: int):
+        """Wait out a rate-limit pause, then take a request and the estimated tokens from the buckets."""
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+        await self._requests.acquire()
+        await self._tokens.acquire(estimated_tokens)
+
+    async def _backoff(self, e: Exception, attempt: int):
+        """Account a failed attempt and wait before the next one; re-raise when retries are exhausted."""
+        import openai
+
+        if isinstance(e, openai.RateLimitError):
+            AI_REQUESTS.inc(outcome="rate_limited")
+            if e.code == "insufficient_quota" or attempt == settings.openai_max_retries:
+                raise e
+            self._concurrency.on_throttle()
+            delay = retry_after_seconds(e.response.headers) or backoff_delay(attempt)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            logger.warning(
+                "OpenAI rate limited, retry %d in %.1fs (concurrency=%d)",
+                attempt + 1, delay, self._concurrency.limit,
+            )
+            return
+        AI_REQUESTS.inc(outcome="error")
+        if attempt == settings.openai_max_retries:
+            raise e
+        delay = backoff_delay(attempt)
+        logger.warning("OpenAI error: %s, retry %d in %.1fs", e, attempt + 1, delay)
+        await asyncio.sleep(delay)
+
+    def _record_usage(
+        self, usage, prompt_tokens: int, max_tokens: int, finish_reason: str | None, mode: str
+    ):
+        """Account one call: token counters, per-call histograms and the recent-calls log."""
+        if usage is None:
+            return
+        AI_TOKENS.inc(usage.prompt_tokens, kind="prompt")
+        AI_TOKENS.inc(usage.completion_tokens, kind="completion")
+        AI_CALL_TOKENS.observe(usage.prompt_tokens, kind="prompt")
+        AI_CALL_TOKENS.observe(usage.completion_tokens, kind="completion")
+
+        details = getattr(usage, "completion_tokens_details", None)
+        truncated = finish_reason == "length"
+        self._usage["calls"] += 1
+        self._usage["prompt_tokens"] += usage.prompt_tokens
+        self._usage["completion_tokens"] += usage.completion_tokens
+        self._usage["truncated"] += truncated
+        self._calls.append({
+            "at": round(time.time()),
+            "mode": mode,
+            "prompt_tokens": usage.prompt_tokens,
+            "estimated_prompt_tokens": prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "reasoning_tokens": getattr(details, "reasoning_tokens", None),
+            "max_tokens": max_tokens,
+            "finish_reason": finish_reason,
+        })
+        if truncated:
+            logger.warning(
+                "OpenAI answer cut at max_tokens=%d (prompt %d tokens)", max_tokens, usage.prompt_tokens
+            )
+
+    def usage_stats(self) -> dict:
+        return {**self._usage, "recent": list(self._calls)}
+
+    def cache_stats(self) -> dict:
+        if self._cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._cache.stats()}
+
+    async def close(self):
+        await self._client.close()
+        if self._cache is not None:
+            self._cache.close()
 
     @property
-    def raw(self) -> AsyncOpenAI:
+    def raw(self) -> "AsyncOpenAI":
         """Access underlying AsyncOpenAI client for advanced usage."""
         return self._client
+
+
+def _retryable_errors() -> tuple[type[Exception], ...]:
+    import openai
+
+    return openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError
+
+
+def _prompt_tokens(messages: list[dict]) -> int:
+    return sum(count_tokens(str(m.get("content", ""))) for m in messages)
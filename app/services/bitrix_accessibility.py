@@ -0,0 +1,86 @@
+import logging
+import time
+from datetime import date, timedelta
+
+from app.utils import parse_bitrix_dt
+
+logger = logging.getLogger("smartsummary")
+
+
+def date_range(first: date, last: date) -> list[date]:
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+class AccessibilityCache:
+    """Short-lived cache of `calendar.accessibility.get` slots per (user, day).
+
+    A slot spanning several days is stored under each of them; `get` returns
+    every slot once. Days with no events are cached too (as empty lists).
+    """
+
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._entries: dict[tuple[int, date], tuple[float, list[dict]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def missing(self, user_ids: list[int], days: list[date]) -> dict[int, list[date]]:
+        """Days without a fresh entry, per user (users with everything cached are omitted)."""
+        now = time.monotonic()
+        result: dict[int, list[date]] = {}
+        for uid in user_ids:
+            for day in days:
+                entry = self._entries.get((uid, day))
+                if entry is None or entry[0] < now:
+                    result.setdefault(uid, []).append(day)
+        total = len(user_ids) * len(days)
+        miss = sum(map(len, result.values()))
+        self.hits += total - miss
+        self.misses += miss
+        return result
+
+    def put(self, user_id: int, days: list[date], slots: list[dict]):
+        """Store the slots fetched for `days` of one user."""
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires < now]:
+            del self._entries[key]
+        expires = now + self._ttl
+        by_day: dict[date, list[dict]] = {day: [] for day in days}
+        for slot in slots:
+            try:
+                first = parse_bitrix_dt(slot["DATE_FROM"]).date()
+                last = parse_bitrix_dt(slot["DATE_TO"]).date()
+            except (KeyError, ValueError):
+                # пусть разбор (и предупреждение в логе) достанется вызывающему коду
+                first, last = days[0], days[-1]
+            for day in date_range(max(first, days[0]), min(last, days[-1])):
+                by_day[day].append(slot)
+        for day, day_slots in by_day.items():
+            self._entries[(user_id, day)] = (expires, day_slots)
+
+    def get(self, user_ids: list[int], days: list[date]) -> dict[str, list[dict]]:
+        """Cached slots in the `calendar.accessibility.get` result shape."""
+        result: dict[str, list[dict]] = {}
+        for uid in user_ids:
+            seen: set[int] = set()
+            slots = result[str(uid)] = []
+            for day in days:
+                entry = self._entries.get((uid, day))
+                for slot in entry[1] if entry else ():
+                    if id(slot) not in seen:
+                        seen.add(id(slot))
+                        slots.append(slot)
+        return result
+
+    def invalidate(self, user_ids: list[int], days: list[date] | None = None):
+        """Drop cached days of the given users (all their days when `days` is None)."""
+        users = set(user_ids)
+        wanted = set(days) if days is not None else None
+        stale = [
+            key for key in self._entries
+            if key[0] in users and (wanted is None or key[1] in wanted)
+        ]
+        for key in stale:
+            del self._entries[key]
+        if stale:
+            logger.debug("Accessibility cache: invalidated %d entries", len(stale))
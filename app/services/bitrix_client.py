@@ -1,17 +1,48 @@
+import asyncio
 import json
 import logging
+import os
 import time
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from pathlib import Path
+from urllib.parse import urlencode
 
 import httpx
 
 from app.config import settings
+from app.metrics import BITRIX_REQUEST_SECONDS, JOB_SECONDS
+from app.services.bitrix_accessibility import AccessibilityCache, date_range
+from app.services.bitrix_directory import NICKNAME_FIELD, BitrixDirectory
 
 logger = logging.getLogger("smartsummary")
 
 TOKENS_FILE = Path(__file__).resolve().parent.parent.parent / "data" / "bitrix_tokens.json"
+EMAIL_GUESTS_FILE = Path(__file__).resolve().parent.parent.parent / "data" / "bitrix_email_guests.json"
 OAUTH_URL = "https://oauth.bitrix24.tech/oauth/token"
+BATCH_LIMIT = 50  # максимум команд в одном вызове batch
+
+
+def _encode_query(params: dict) -> str:
+    """Encode params the way PHP's http_build_query does (filter[NAME]=x, users[0]=1)."""
+    pairs: list[tuple[str, str]] = []
+
+    def add(key: str, value):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                add(f"{key}[{k}]", v)
+        elif isinstance(value, (list, tuple)):
+            for i, v in enumerate(value):
+                add(f"{key}[{i}]", v)
+        elif isinstance(value, bool):
+            pairs.append((key, "1" if value else "0"))
+        elif value is None:
+            pairs.append((key, ""))
+        else:
+            pairs.append((key, str(value)))
+
+    for k, v in params.items():
+        add(k, v)
+    return urlencode(pairs)
 
 
 class BitrixClient:
@@ -19,8 +50,19 @@ class BitrixClient:
 
     def __init__(self):
         self._http = httpx.AsyncClient()
+        self._tokens: dict | None = None
+        self._refresh_task: asyncio.Task | None = None
         self._email_guests_cache: dict[str, tuple[int, str]] = {}
-        self._email_guests_loaded = False
+        self._email_guests_max_id = 0  # наибольший существующий ID, до которого всё просканировано
+        self._email_guests_lock = asyncio.Lock()
+        self._email_guests_scanned_at: float | None = None  # time.monotonic() конца последнего скана
+        self._load_email_guests_file()
+        self._profile_id: int | None = None
+        self.directory = BitrixDirectory()
+        self.accessibility = AccessibilityCache(settings.bitrix_accessibility_ttl)
+        self._pending: list[tuple[str, dict | None, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
 
     @classmethod
     def get(cls) -> "BitrixClient":
@@ -29,9 +71,12 @@ class BitrixClient:
         return cls._instance
 
     async def close(self):
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
         await self._http.aclose()
 
     # ── Token management ──────────────────────────────────────────
+    # Токены живут в памяти (файл читается один раз), обновление — одно на
+    # всех ожидающих, заранее до истечения; запись на диск атомарная.
 
     def _load_tokens(self) -> dict | None:
         if not TOKENS_FILE.exists():
@@ -42,15 +87,20 @@ class BitrixClient:
             logger.error("Failed to load Bitrix tokens: %s", e)
             return None
 
-    def _save_tokens(self, data: dict):
+    def _save_tokens(self, data: dict) -> dict:
         tokens = {
             "access_token": data["access_token"],
             "refresh_token": data["refresh_token"],
             "client_endpoint": data["client_endpoint"],
             "expires_at": int(time.time()) + int(data.get("expires_in", 3600)),
         }
-        TOKENS_FILE.write_text(json.dumps(tokens, indent=2))
+        self._tokens = tokens
+        TOKENS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = TOKENS_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(tokens, indent=2))
+        os.replace(tmp, TOKENS_FILE)
         logger.info("Bitrix tokens saved (endpoint: %s)", tokens["client_endpoint"])
+        return tokens
 
     async def _refresh_access_token(self, refresh_token: str) -> dict:
         resp = await self._http.get(
@@ -70,25 +120,49 @@ class BitrixClient:
                 f"Bitrix refresh error: {data['error']} — {data.get('error_description', '')}"
             )
 
-        self._save_tokens(data)
-        return self._load_tokens()
+        return self._save_tokens(data)
+
+    def _start_refresh(self, refresh_token: str) -> asyncio.Task:
+        """Start a token refresh, or join the one already in flight."""
+        if self._refresh_task is None:
+            task = asyncio.create_task(self._refresh_access_token(refresh_token))
+            task.add_done_callback(self._refresh_done)
+            self._refresh_task = task
+        return self._refresh_task
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._refresh_task = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Bitrix token refresh failed: %s", task.exception())
 
     async def _get_tokens(self) -> dict:
-        tokens = self._load_tokens()
+        if self._tokens is None:
+            self._tokens = self._load_tokens()
+        tokens = self._tokens
 
         if tokens is None:
             if not settings.bitrix_refresh_token:
                 raise RuntimeError("BITRIX_REFRESH_TOKEN не задан в .env")
             logger.info("Bitrix: first run, refreshing from .env token...")
-            return await self._refresh_access_token(settings.bitrix_refresh_token)
+            return await asyncio.shield(self._start_refresh(settings.bitrix_refresh_token))
 
-        if time.time() < tokens["expires_at"] - 60:
+        remaining = tokens["expires_at"] - time.time()
+        if remaining > 60:
+            if remaining < settings.bitrix_token_refresh_ahead and self._refresh_task is None:
+                logger.info("Bitrix access_token expires in %ds, refreshing in background...", remaining)
+                self._start_refresh(tokens["refresh_token"])
             return tokens
 
         logger.info("Bitrix access_token expired, refreshing...")
-        return await self._refresh_access_token(tokens["refresh_token"])
+        return await asyncio.shield(self._start_refresh(tokens["refresh_token"]))
 
     async def _request(self, method: str, params: dict | None = None) -> dict:
+        with BITRIX_REQUEST_SECONDS.time(method=method):
+            if settings.bitrix_batching:
+                return await self._enqueue(method, params)
+            return await self._send(method, params)
+
+    async def _send(self, method: str, params: dict | None = None) -> dict:
         tokens = await self._get_tokens()
         url = f"{tokens['client_endpoint']}{method}"
 
@@ -105,63 +179,244 @@ class BitrixClient:
 
         return data
 
+    # ── Batching ──────────────────────────────────────────────────
+    # Вызовы _request, пришедшие в пределах короткого окна, уходят одним
+    # запросом batch (до 50 команд); результаты раздаются обратно вызывающим.
+
+    def _enqueue(self, method: str, params: dict | None) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((method, params, future))
+        if len(self._pending) >= BATCH_LIMIT:
+            self._schedule_flush(0)
+        elif self._flush_handle is None:
+            self._schedule_flush(settings.bitrix_batch_window)
+        return future
+
+    def _schedule_flush(self, delay: float):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        loop = asyncio.get_running_loop()
+        self._flush_handle = loop.call_later(delay, self._start_flush)
+
+    def _start_flush(self):
+        # ссылка на задачу, чтобы её не собрал GC посреди запроса
+        task = asyncio.create_task(self._flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Bitrix batch flush failed: %s", task.exception(), exc_info=task.exception())
+
+    async def _flush(self):
+        self._flush_handle = None
+        commands, self._pending = self._pending[:BATCH_LIMIT], self._pending[BATCH_LIMIT:]
+        if self._pending:
+            self._schedule_flush(0)
+        if not commands:
+            return
+
+        if len(commands) == 1:
+            method, params, future = commands[0]
+            try:
+                result = await self._send(method, params)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            return
+
+        cmd = {
+            f"c{i}": f"{method}?{_encode_query(params or {})}"
+            for i, (method, params, _) in enumerate(commands)
+        }
+        try:
+            with BITRIX_REQUEST_SECONDS.time(method="batch"):
+                data = await self._send("batch", {"halt": 0, "cmd": cmd})
+        except Exception as e:
+            for _, _, future in commands:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        batch = data.get("result", {})
+
+        def section(name: str) -> dict:
+            value = batch.get(name)
+            return value if isinstance(value, dict) else {}
+
+        results, errors = section("result"), section("result_error")
+        totals, nexts = section("result_total"), section("result_next")
+        logger.debug("Bitrix batch: %d commands, %d errors", len(commands), len(errors))
+
+        for i, (method, _, future) in enumerate(commands):
+            if future.done():
+                continue
+            key = f"c{i}"
+            if key in errors:
+                err = errors[key]
+                error = err.get("error", "?") if isinstance(err, dict) else err
+                desc = err.get("error_description", "") if isinstance(err, dict) else ""
+                future.set_exception(RuntimeError(f"Bitrix API error ({method}): {error} — {desc}"))
+                continue
+            item = {"result": results.get(key)}
+            if key in totals:
+                item["total"] = totals[key]
+            if key in nexts:
+                item["next"] = nexts[key]
+            future.set_result(item)
+
     # ── Public API ────────────────────────────────────────────────
 
+    async def sync_directory(self):
+        """Refresh the local user directory (new users; full rescan when stale)."""
+        with JOB_SECONDS.time(job="bitrix_directory"):
+            await self.directory.refresh(
+                self._request, full_sync_interval=settings.bitrix_directory_full_sync_hours * 3600
+            )
+
     async def find_user_by_nickname(self, nickname: str) -> tuple[int | None, str | None]:
+        user = self.directory.find_by_nickname(nickname)
+        if user:
+            return user["id"], user["name"]
+
         clean = nickname.lstrip("@")
-        for variant in [clean, f"@{clean}"]:
-            result = await self._request("user.get", {
-                "filter": {"UF_USR_1678964886664": variant},
-            })
-            users = result.get("result", [])
+        variants = [{"filter": {NICKNAME_FIELD: variant}} for variant in [clean, f"@{clean}"]]
+        if settings.bitrix_batching:
+            # оба варианта уйдут одним batch-запросом
+            results = await asyncio.gather(*(self._request("user.get", params) for params in variants))
+        else:
+            results = []
+            for params in variants:
+                results.append(await self._request("user.get", params))
+                if results[-1].get("result"):
+                    break
+        for result in results:
+            users = result.get("result") or []
             if users:
                 user = users[0]
+                self.directory.add_user(user)
                 full_name = f"{user.get('NAME', '')} {user.get('LAST_NAME', '')}".strip()
                 return int(user["ID"]), full_name
         return None, None
 
     async def find_user_by_email(self, email: str) -> tuple[int | None, str | None]:
+        user = self.directory.find_by_email(email)
+        if user:
+            return user["id"], user["name"]
+
         result = await self._request("user.get", {
             "filter": {"EMAIL": email},
         })
         users = result.get("result", [])
         if users:
             user = users[0]
+            self.directory.add_user(user)
             full_name = f"{user.get('NAME', '')} {user.get('LAST_NAME', '')}".strip()
             logger.info("User found by EMAIL=%s: id=%s name=%s", email, user["ID"], full_name)
             return int(user["ID"]), full_name
         return None, None
 
-    async def _load_email_guests(self):
-        if self._email_guests_loaded:
+    def _load_email_guests_file(self):
+        if not EMAIL_GUESTS_FILE.exists():
             return
+        try:
+            data = json.loads(EMAIL_GUESTS_FILE.read_text())
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error("Failed to load Bitrix email guests: %s", e)
+            return
+        self._email_guests_cache = {email: (uid, name) for email, (uid, name) in data["guests"].items()}
+        self._email_guests_max_id = data["max_id"]
+        logger.info("Loaded %d email guests from %s", len(self._email_guests_cache), EMAIL_GUESTS_FILE.name)
+
+    def _save_email_guests_file(self):
+        data = {"max_id": self._email_guests_max_id, "guests": self._email_guests_cache}
+        EMAIL_GUESTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = EMAIL_GUESTS_FILE.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False))
+        os.replace(tmp, EMAIL_GUESTS_FILE)
+
+    async def refresh_email_guests(self):
+        """Scan user IDs above the last scanned one for email guests.
+
+        `im.user.list.get` is the only way to see email guests, so IDs are
+        probed in blocks of 100 with bounded concurrency (the batch transport
+        packs up to 50 blocks per HTTP call). Progress is kept as the highest
+        existing ID seen, so IDs that did not exist yet are rescanned later.
+        It only advances through blocks that succeeded: a failed block and
+        everything above it are scanned again next time.
+        """
+        async with self._email_guests_lock:
+            result = await self._request("user.get", {"start": 0})
+            total_regular = result.get("total", 0)
+            start_id = self._email_guests_max_id + 1
+            max_id = max(total_regular * 3, 2000, self.directory.max_id, start_id + 500)
+
+            batch_size = 100
+            semaphore = asyncio.Semaphore(settings.bitrix_guest_scan_concurrency)
+
+            async def scan(start: int) -> dict | None:
+                ids = list(range(start, min(start + batch_size, max_id + 1)))
+                async with semaphore:
+                    try:
+                        result = await self._request("im.user.list.get", {"ID": ids})
+                    except Exception as e:
+                        logger.warning("Email guest scan failed for IDs %d..%d: %s", ids[0], ids[-1], e)
+                        return None
+                return result.get("result") or {}
+
+            blocks = await asyncio.gather(*(
+                scan(start) for start in range(start_id, max_id + 1, batch_size)
+            ))
+
+            found = 0
+            failed = 0
+            for users in blocks:
+                if users is None:
+                    failed += 1
+                    continue
+                for uid_str, u in users.items():
+                    if not u:
+                        continue
+                    if not failed:
+                        # отметка растёт только до первого упавшего блока
+                        self._email_guests_max_id = max(self._email_guests_max_id, int(uid_str))
+                    if u.get("external_auth_id") == "email" and u.get("email"):
+                        email = u["email"].lower()
+                        self._email_guests_cache[email] = (u["id"], u.get("name", ""))
+                        found += 1
+
+            self._save_email_guests_file()
+            self._email_guests_scanned_at = time.monotonic()
+            logger.info(
+                "Email guest scan: IDs %d..%d, %d guests found, %d total, %d blocks failed, resume after ID %d",
+                start_id, max_id, found, len(self._email_guests_cache), failed, self._email_guests_max_id,
+            )
 
-        result = await self._request("user.get", {"start": 0})
-        total_regular = result.get("total", 0)
-        max_id = max(total_regular * 3, 2000)
-
-        batch_size = 100
-        for start in range(1, max_id + 1, batch_size):
-            ids = list(range(start, min(start + batch_size, max_id + 1)))
-            try:
-                result = await self._request("im.user.list.get", {"ID": ids})
-            except Exception:
-                continue
-            for uid_str, u in result.get("result", {}).items():
-                if u and u.get("external_auth_id") == "email" and u.get("email"):
-                    email = u["email"].lower()
-                    self._email_guests_cache[email] = (u["id"], u.get("name", ""))
-
-        self._email_guests_loaded = True
-        logger.info("Loaded %d email guests from Bitrix", len(self._email_guests_cache))
+    def _guest_rescan_due(self) -> bool:
+        scanned_at = self._email_guests_scanned_at
+        return scanned_at is None or time.monotonic() - scanned_at >= settings.bitrix_guest_miss_rescan_minutes * 60
 
     async def resolve_email_user(self, email: str) -> tuple[int | None, str | None]:
         uid, name = await self.find_user_by_email(email)
         if uid:
             return uid, name
 
-        await self._load_email_guests()
         cached = self._email_guests_cache.get(email.lower())
+        if not cached and self._email_guests_lock.locked():
+            # идёт скан (стартовый или фоновый) — гость может найтись в нём
+            async with self._email_guests_lock:
+                pass
+            cached = self._email_guests_cache.get(email.lower())
+        if not cached and self._guest_rescan_due():
+            # гость мог появиться после последнего скана — досканируем новые ID,
+            # но не чаще раза в N минут: остальное подхватит фоновый скан
+            await self.refresh_email_guests()
+            cached = self._email_guests_cache.get(email.lower())
         if cached:
             uid, name = cached
             logger.info("Email guest found: id=%s email=%s name=%s", uid, email, name)
@@ -172,12 +427,33 @@ class BitrixClient:
     async def get_users_accessibility(
         self, user_ids: list[int], date_from: str, date_to: str
     ) -> dict:
-        result = await self._request("calendar.accessibility.get", {
-            "users": user_ids,
-            "from": date_from,
-            "to": date_to,
-        })
-        return result.get("result", {})
+        """Accessibility slots per user (dates as YYYY-MM-DD), only uncached (user, day) pairs are fetched."""
+        days = date_range(date.fromisoformat(date_from), date.fromisoformat(date_to))
+        missing = self.accessibility.missing(user_ids, days)
+
+        # пользователи с одинаковым диапазоном недостающих дней — одним запросом
+        groups: dict[tuple[date, date], list[int]] = {}
+        for uid, missing_days in missing.items():
+            groups.setdefault((missing_days[0], missing_days[-1]), []).append(uid)
+
+        async def fetch(first: date, last: date, uids: list[int]):
+            result = await self._request("calendar.accessibility.get", {
+                "users": uids,
+                "from": first.isoformat(),
+                "to": last.isoformat(),
+            })
+            fetched = result.get("result") or {}
+            for uid in uids:
+                self.accessibility.put(uid, date_range(first, last), fetched.get(str(uid)) or [])
+
+        await asyncio.gather(*(fetch(first, last, uids) for (first, last), uids in groups.items()))
+        return self.accessibility.get(user_ids, days)
+
+    async def _get_profile_id(self) -> int:
+        if self._profile_id is None:
+            profile = await self._request("profile")
+            self._profile_id = int(profile["result"]["ID"])
+        return self._profile_id
 
     async def create_meeting(
         self,
@@ -190,8 +466,7 @@ class BitrixClient:
         date_from = date.strftime("%d.%m.%Y %H:%M:%S")
         date_to = (date + timedelta(minutes=duration_minutes)).strftime("%d.%m.%Y %H:%M:%S")
 
-        profile = await self._request("profile")
-        user_id = profile["result"]["ID"]
+        user_id = await self._get_profile_id()
 
         event_params = {
             "type": "user",
@@ -204,8 +479,9 @@ class BitrixClient:
             "timezone_to": settings.timezone,
         }
 
+        all_ids = [int(user_id)]
         if attendee_ids:
-            all_ids = [int(user_id)] + [aid for aid in attendee_ids if aid != int(user_id)]
+            all_ids += [aid for aid in attendee_ids if aid != int(user_id)]
             event_params.update({
                 "is_meeting": "Y",
                 "host": user_id,
@@ -219,6 +495,9 @@ class BitrixClient:
 
         result = await self._request("calendar.event.add", event_params)
         event_id = result.get("result")
+        self.accessibility.invalidate(
+            all_ids, date_range(date.date(), (date + timedelta(minutes=duration_minutes)).date())
+        )
         logger.info(
             "Bitrix calendar event created: id=%s title=%s date=%s attendees=%s",
             event_id, title, date_from, attendee_ids,
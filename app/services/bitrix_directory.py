@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+from pathlib import Path
+
+logger = logging.getLogger("smartsummary")
+
+DIRECTORY_FILE = Path(__file__).resolve().parent.parent.parent / "data" / "bitrix_users.json"
+NICKNAME_FIELD = "UF_USR_1678964886664"  # пользовательское поле с telegram-ником
+SYNC_OVERLAP = 300  # запас (сек) на расхождение часов с порталом при выборке изменённых
+
+Request = Callable[[str, dict | None], Awaitable[dict]]
+
+
+def normalize_nickname(nickname: str) -> str:
+    return nickname.strip().lstrip("@").lower()
+
+
+class BitrixDirectory:
+    """Local index of Bitrix users by nickname and email, persisted under data/.
+
+    Filled by a paginated `user.get` scan; `refresh` re-reads users created
+    or edited since the last sync (by `TIMESTAMP_X`), so renamed or reassigned
+    nicknames are picked up within one refresh period. The full scan every
+    `full_sync_interval` seconds also drops deleted users.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self._path = path or DIRECTORY_FILE
+        self._users: dict[int, dict] = {}
+        self._by_nickname: dict[str, int] = {}
+        self._by_email: dict[str, int] = {}
+        self._full_synced_at = 0.0
+        self._synced_at = 0.0  # начало последней успешной синхронизации
+        self._lock = asyncio.Lock()
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    @property
+    def max_id(self) -> int:
+        return max(self._users, default=0)
+
+    # ── Lookups ───────────────────────────────────────────────────
+
+    def get_user(self, user_id: int) -> dict | None:
+        return self._users.get(user_id)
+
+    def find_by_nickname(self, nickname: str) -> dict | None:
+        uid = self._by_nickname.get(normalize_nickname(nickname))
+        return self._users.get(uid) if uid is not None else None
+
+    def find_by_email(self, email: str) -> dict | None:
+        uid = self._by_email.get(email.strip().lower())
+        return self._users.get(uid) if uid is not None else None
+
+    def add_user(self, raw: dict):
+        """Index a user record as returned by `user.get`."""
+        uid = int(raw["ID"])
+        user = {
+            "id": uid,
+            "name": f"{raw.get('NAME') or ''} {raw.get('LAST_NAME') or ''}".strip(),
+            "nickname": normalize_nickname(raw.get(NICKNAME_FIELD) or ""),
+            "email": (raw.get("EMAIL") or "").strip().lower(),
+            "timezone": raw.get("TIME_ZONE") or "",
+        }
+        self._index(user)
+
+    def _index(self, user: dict):
+        old = self._users.get(user["id"])
+        if old:
+            if self._by_nickname.get(old["nickname"]) == user["id"]:
+                self._by_nickname.pop(old["nickname"], None)
+            if self._by_email.get(old["email"]) == user["id"]:
+                self._by_email.pop(old["email"], None)
+        self._users[user["id"]] = user
+        if user["nickname"]:
+            self._by_nickname[user["nickname"]] = user["id"]
+        if user["email"]:
+            self._by_email[user["email"]] = user["id"]
+
+    # ── Sync ──────────────────────────────────────────────────────
+
+    async def refresh(self, request: Request, full_sync_interval: float):
+        async with self._lock:
+            started = time.time()
+            if not self._users or not self._synced_at or started - self._full_synced_at > full_sync_interval:
+                await self._full_sync(request)
+            else:
+                await self._sync_changed(request)
+            self._synced_at = started
+            self._save()
+
+    async def _fetch_all(self, request: Request, filter_: dict | None = None) -> list[dict]:
+        """All pages of `user.get`: the first page gives the total, the rest are fetched concurrently."""
+        params: dict = {"filter": filter_} if filter_ else {}
+        first = await request("user.get", {**params, "start": 0})
+        users = list(first.get("result") or [])
+        total = int(first.get("total") or len(users))
+        page = len(users) or 50
+        rest = await asyncio.gather(*(
+            request("user.get", {**params, "start": start})
+            for start in range(page, total, page)
+        ))
+        for result in rest:
+            users.extend(result.get("result") or [])
+        return users
+
+    async def _full_sync(self, request: Request):
+        users = await self._fetch_all(request)
+        self._users.clear()
+        self._by_nickname.clear()
+        self._by_email.clear()
+        for raw in users:
+            self.add_user(raw)
+        self._full_synced_at = time.time()
+        logger.info("Bitrix directory: full sync, %d users", len(self._users))
+
+    async def _sync_changed(self, request: Request):
+        """Re-read users created or edited since the previous sync."""
+        since = datetime.fromtimestamp(self._synced_at - SYNC_OVERLAP, timezone.utc)
+        users = await self._fetch_all(request, {">TIMESTAMP_X": since.isoformat(timespec="seconds")})
+        for raw in users:
+            self.add_user(raw)
+        if users:
+            logger.info("Bitrix directory: %d new or changed users", len(users))
+
+    # ── Persistence ───────────────────────────────────────────────
+
+    def _load(self):
+        if not self._path.exists():
+            return
+        try:
+            data = json.loads(self._path.read_text())
+        except (json.JSONDecodeError, OSError) as e:
+            logger.error("Failed to load Bitrix directory: %s", e)
+            return
+        for user in data.get("users", []):
+            self._index(user)
+        self._full_synced_at = data.get("full_synced_at", 0.0)
+        self._synced_at = data.get("synced_at", 0.0)
+        logger.info("Bitrix directory loaded: %d users", len(self._users))
+
+    def _save(self):
+        data = {
+            "full_synced_at": self._full_synced_at,
+            "synced_at": self._synced_at,
+            "users": list(self._users.values()),
+        }
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False))
+        os.replace(tmp, self._path)
@@ -3,6 +3,7 @@ import logging
 import httpx
 
 from app.config import settings
+from app.metrics import JIRA_REQUEST_SECONDS
 
 logger = logging.getLogger("smartsummary")
 
@@ -35,12 +36,13 @@ class JiraClient:
             }
         }
 
-        resp = await self._http.post(
-            url,
-            json=payload,
-            auth=(settings.jira_username, settings.jira_password),
-            headers={"Content-Type": "application/json"},
-        )
+        with JIRA_REQUEST_SECONDS.time(operation="create_issue"):
+            resp = await self._http.post(
+                url,
+                json=payload,
+                auth=(settings.jira_username, settings.jira_password),
+                headers={"Content-Type": "application/json"},
+            )
         resp.raise_for_status()
         result = resp.json()
 
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger("smartsummary")
+
+CACHE_FILE = Path(__file__).resolve().parent.parent.parent / "data" / "llm_cache.db"
+
+
+class LLMCache:
+    """Two-tier response cache: in-memory LRU in front of an SQLite table.
+
+    Entries expire after `ttl` seconds; each tier evicts its least recently
+    used entries once it grows past its size limit.
+    """
+
+    def __init__(self, ttl: int, memory_size: int, disk_size: int, path: Path | None = None):
+        path = path or CACHE_FILE
+        self._ttl = ttl
+        self._memory_size = memory_size
+        self._disk_size = disk_size
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self._db.commit()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(model: str, messages: list[dict], temperature: float, max_tokens: int) -> str:
+        payload = json.dumps(
+            [model, messages, temperature, max_tokens], ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            created_at, response = entry
+            if now - created_at < self._ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return response
+            del self._memory[key]
+
+        row = self._db.execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            response, created_at = row
+            if now - created_at < self._ttl:
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                self._remember(key, created_at, response)
+                self.disk_hits += 1
+                return response
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        self._remember(key, now, response)
+        self._db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, response, now, now)
+        )
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self._ttl,))
+        self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self._disk_size,),
+        )
+        self._db.commit()
+
+    def _remember(self, key: str, created_at: float, response: str):
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_size:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        self._memory.clear()
+        self._db.execute("DELETE FROM responses")
+        self._db.commit()
+
+    def stats(self) -> dict:
+        disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "disk_entries": disk_entries,
+        }
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,111 @@
+import asyncio
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `rate_per_minute`.
+
+    Waiters are served in FIFO order; a request larger than the bucket
+    capacity is clamped to the capacity so it can still proceed.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None):
+        self._rate = rate_per_minute / 60.0
+        self._capacity = capacity if capacity is not None else float(rate_per_minute)
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(amount, self._capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self._rate)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit: +1 slot per `limit` healthy calls, halved on throttling."""
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self._limit = float(initial)
+        self._minimum = minimum
+        self._maximum = maximum
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < int(self._limit))
+            self._in_flight += 1
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        self._limit = min(self._maximum, self._limit + 1 / self._limit)
+
+    def on_throttle(self):
+        self._limit = max(self._minimum, self._limit / 2)
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def retry_after_seconds(headers) -> float | None:
+    """Delay requested by the server, from `Retry-After` or OpenAI `x-ratelimit-reset-*` headers."""
+    if headers is None:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    delays = []
+    for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        value = headers.get(name)
+        if value:
+            parts = _DURATION_RE.findall(value)
+            if parts:
+                delays.append(sum(float(n) * _DURATION_UNITS[u] for n, u in parts))
+    return max(delays) if delays else None
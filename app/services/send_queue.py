@@ -0,0 +1,173 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from telethon.errors import FloodWaitError
+
+from app.config import settings
+from app.metrics import TELEGRAM_FLOOD_WAITS, TELEGRAM_SEND_QUEUE_DEPTH, TELEGRAM_SEND_SECONDS
+from app.services.rate_limit import TokenBucket
+
+logger = logging.getLogger("smartsummary")
+
+INTERACTIVE = 0  # ответы на команды в чатах
+BULK = 1  # дневной отчёт и прочие массовые отправки
+
+Send = Callable[[], Awaitable]
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    peer: str = field(compare=False)
+    kind: str = field(compare=False)
+    send: Send = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+def peer_key(peer) -> str:
+    """Pacing key: 'me', a chat id, or any other entity reference as a string."""
+    return str(peer)
+
+
+class SendQueue:
+    """Single outbound path for Telegram sends and edits.
+
+    Jobs are ordered by priority (interactive replies before bulk report
+    chunks), then FIFO; at most one job per peer is in flight, consecutive
+    sends to a peer are spaced by the per-peer interval and all sends share
+    a global rate. A FloodWaitError puts the job back in its place and
+    pauses the peer for the requested time instead of failing the caller.
+    """
+
+    _instance: "SendQueue | None" = None
+
+    def __init__(self):
+        self._queue: list[_Job] = []
+        self._seq = itertools.count()
+        self._ready_at: dict[str, float] = {}
+        self._busy: set[str] = set()
+        self._rate = TokenBucket(
+            settings.telegram_send_per_second * 60, capacity=settings.telegram_send_per_second
+        )
+        self._wakeup = asyncio.Event()
+        self._runner: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def get(cls) -> "SendQueue":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    # ── Public API ────────────────────────────────────────────────
+
+    async def submit(self, peer, send: Send, priority: int = INTERACTIVE, kind: str = "message"):
+        """Queue `send()` for `peer` and wait for its result."""
+        future = asyncio.get_running_loop().create_future()
+        bisect.insort(self._queue, _Job(priority, next(self._seq), peer_key(peer), kind, send, future))
+        TELEGRAM_SEND_QUEUE_DEPTH.inc()
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+        self._wakeup.set()
+        return await future
+
+    async def reply(self, event, text: str, priority: int = INTERACTIVE, **kwargs):
+        return await self.submit(event.chat_id, lambda: event.reply(text, **kwargs), priority)
+
+    async def send_message(self, client, entity, text: str, priority: int = INTERACTIVE, **kwargs):
+        return await self.submit(entity, lambda: client.send_message(entity, text, **kwargs), priority)
+
+    async def edit(self, message, text: str, priority: int = INTERACTIVE, **kwargs):
+        return await self.submit(message.chat_id, lambda: message.edit(text, **kwargs), priority, kind="edit")
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "queued": len(self._queue),
+            "in_flight": len(self._busy),
+            "next_send_in": {peer: round(at - now, 1) for peer, at in self._ready_at.items() if at > now},
+        }
+
+    async def close(self):
+        tasks = [t for t in (self._runner, *self._tasks) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._queue:
+            job.future.cancel()
+        self._queue.clear()
+
+    # ── Scheduling ────────────────────────────────────────────────
+
+    def _peer_interval(self, peer: str) -> float:
+        # группы и каналы (отрицательный id) Telegram ограничивает строже личных чатов
+        if peer.startswith("-"):
+            return settings.telegram_group_interval
+        return settings.telegram_peer_interval
+
+    def _next_job(self, now: float) -> tuple[_Job | None, float | None]:
+        """The first runnable job, or how long until one may become runnable."""
+        if any(job.future.done() for job in self._queue):
+            # вызывающий перестал ждать (отменён) — отправлять уже незачем
+            dropped = [job for job in self._queue if job.future.done()]
+            self._queue = [job for job in self._queue if not job.future.done()]
+            TELEGRAM_SEND_QUEUE_DEPTH.dec(len(dropped))
+        wait = None
+        for i, job in enumerate(self._queue):
+            if job.peer in self._busy:
+                continue
+            delay = self._ready_at.get(job.peer, 0.0) - now
+            if delay <= 0:
+                return self._queue.pop(i), None
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    async def _run(self):
+        while self._queue or self._busy:
+            self._wakeup.clear()
+            job, wait = self._next_job(time.monotonic())
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except TimeoutError:
+                    pass
+                continue
+            self._busy.add(job.peer)
+            await self._rate.acquire()
+            task = asyncio.create_task(self._send(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, job: _Job):
+        try:
+            with TELEGRAM_SEND_SECONDS.time(kind=job.kind):
+                result = await job.send()
+        except FloodWaitError as e:
+            TELEGRAM_FLOOD_WAITS.inc()
+            self._ready_at[job.peer] = time.monotonic() + e.seconds
+            if e.seconds > settings.telegram_max_flood_wait:
+                logger.error("Telegram flood wait %ss for %s, giving up", e.seconds, job.peer)
+                TELEGRAM_SEND_QUEUE_DEPTH.dec()
+                if not job.future.done():
+                    job.future.set_exception(e)
+            else:
+                logger.warning("Telegram flood wait %ss for %s, rescheduling", e.seconds, job.peer)
+                bisect.insort(self._queue, job)  # прежний seq — прежнее место в очереди
+        except Exception as e:
+            TELEGRAM_SEND_QUEUE_DEPTH.dec()
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            TELEGRAM_SEND_QUEUE_DEPTH.dec()
+            self._ready_at[job.peer] = time.monotonic() + self._peer_interval(job.peer)
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            self._busy.discard(job.peer)
+            self._wakeup.set()
@@ -1,10 +1,16 @@
 import asyncio
+import logging
 import re
+import time
 
 from telethon import TelegramClient
+from telethon.errors import MessageNotModifiedError
 from telethon.sessions import StringSession
 
 from app.config import settings
+from app.services.send_queue import BULK, SendQueue
+
+logger = logging.getLogger("smartsummary")
 
 TG_MSG_LIMIT = 4096
 
@@ -50,15 +56,87 @@ class TelegramService:
         )
         return text
 
-    async def send_long_message(self, text: str, parse_mode: str = "html"):
-        """Send a message to Saved Messages, splitting if > 4096 chars."""
-        while text:
-            if len(text) <= TG_MSG_LIMIT:
-                await self._client.send_message("me", text, parse_mode=parse_mode)
-                break
-            cut = text.rfind("\n", 0, TG_MSG_LIMIT)
+    @staticmethod
+    def split_text(text: str, limit: int = TG_MSG_LIMIT) -> list[str]:
+        """Split text into chunks of at most `limit` chars, preferably on newlines."""
+        chunks = []
+        while len(text) > limit:
+            cut = text.rfind("\n", 0, limit)
             if cut == -1:
-                cut = TG_MSG_LIMIT
-            await self._client.send_message("me", text[:cut], parse_mode=parse_mode)
+                cut = limit
+            chunks.append(text[:cut])
             text = text[cut:].lstrip("\n")
-            await asyncio.sleep(2)
+        chunks.append(text)
+        return chunks
+
+    async def send_long_message(self, text: str, parse_mode: str = "html"):
+        """Send a message to Saved Messages, splitting if > 4096 chars.
+
+        Chunks go through the send queue as bulk traffic, paced there.
+        """
+        queue = SendQueue.get()
+        await asyncio.gather(*(
+            queue.send_message(self._client, "me", chunk, priority=BULK, parse_mode=parse_mode)
+            for chunk in self.split_text(text)
+        ))
+
+
+class StreamingReply:
+    """Reply to a message with text that is still being generated.
+
+    Posts a placeholder, then edits it as the text grows, at most once per
+    `edit_interval` seconds (Telegram rate-limits edits). Text beyond 4096
+    chars continues in follow-up replies.
+    """
+
+    def __init__(
+        self,
+        event,
+        header: str = "",
+        placeholder: str = "⏳",
+        parse_mode: str = "html",
+        edit_interval: float = 1.5,
+    ):
+        self._event = event
+        self._header = header
+        self._placeholder = placeholder
+        self._parse_mode = parse_mode
+        self._edit_interval = edit_interval
+        self._messages: list = []
+        self._shown: list[str] = []
+        self._last_edit = 0.0
+
+    async def start(self):
+        msg = await SendQueue.get().reply(
+            self._event, self._header + self._placeholder, parse_mode=self._parse_mode
+        )
+        self._messages.append(msg)
+        self._shown.append(self._header + self._placeholder)
+        self._last_edit = time.monotonic()
+
+    async def update(self, text: str):
+        if time.monotonic() - self._last_edit < self._edit_interval:
+            return
+        await self._render(text)
+
+    async def finish(self, text: str):
+        await self._render(text)
+
+    async def _render(self, text: str):
+        pages = TelegramService.split_text(self._header + text)
+        for i, page in enumerate(pages):
+            if not page.strip():
+                continue
+            if i < len(self._messages):
+                if self._shown[i] == page:
+                    continue
+                try:
+                    await SendQueue.get().edit(self._messages[i], page, parse_mode=self._parse_mode)
+                except MessageNotModifiedError:
+                    pass
+                self._shown[i] = page
+            else:
+                msg = await SendQueue.get().reply(self._event, page, parse_mode=self._parse_mode)
+                self._messages.append(msg)
+                self._shown.append(page)
+        self._last_edit = time.monotonic()
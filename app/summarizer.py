@@ -1,13 +1,22 @@
+import asyncio
 import logging
-from datetime import datetime
+from collections.abc import Awaitable, Callable
+from contextlib import nullcontext
+from datetime import date, datetime
 from zoneinfo import ZoneInfo
 
 from app.config import settings
+from app.message_store import MessageStore
+from app.metrics import TELEGRAM_FETCH_SECONDS, TRANSCRIPT_TOKENS
 from app.services.ai_client import AIClient
 from app.services.telegram_service import TelegramService
+from app.tokenizer import count_tokens
+from app.transcript import compact_transcript, compaction_report
 
 logger = logging.getLogger("smartsummary")
 
+ProgressCallback = Callable[[str], Awaitable[None]]
+
 TASK_SUMMARY_PROMPT = """\
 Проанализируй эту переписку из Telegram чата.
 
@@ -39,6 +48,94 @@ DAILY_OVERVIEW_PROMPT = """\
 Саммари чатов:
 """
 
+MERGE_SUMMARY_PROMPT = """\
+Ниже — саммари переписки из Telegram чата за сегодня и новые сообщения, \
+которые появились после него.
+
+Обнови саммари с учётом новых сообщений, сохранив формат:
+1. <b>Краткое резюме</b> — о чём шла речь (2-3 предложения)
+2. <b>Задачи и ответственные</b> — кто какие задачи взял на себя или кому что поручили. \
+Формат: "Имя — задача". Если задач нет — напиши "Явных задач не обнаружено."
+3. <b>Ключевые решения</b> — что было решено или согласовано
+
+Не теряй задачи и решения из текущего саммари, если новые сообщения их не отменяют. \
+Пиши на русском, кратко и по делу. Для выделения используй HTML-тег <b>...</b>, НЕ markdown.
+
+Текущее саммари:
+{summary}
+
+Новые сообщения:
+"""
+
+CHUNK_SUMMARY_PROMPT = """\
+Это фрагмент {index} из {total} длинной переписки из Telegram чата. \
+Кратко перечисли по этому фрагменту:
+- о чём шла речь;
+- задачи и ответственные в формате "Имя — задача";
+- принятые решения и договорённости.
+
+Только факты из фрагмента, без вступления и выводов. Пиши на русском.
+
+Фрагмент:
+"""
+
+REDUCE_SUMMARY_PROMPT = """\
+Ниже — конспекты последовательных фрагментов одной переписки из Telegram чата.
+
+Объедини их и сделай:
+1. <b>Краткое резюме</b> — о чём шла речь (2-3 предложения)
+2. <b>Задачи и ответственные</b> — кто какие задачи взял на себя или кому что поручили. \
+Формат: "Имя — задача". Если задач нет — напиши "Явных задач не обнаружено."
+3. <b>Ключевые решения</b> — что было решено или согласовано
+
+Пиши на русском, кратко и по делу. Для выделения используй HTML-тег <b>...</b>, НЕ markdown.
+
+Конспекты:
+"""
+
+NOTHING_TO_SUMMARIZE = "В сообщениях нет текста для суммаризации."
+
+
+def _output_tokens(input_tokens: int) -> int:
+    """Answer budget for a prompt of `input_tokens`: a share of it, within the configured bounds."""
+    scaled = int(input_tokens * settings.summary_output_ratio)
+    return max(settings.summary_min_output_tokens, min(settings.summary_max_output_tokens, scaled))
+
+
+def _split_chunks(items: list[str], max_tokens: int, sep: str = "\n") -> list[str]:
+    """Pack items into consecutive chunks of at most `max_tokens` each.
+
+    An item larger than the budget gets a chunk of its own; nothing is dropped.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    current_tokens = 0
+    for item in items:
+        tokens = count_tokens(item)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(sep.join(current))
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        chunks.append(sep.join(current))
+    return chunks
+
+
+async def _map_chunks(chunks: list[str]) -> list[str]:
+    """Summarize chunks concurrently, preserving their order."""
+    ai = AIClient.get()
+    semaphore = asyncio.Semaphore(settings.summary_map_concurrency)
+
+    async def summarize_chunk(index: int, chunk: str) -> str:
+        prompt = CHUNK_SUMMARY_PROMPT.format(index=index, total=len(chunks)) + chunk
+        async with semaphore:
+            return await ai.complete(prompt, max_tokens=_output_tokens(count_tokens(chunk)))
+
+    return list(await asyncio.gather(
+        *(summarize_chunk(i, chunk) for i, chunk in enumerate(chunks, 1))
+    ))
+
 
 def _format_messages(msgs: list[dict]) -> str:
     return "\n".join(
@@ -47,52 +144,208 @@ def _format_messages(msgs: list[dict]) -> str:
     )
 
 
+def _render_transcript(msgs: list[dict], chat_id: int | None = None) -> tuple[str, list[str]]:
+    """Prompt transcript as (legend, blocks): compacted unless disabled, savings recorded."""
+    if not settings.transcript_compaction:
+        return "", [_format_messages([m]) for m in msgs]
+
+    compact = compact_transcript(msgs, ZoneInfo(settings.timezone))
+    raw_tokens = count_tokens(_format_messages(msgs))
+    tokens = count_tokens(compact.legend + "\n".join(compact.blocks))
+    compaction_report.record(chat_id, len(msgs), raw_tokens, tokens, compact.dropped)
+    TRANSCRIPT_TOKENS.inc(raw_tokens, stage="raw")
+    TRANSCRIPT_TOKENS.inc(tokens, stage="compact")
+    logger.info(
+        "Transcript compacted: chat=%s, messages=%d (-%d), tokens %d → %d",
+        chat_id, len(msgs), compact.dropped, raw_tokens, tokens,
+    )
+    return compact.legend, compact.blocks
+
+
+def _newest_within(msgs: list[dict], budget: int) -> list[dict]:
+    """The newest of `msgs` (oldest first) whose transcript fits in `budget` tokens, at least one.
+
+    Measured on the plain `_format_messages` rendering, not on the compacted
+    transcript actually sent: compaction depends on the whole window (aliases,
+    grouping), and the plain size is in practice an upper bound of it, so the prompt ends
+    up at or below the budget.
+    """
+    tokens = 0
+    for i in range(len(msgs) - 1, -1, -1):
+        tokens += count_tokens(_format_messages([msgs[i]]))
+        if tokens > budget and i < len(msgs) - 1:
+            return msgs[i + 1:]
+    return msgs
+
+
+def _message_to_dict(m) -> dict:
+    return {
+        "id": m.id,
+        "sender_id": m.sender_id,
+        "sender": getattr(m.sender, "first_name", str(m.sender_id)),
+        "text": m.raw_text,
+        "date": m.date.isoformat(),
+    }
+
+
 async def _fetch_messages(chat_id: int, since: datetime | None = None, limit: int = 500) -> list[dict]:
-    """Fetch messages from a chat. If `since` is given, only messages after that time."""
-    tg = TelegramService.get()
-    client = tg.client
+    """Fetch messages from a chat, oldest first.
+
+    If `since` is given, returns every message after that time (`limit` is
+    ignored); otherwise the newest messages, at most `limit` of them and at
+    most `settings.summary_fetch_tokens` tokens of plain transcript (see
+    `_newest_within`).
+
+    Served from the local MessageStore when it is known to hold the whole
+    window; otherwise fetched from Telegram and written back to the store.
+    """
+    store = MessageStore.get()
 
     if since:
+        if store.covers(chat_id, since):
+            with TELEGRAM_FETCH_SECONDS.time(source="store"):
+                result = store.get_since(chat_id, since)
+            logger.info("Local store hit: chat=%s, messages=%d", chat_id, len(result))
+            return result
+
+        tg = TelegramService.get()
         tz = ZoneInfo(settings.timezone)
         now = datetime.now(tz)
-        messages = await client.get_messages(chat_id, limit=limit, offset_date=now)
         result = []
-        for m in messages:
-            if not m.raw_text:
-                continue
-            msg_time = m.date.astimezone(tz)
-            if msg_time < since:
-                break
-            result.append({
-                "sender": getattr(m.sender, "first_name", str(m.sender_id)),
-                "text": m.raw_text,
-                "date": m.date.isoformat(),
-            })
+        with TELEGRAM_FETCH_SECONDS.time(source="telegram"):
+            async for m in tg.client.iter_messages(chat_id, offset_date=now):
+                msg_time = m.date.astimezone(tz)
+                if msg_time < since:
+                    break
+                if not m.raw_text:
+                    continue
+                result.append(_message_to_dict(m))
+        result.reverse()
+
+        store.add_many(chat_id, result)
+        store.mark_covered(chat_id, since)
         return result
     else:
-        messages = await client.get_messages(chat_id, limit=limit)
-        return [
-            {
-                "sender": getattr(m.sender, "first_name", str(m.sender_id)),
-                "text": m.raw_text or "",
-                "date": m.date.isoformat(),
-            }
-            for m in messages
-            if m.raw_text
-        ]
-
-
-async def _summarize_messages(msgs: list[dict], max_tokens: int = 1024) -> str:
-    """Run GPT summarization on a list of messages."""
-    conversation = _format_messages(msgs)
+        budget = settings.summary_fetch_tokens
+        stored = store.get_recent(chat_id, limit)
+        recent = _newest_within(stored, budget)
+        complete = len(stored) == limit or len(recent) < len(stored)
+        if recent and complete and store.covers(chat_id, datetime.fromisoformat(recent[0]["date"])):
+            logger.info("Local store hit: chat=%s, messages=%d", chat_id, len(recent))
+            return recent
+
+        tg = TelegramService.get()
+        result = []
+        tokens = 0
+        with TELEGRAM_FETCH_SECONDS.time(source="telegram"):
+            # постранично, от новых к старым — и не дальше, чем нужно для бюджета
+            async for m in tg.client.iter_messages(chat_id, limit=limit):
+                if not m.raw_text:
+                    continue
+                msg = _message_to_dict(m)
+                tokens += count_tokens(_format_messages([msg]))
+                if tokens > budget and result:
+                    break
+                result.append(msg)
+        result.reverse()
+        store.add_many(chat_id, result)
+        return result
+
+
+async def _complete(prompt: str, max_tokens: int, on_progress: ProgressCallback | None = None) -> str:
+    """ai.complete, or ai.stream reporting the text so far to `on_progress`."""
     ai = AIClient.get()
-    return await ai.complete(TASK_SUMMARY_PROMPT + conversation, max_tokens=max_tokens)
+    if on_progress is None:
+        return await ai.complete(prompt, max_tokens=max_tokens)
+
+    text = ""
+    async for delta in ai.stream(prompt, max_tokens=max_tokens):
+        text += delta
+        await on_progress(text)
+    return text.strip()
+
+
+async def _summarize_messages(
+    msgs: list[dict],
+    max_tokens: int | None = None,
+    prompt: str = TASK_SUMMARY_PROMPT,
+    reduce_prompt: str = REDUCE_SUMMARY_PROMPT,
+    on_progress: ProgressCallback | None = None,
+    chat_id: int | None = None,
+    empty: str = NOTHING_TO_SUMMARIZE,
+) -> str:
+    """Run GPT summarization on a list of messages.
+
+    Transcripts over `settings.summary_chunk_tokens` go through map-reduce:
+    token-bounded chunks are summarized concurrently, the partial summaries
+    are combined level by level until they fit, and `reduce_prompt` produces
+    the final answer. With `on_progress`, the final call is streamed.
+    `max_tokens` defaults to a share of the transcript size (`_output_tokens`).
+    If compaction leaves nothing (only emoji and empty messages), `empty` is
+    returned without calling the model.
+    """
+    legend, blocks = _render_transcript(msgs, chat_id)
+    if not blocks:
+        logger.info("Nothing to summarize after compaction: chat=%s, messages=%d", chat_id, len(msgs))
+        return empty
+    conversation = legend + "\n".join(blocks)
+    conversation_tokens = count_tokens(conversation)
+    if max_tokens is None:
+        max_tokens = _output_tokens(conversation_tokens)
+    budget = settings.summary_chunk_tokens
+    if conversation_tokens <= budget:
+        return await _complete(prompt + conversation, max_tokens, on_progress)
+
+    chunks = [legend + chunk for chunk in _split_chunks(blocks, budget - count_tokens(legend))]
+    logger.info(">>> MAP-REDUCE SUMMARY: messages=%d, chunks=%d", len(msgs), len(chunks))
+    partials = await _map_chunks(chunks)
+
+    while len(partials) > 1 and count_tokens("\n\n".join(partials)) > budget:
+        groups = _split_chunks(partials, budget, sep="\n\n")
+        if len(groups) == len(partials):
+            break
+        logger.info(">>> MAP-REDUCE LEVEL: partials=%d, groups=%d", len(partials), len(groups))
+        partials = await _map_chunks(groups)
+
+    return await _complete(reduce_prompt + "\n\n".join(partials), max_tokens, on_progress)
+
+
+async def _summarize_day(
+    chat_id: int, day: date, msgs: list[dict], on_progress: ProgressCallback | None = None
+) -> str:
+    """Summarize a chat's day, reusing the per-chat checkpoint when possible.
+
+    With a checkpoint for `day`, only messages newer than the last summarized
+    one are sent to the model and merged into the running summary.
+    """
+    if not settings.incremental_summaries:
+        return await _summarize_messages(msgs, on_progress=on_progress, chat_id=chat_id)
+
+    store = MessageStore.get()
+    checkpoint = store.get_checkpoint(chat_id, day)
+    if checkpoint:
+        last_msg_id, summary = checkpoint
+        new_msgs = [m for m in msgs if m["id"] > last_msg_id]
+        if not new_msgs:
+            logger.info("Summary checkpoint is up to date: chat=%s", chat_id)
+            return summary
+        logger.info("Incremental summary: chat=%s, new messages=%d", chat_id, len(new_msgs))
+        prompt = MERGE_SUMMARY_PROMPT.format(summary=summary)
+        result = await _summarize_messages(
+            new_msgs, prompt=prompt, reduce_prompt=prompt, on_progress=on_progress, chat_id=chat_id,
+            empty=summary,
+        )
+    else:
+        result = await _summarize_messages(msgs, on_progress=on_progress, chat_id=chat_id)
+
+    store.save_checkpoint(chat_id, day, max(m["id"] for m in msgs), result)
+    return result
 
 
 async def summarize(chat_id: int, use_buffer: bool = False, limit: int = 200) -> str:
     if use_buffer:
         from app.chat_state import state
-        msgs = state.get_messages(chat_id)
+        msgs = _newest_within(state.get_messages(chat_id, limit), settings.summary_fetch_tokens)
     else:
         msgs = await _fetch_messages(chat_id, limit=limit)
 
@@ -100,13 +353,16 @@ async def summarize(chat_id: int, use_buffer: bool = False, limit: int = 200) ->
         return "Нет сообщений для суммаризации."
 
     logger.info(">>> SUMMARIZE REQUEST: chat=%s, messages=%d", chat_id, len(msgs))
-    result = await _summarize_messages(msgs)
+    result = await _summarize_messages(msgs, chat_id=chat_id)
     logger.info("<<< SUMMARIZE RESPONSE:\n%s", result)
     return result
 
 
-async def summarize_chat_for_trigger(chat_id: int) -> str:
-    """Summarize today's messages for in-chat trigger."""
+async def summarize_chat_for_trigger(chat_id: int, on_progress: ProgressCallback | None = None) -> str:
+    """Summarize today's messages for in-chat trigger.
+
+    `on_progress` receives the partial summary while it is being generated.
+    """
     tz = ZoneInfo(settings.timezone)
     start_of_day = datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
 
@@ -115,7 +371,7 @@ async def summarize_chat_for_trigger(chat_id: int) -> str:
         return "За сегодня в этом чате нет сообщений."
 
     logger.info(">>> TRIGGER SUMMARIZE: chat=%s, messages=%d", chat_id, len(msgs))
-    result = await _summarize_messages(msgs)
+    result = await _summarize_day(chat_id, start_of_day.date(), msgs, on_progress)
     logger.info("<<< TRIGGER SUMMARIZE RESPONSE:\n%s", result)
     return result
 
@@ -145,30 +401,39 @@ def _build_chat_link(entity) -> str:
     return str(getattr(entity, "title", None) or getattr(entity, "first_name", str(entity)))
 
 
-async def summarize_single_chat(chat_id: int) -> tuple[str, str, str] | None:
+async def summarize_single_chat(
+    chat_id: int,
+    fetch_limit: asyncio.Semaphore | None = None,
+    ai_limit: asyncio.Semaphore | None = None,
+) -> tuple[str, str, str] | None:
     """Summarize a single chat's today messages.
 
+    `fetch_limit` and `ai_limit` bound concurrent Telegram reads and AI calls
+    when many chats are summarized at once.
+
     Returns (chat_name, chat_link_html, summary_text) or None if no messages.
     """
     tg = TelegramService.get()
     client = tg.client
-    try:
-        entity = await client.get_entity(chat_id)
-    except Exception as e:
-        logger.error("Error getting entity for chat %s: %s", chat_id, e)
-        return None
+    tz = ZoneInfo(settings.timezone)
+    start_of_day = datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    async with fetch_limit or nullcontext():
+        try:
+            entity = await client.get_entity(chat_id)
+        except Exception as e:
+            logger.error("Error getting entity for chat %s: %s", chat_id, e)
+            return None
+        msgs = await _fetch_messages(chat_id, since=start_of_day)
 
     chat_name = getattr(entity, "title", None) or getattr(entity, "first_name", str(chat_id))
     chat_link = _build_chat_link(entity)
-
-    tz = ZoneInfo(settings.timezone)
-    start_of_day = datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
-    msgs = await _fetch_messages(chat_id, since=start_of_day)
     if not msgs:
         return None
 
     logger.info(">>> SINGLE CHAT SUMMARY: chat=%s (%s), messages=%d", chat_id, chat_name, len(msgs))
-    summary = await _summarize_messages(msgs)
+    async with ai_limit or nullcontext():
+        summary = await _summarize_day(chat_id, start_of_day.date(), msgs)
     logger.info("<<< SINGLE CHAT SUMMARY for %s:\n%s", chat_name, summary)
     return chat_name, chat_link, summary
 
@@ -0,0 +1,65 @@
+import logging
+import os
+from pathlib import Path
+
+from app.config import settings
+
+logger = logging.getLogger("smartsummary")
+
+CACHE_DIR = Path(__file__).resolve().parent.parent / "data" / "tiktoken"
+FALLBACK_ENCODING = "o200k_base"  # кодировка моделей GPT-4o и новее
+
+
+class Tokenizer:
+    """Local token counts for `settings.openai_model`.
+
+    Uses tiktoken (optional dependency, `pip install .[tokens]`). Its BPE
+    file is downloaded on first use and cached under data/tiktoken, so
+    `load` runs during warm-up in a thread. Until it has loaded, or when
+    tiktoken is missing or the download fails, counts are estimated at
+    ~3 characters per token.
+    """
+
+    _instance: "Tokenizer | None" = None
+
+    def __init__(self):
+        self._encoding = None
+
+    @classmethod
+    def get(cls) -> "Tokenizer":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def load(self):
+        """Load the model's encoding (blocking: may download it)."""
+        try:
+            import tiktoken
+        except ImportError:
+            logger.info("tiktoken is not installed, token counts are estimated from length")
+            return
+
+        os.environ.setdefault("TIKTOKEN_CACHE_DIR", str(CACHE_DIR))
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(settings.openai_model)
+            except KeyError:
+                encoding = tiktoken.get_encoding(FALLBACK_ENCODING)
+        except Exception as e:
+            logger.warning("Tokenizer unavailable (%s), token counts are estimated from length", e)
+            return
+        self._encoding = encoding
+        logger.info("Tokenizer loaded: %s for %s", encoding.name, settings.openai_model)
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            return len(text) // 3 + 1  # смесь русского и английского — около 3 символов на токен
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str) -> int:
+    return Tokenizer.get().count(text)
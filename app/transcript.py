@@ -0,0 +1,141 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from zoneinfo import ZoneInfo
+
+from app.config import settings
+
+URL_RE = re.compile(r"https?://\S+")
+
+
+@dataclass
+class CompactTranscript:
+    legend: str  # расшифровка сокращённых имён, "" если сокращений нет
+    blocks: list[str]  # по блоку на серию сообщений одного автора
+    dropped: int  # выброшено повторов и сообщений без текста
+
+
+def shorten_urls(text: str, max_length: int) -> str:
+    """Replace URLs longer than `max_length` with their host: 'example.com/…'."""
+
+    def shorten(match: re.Match) -> str:
+        url = match.group(0)
+        if len(url) <= max_length:
+            return url
+        host = urlsplit(url).netloc.removeprefix("www.")
+        return f"{host}/…" if host else url
+
+    return URL_RE.sub(shorten, text)
+
+
+def is_noise(text: str) -> bool:
+    """Emoji, reactions and punctuation only: nothing a summary could use."""
+    return not any(ch.isalnum() for ch in text)
+
+
+def _aliases(names: list[str], min_length: int) -> dict[str, str]:
+    """Initials for long names that start more than one block ('Константин Петров' → 'КП')."""
+    counts: dict[str, int] = {}
+    for name in names:
+        counts[name] = counts.get(name, 0) + 1
+    aliases: dict[str, str] = {}
+    taken = set(counts)  # сокращение не должно совпасть с чьим-то настоящим именем
+    for name, count in counts.items():
+        if len(name) < min_length or count < 2:
+            continue
+        initials = "".join(word[0] for word in name.split() if word[0].isalnum()).upper() or "У"
+        alias, n = initials, 1
+        while alias in taken:
+            n += 1
+            alias = f"{initials}{n}"
+        taken.add(alias)
+        aliases[name] = alias
+    return aliases
+
+
+def compact_transcript(msgs: list[dict], tz: ZoneInfo) -> CompactTranscript:
+    """Render messages for a prompt with as few tokens as possible.
+
+    Times become HH:MM (with a date line when the day changes), consecutive
+    messages of one sender within `transcript_group_minutes` share a header,
+    long names are replaced by initials explained in the legend and long URLs
+    by their host. A sender's exact repeat within `transcript_group_minutes`
+    of the previous copy (a double send) and messages without any letters or
+    digits are dropped; a short reply that recurs later ("да", "ок") is kept.
+    """
+    group_gap = timedelta(minutes=settings.transcript_group_minutes)
+    seen: dict[tuple[str, str], datetime] = {}
+    dropped = 0
+    groups: list[tuple[str, datetime, list[str]]] = []
+    last_at: datetime | None = None
+
+    for m in msgs:
+        sender = str(m.get("sender") or m.get("sender_id") or "?")
+        text = (m.get("text") or "").strip()
+        if not text or is_noise(text):
+            dropped += 1
+            continue
+        at = datetime.fromisoformat(m["date"]).astimezone(tz)
+        previous = seen.get((sender, text))
+        seen[(sender, text)] = at
+        if previous is not None and at - previous <= group_gap:
+            dropped += 1
+            continue
+        text = shorten_urls(text, settings.transcript_url_max_length)
+        if groups and groups[-1][0] == sender and last_at is not None and at - last_at <= group_gap:
+            groups[-1][2].append(text)
+        else:
+            groups.append((sender, at, [text]))
+        last_at = at
+
+    aliases = _aliases([sender for sender, _, _ in groups], settings.transcript_alias_min_length)
+    multi_day = len({at.date() for _, at, _ in groups}) > 1
+    blocks: list[str] = []
+    day = None
+    for sender, at, texts in groups:
+        header = f"{at:%H:%M} {aliases.get(sender, sender)}: "
+        if multi_day and at.date() != day:
+            day = at.date()
+            header = f"— {at:%d.%m} —\n" + header
+        blocks.append(header + "\n".join(texts))
+
+    legend = ""
+    if aliases:
+        legend = "Сокращения имён (в ответе пиши полные): " + ", ".join(
+            f"{alias} — {name}" for name, alias in aliases.items()
+        ) + "\n\n"
+    return CompactTranscript(legend, blocks, dropped)
+
+
+class CompactionReport:
+    """Tokens saved by transcript compaction: the last transcript of each chat and running totals."""
+
+    def __init__(self):
+        self._chats: dict[str, dict] = {}
+        self._total = {"transcripts": 0, "raw_tokens": 0, "tokens": 0, "dropped_messages": 0}
+
+    def record(self, chat_id: int | None, messages: int, raw_tokens: int, tokens: int, dropped: int):
+        self._total["transcripts"] += 1
+        self._total["raw_tokens"] += raw_tokens
+        self._total["tokens"] += tokens
+        self._total["dropped_messages"] += dropped
+        if chat_id is not None:
+            self._chats[str(chat_id)] = {
+                "messages": messages,
+                "dropped_messages": dropped,
+                "raw_tokens": raw_tokens,
+                "tokens": tokens,
+                "saved_pct": _saved_pct(raw_tokens, tokens),
+            }
+
+    def snapshot(self) -> dict:
+        total = dict(self._total, saved_pct=_saved_pct(self._total["raw_tokens"], self._total["tokens"]))
+        return {"enabled": settings.transcript_compaction, "total": total, "chats": dict(self._chats)}
+
+
+def _saved_pct(raw_tokens: int, tokens: int) -> float:
+    return round(100 * (raw_tokens - tokens) / raw_tokens, 1) if raw_tokens else 0.0
+
+
+compaction_report = CompactionReport()
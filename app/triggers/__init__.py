@@ -1,53 +1,123 @@
+import asyncio
 import logging
-import re
 
 from telethon import TelegramClient, events
+from telethon.tl.custom import Message
 
+from app.catch_up import CatchUp
 from app.chat_state import state
 from app.config import settings
+from app.dialog_index import DialogIndex
+from app.message_store import MessageStore
+from app.metrics import MESSAGES_RECEIVED, TRIGGER_SECONDS
+from app.services.send_queue import SendQueue
 from app.triggers.auto_reply import handle_greenkeev, handle_sitnikov
+from app.triggers.dispatcher import Trigger, TriggerDispatcher
 from app.triggers.free_slots import handle_find_time
 from app.triggers.jira_task import handle_create_task
 from app.triggers.meeting import handle_create_meeting
+from app.triggers.queue import trigger_queue
 from app.triggers.summarize import handle_summarize
 
 logger = logging.getLogger("smartsummary")
 
+# Порядок важен: триггеры срабатывают в порядке таблицы.
+TRIGGERS = [
+    Trigger("summarize", r"\s*суммаризация\s*\Z", handle_summarize),
+    Trigger("sitnikov", "ситников", handle_sitnikov, anchored=False, exclusive=False),
+    Trigger("greenkeev", "гринкеев", handle_greenkeev, anchored=False, exclusive=False),
+    Trigger("create_task", r"(?:сделай|создай)\s+задачу", handle_create_task),
+    Trigger("find_time", r"найди\s+время", handle_find_time),
+    Trigger("create_meeting", r"(?:сделай|создай)\s+встречу", handle_create_meeting),
+]
 
-def register_all(client: TelegramClient):
-    @client.on(events.NewMessage(incoming=True, outgoing=True))
-    async def on_new_message(event: events.NewMessage.Event):
-        chat_id = event.chat_id
-        sender = event.sender_id
-        text = event.raw_text or ""
+dispatcher = TriggerDispatcher(TRIGGERS)
+
+# фоновые ответы роутера: держим ссылки, пока задачи не завершатся
+_replies: set[asyncio.Task] = set()
+
+
+async def on_new_message(event: events.NewMessage.Event | Message, fire_triggers: bool = True):
+    """Route a message: track activity, store it, queue matching triggers.
+
+    Takes a live NewMessage event or, from the catch-up, a fetched Message
+    (events proxy the same attributes to their message).
+    """
+    chat_id = event.chat_id
+    sender = event.sender_id
+    text = event.raw_text or ""
+
+    chat = event.chat  # из кэша сущностей, без запроса к Telegram
+    DialogIndex.get().touch(
+        chat_id,
+        event.date,
+        kind="user" if event.is_private else "group" if event.is_group else "channel",
+        name=getattr(chat, "title", None) or getattr(chat, "first_name", None),
+        incoming=not event.out,
+    )
+    MessageStore.get().mark_handled(chat_id, event.id)
+
+    if not text:
+        return
 
-        if not text:
-            return
+    MESSAGES_RECEIVED.inc()
 
-        logger.debug("[msg] chat=%s sender=%s text=%s", chat_id, sender, text[:80])
+    logger.debug("[msg] chat=%s sender=%s text=%s", chat_id, sender, text[:80])
 
-        if sender == settings.my_user_id:
-            state.track_outgoing(chat_id)
+    if sender == settings.my_user_id:
+        state.track_outgoing(chat_id)
+    else:
+        state.track_incoming(chat_id)
 
-        if sender != settings.my_user_id:
-            state.track_incoming(chat_id)
+    to_run: list[Trigger] = []
+    for trigger in dispatcher.match(text):
+        to_run.append(trigger)
+        if trigger.exclusive:
+            break
 
-        if text.lower().strip() == "суммаризация":
-            return await handle_summarize(event)
+    if not to_run or not to_run[-1].exclusive:
+        sender_name = getattr(event.sender, "first_name", None) or getattr(event.sender, "title", None)
+        state.buffer_message(chat_id, event.id, sender, sender_name, text, event.date)
 
-        if "ситников" in text.lower():
-            await handle_sitnikov(event)
+    if not to_run or not fire_triggers:
+        return
 
-        if "гринкеев" in text.lower():
-            await handle_greenkeev(event)
+    async def run_triggers():
+        for trigger in to_run:
+            with TRIGGER_SECONDS.time(trigger=trigger.name):
+                await trigger.handler(event)
 
-        if re.match(r"(?i)(сделай|создай)\s+задачу", text):
-            return await handle_create_task(event)
+    name = "+".join(t.name for t in to_run)
+    if not trigger_queue.submit(chat_id, name, run_triggers):
+        task = asyncio.create_task(
+            SendQueue.get().reply(event, "⏳ Слишком много запросов в этом чате, повтори чуть позже")
+        )
+        _replies.add(task)
+        task.add_done_callback(_reply_done)
+
+
+def _reply_done(task: asyncio.Task):
+    _replies.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Trigger queue reply failed: %s", task.exception())
+
+
+def register_all(client: TelegramClient):
+    catch_up = CatchUp.get()
+
+    @client.on(events.NewMessage(incoming=True, outgoing=True))
+    async def on_live_message(event: events.NewMessage.Event):
+        catch_up.note_live(event.chat_id, event.id)
+        await on_new_message(event)
 
-        if re.match(r"(?i)найди\s+время", text):
-            return await handle_find_time(event)
+    @client.on(events.MessageEdited())
+    async def on_edited_message(event: events.MessageEdited.Event):
+        MessageStore.get().edit(event.chat_id, event.id, event.raw_text or "")
 
-        if re.match(r"(?i)(сделай|создай)\s+встречу", text):
-            return await handle_create_meeting(event)
+    @client.on(events.MessageDeleted())
+    async def on_deleted_messages(event: events.MessageDeleted.Event):
+        MessageStore.get().delete(event.chat_id, event.deleted_ids)
 
-        state.buffer_message(chat_id, sender, text, event.date)
+    @client.on(events.MessageRead(inbox=True))
+    async def on_inbox_read(event: events.MessageRead.Event):
+        DialogIndex.get().mark_read(event.chat_id)
@@ -4,6 +4,7 @@ import random
 from telethon import events
 
 from app.services.ai_client import AIClient
+from app.services.send_queue import SendQueue
 from app.utils import strip_numbered_item
 
 logger = logging.getLogger("smartsummary")
@@ -46,11 +47,11 @@ async def handle_sitnikov(event: events.NewMessage.Event):
     logger.info("*** TRIGGER: 'ситников' in chat=%s from sender=%s", chat_id, sender)
     try:
         ai = AIClient.get()
-        text = await ai.complete(SENECA_PROMPT, max_tokens=500, temperature=1.2)
+        text = await ai.complete(SENECA_PROMPT, max_tokens=500, temperature=1.2, cache=False)
         logger.info("<<< GPT SENECA RESPONSE:\n%s", text)
         quote = await _pick_one(text)
         logger.info("=== Selected Seneca quote: %s", quote)
-        await event.reply(quote)
+        await SendQueue.get().reply(event, quote)
     except Exception as e:
         logger.error("*** ERROR getting Seneca quote: %s", e, exc_info=True)
 
@@ -62,10 +63,10 @@ async def handle_greenkeev(event: events.NewMessage.Event):
     logger.info("*** Message: %s", event.raw_text)
     try:
         ai = AIClient.get()
-        text = await ai.complete(PIG_FACTS_PROMPT, max_tokens=500, temperature=1.2)
+        text = await ai.complete(PIG_FACTS_PROMPT, max_tokens=500, temperature=1.2, cache=False)
         logger.info("<<< GPT RESPONSE (full):\n%s", text)
         fact = await _pick_one(text)
         logger.info("=== Selected fact: %s", fact)
-        await event.reply(fact)
+        await SendQueue.get().reply(event, fact)
     except Exception as e:
         logger.error("*** ERROR getting pig fact: %s", e, exc_info=True)
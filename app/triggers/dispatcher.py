@@ -0,0 +1,62 @@
+import re
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Trigger:
+    """A keyword trigger.
+
+    `pattern` is a regex over the lowercased message text. Anchored triggers
+    must match at the start of the message; the rest match anywhere. After an
+    exclusive trigger fires, dispatch stops and the message is not stored.
+    """
+
+    name: str
+    pattern: str
+    handler: Callable[..., Awaitable]
+    anchored: bool = True
+    exclusive: bool = True
+
+
+class TriggerDispatcher:
+    """Finds every trigger in a message with precompiled combined patterns.
+
+    The text is lowercased once. Anchored triggers share one alternation
+    matched at the start of the text; floating triggers share one search
+    pattern, and only on a hit (rare) is the text rescanned to name them.
+    """
+
+    def __init__(self, triggers: list[Trigger]):
+        self._triggers = triggers
+        anchored = [t for t in triggers if t.anchored]
+        floating = [t for t in triggers if not t.anchored]
+        self._anchored = self._compile(anchored, named=True)
+        self._floating = self._compile(floating, named=False)
+        self._floating_named = self._compile(floating, named=True)
+
+    @staticmethod
+    def _compile(triggers: list[Trigger], named: bool) -> re.Pattern | None:
+        if not triggers:
+            return None
+        if named:
+            return re.compile("|".join(f"(?P<{t.name}>{t.pattern})" for t in triggers))
+        return re.compile("(?:" + "|".join(f"(?:{t.pattern})" for t in triggers) + ")")
+
+    @property
+    def triggers(self) -> list[Trigger]:
+        return self._triggers
+
+    def match(self, text: str) -> list[Trigger]:
+        """Triggers found in `text`, in registration order."""
+        low = text.lower()
+        hits = set()
+        if self._anchored is not None:
+            m = self._anchored.match(low)
+            if m:
+                hits.add(m.lastgroup)
+        if self._floating is not None and self._floating.search(low):
+            hits.update(m.lastgroup for m in self._floating_named.finditer(low))
+        if not hits:
+            return []
+        return [t for t in self._triggers if t.name in hits]
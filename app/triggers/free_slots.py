@@ -1,14 +1,105 @@
+import asyncio
 import logging
-from datetime import datetime, timedelta
+from collections import deque
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from telethon import events
 
+from app.config import settings
 from app.services.bitrix_client import BitrixClient
-from app.utils import DAY_NAMES_RU, merge_intervals, parse_attendees, parse_bitrix_dt
+from app.services.send_queue import SendQueue
+from app.services.telegram_service import TelegramService
+from app.utils import DAY_NAMES_RU, parse_attendees, parse_find_time_options
 
 logger = logging.getLogger("smartsummary")
 
 
+def _user_timezones(bitrix: BitrixClient, user_ids: list[int]) -> dict[int, ZoneInfo]:
+    """Timezones of users known to the Bitrix directory (others use settings.timezone)."""
+    zones = {}
+    for uid in user_ids:
+        user = bitrix.directory.get_user(uid)
+        if user and user["timezone"]:
+            try:
+                zones[uid] = ZoneInfo(user["timezone"])
+            except (ZoneInfoNotFoundError, ValueError):
+                pass
+    return zones
+
+
+def _work_days(start: date, count: int) -> list[date]:
+    days: list[date] = []
+    d = start
+    while len(days) < count:
+        if d.weekday() < 5:
+            days.append(d)
+        d += timedelta(days=1)
+    return days
+
+
+def _chunks(items: list, size: int) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def _search_free_slots(
+    bitrix: BitrixClient,
+    user_ids: list[int],
+    work_days: list[date],
+    min_minutes: int,
+    limit: int | None = None,
+) -> dict[date, list[tuple[datetime, datetime]]]:
+    """Common free slots over `work_days`, fetched in (users × days) chunks.
+
+    Day windows are fetched a few at a time and consumed in order; with
+    `limit` the search stops once that many slots are found.
+    """
+    from app.availability import AvailabilityGrid, parse_busy_intervals  # numpy — по первому запросу
+
+    tz = ZoneInfo(settings.timezone)
+    user_tz = _user_timezones(bitrix, user_ids)
+    not_before = datetime.now(tz).replace(tzinfo=None)
+    user_chunks = _chunks(user_ids, settings.free_slot_chunk_users)
+
+    async def search_window(days: list[date]):
+        parts = await asyncio.gather(*(
+            bitrix.get_users_accessibility(chunk, days[0].isoformat(), days[-1].isoformat())
+            for chunk in user_chunks
+        ))
+        accessibility = {uid: slots for part in parts for uid, slots in part.items()}
+        grid = AvailabilityGrid(
+            days, tz, work_start=settings.work_day_start, work_end=settings.work_day_end
+        )
+        busy = {uid: parse_busy_intervals(accessibility.get(str(uid), [])) for uid in user_ids}
+        return grid.common_free(busy, min_minutes=min_minutes, user_tz=user_tz, not_before=not_before)
+
+    windows = iter(_chunks(work_days, settings.free_slot_chunk_days))
+    in_flight: deque[asyncio.Task] = deque()
+
+    def launch():
+        days = next(windows, None)
+        if days:
+            in_flight.append(asyncio.create_task(search_window(days)))
+
+    for _ in range(settings.free_slot_parallel_chunks):
+        launch()
+
+    found: dict[date, list[tuple[datetime, datetime]]] = {}
+    try:
+        while in_flight:
+            free_by_day = await in_flight.popleft()
+            launch()
+            found.update(free_by_day)
+            if limit and sum(map(len, found.values())) >= limit:
+                break
+    finally:
+        # дальние окна больше не нужны (или поиск упал) — не ждём их
+        for task in in_flight:
+            task.cancel()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+    return found
+
+
 async def handle_find_time(event: events.NewMessage.Event):
     chat_id = event.chat_id
     sender = event.sender_id
@@ -17,7 +108,7 @@ async def handle_find_time(event: events.NewMessage.Event):
     try:
         nicknames, _ = parse_attendees(text)
         if not nicknames:
-            await event.reply("Укажи участников: Найди время @nick1 @nick2")
+            await SendQueue.get().reply(event, "Укажи участников: Найди время @nick1 @nick2")
             return
 
         bitrix = BitrixClient.get()
@@ -25,8 +116,8 @@ async def handle_find_time(event: events.NewMessage.Event):
         user_ids: list[int] = []
         user_names: list[str] = []
         not_found: list[str] = []
-        for nick in nicknames:
-            uid, full_name = await bitrix.find_user_by_nickname(nick)
+        lookups = await asyncio.gather(*(bitrix.find_user_by_nickname(n) for n in nicknames))
+        for nick, (uid, full_name) in zip(nicknames, lookups):
             if uid:
                 user_ids.append(uid)
                 user_names.append(f"@{nick}")
@@ -37,86 +128,59 @@ async def handle_find_time(event: events.NewMessage.Event):
             msg = "❌ Никого не удалось найти в Bitrix"
             if not_found:
                 msg += f"\n⚠️ Не найден: {', '.join(not_found)}"
-            await event.reply(msg)
+            await SendQueue.get().reply(event, msg)
             return
 
-        today = datetime.now().date()
-        work_days: list = []
-        d = today
-        while len(work_days) < 5:
-            if d.weekday() < 5:
-                work_days.append(d)
-            d += timedelta(days=1)
-
-        date_from = work_days[0].strftime("%Y-%m-%d")
-        date_to = work_days[-1].strftime("%Y-%m-%d")
+        horizon, duration, limit = parse_find_time_options(text)
+        if horizon is None and limit:
+            # "первый слот" без горизонта — ищем до предела, поиск остановится на первых найденных
+            horizon = settings.free_slot_max_days
+        days_count = min(horizon or settings.free_slot_days, settings.free_slot_max_days)
+        min_minutes = duration or settings.free_slot_min_minutes
+        work_days = _work_days(datetime.now(ZoneInfo(settings.timezone)).date(), days_count)
 
-        accessibility = await bitrix.get_users_accessibility(user_ids, date_from, date_to)
+        free_by_day = await _search_free_slots(bitrix, user_ids, work_days, min_minutes, limit)
 
         lines: list[str] = []
-        lines.append(f"📅 Свободные слоты для {', '.join(user_names)}:")
-        if not_found:
-            lines.append(f"⚠️ Не найден: {', '.join(not_found)}")
-        lines.append("")
-
-        for day in work_days:
-            day_start = datetime.combine(day, datetime.min.time().replace(hour=9))
-            day_end = datetime.combine(day, datetime.min.time().replace(hour=19))
-
-            busy_intervals: list[tuple[datetime, datetime]] = []
-            for uid in user_ids:
-                slots = accessibility.get(str(uid), [])
-                for slot in slots:
-                    acc = slot.get("ACCESSIBILITY", "busy")
-                    if acc in ("free",):
-                        continue
-                    try:
-                        dt_from = parse_bitrix_dt(slot["DATE_FROM"])
-                        dt_to = parse_bitrix_dt(slot["DATE_TO"])
-                        offset_from = int(slot.get("~USER_OFFSET_FROM", 0))
-                        offset_to = int(slot.get("~USER_OFFSET_TO", 0))
-                        dt_from -= timedelta(seconds=offset_from)
-                        dt_to -= timedelta(seconds=offset_to)
-                    except Exception as e:
-                        logger.warning("Skip slot parse error: %s | %s", e, slot)
-                        continue
-                    if dt_to <= day_start or dt_from >= day_end:
-                        continue
-                    busy_intervals.append((
-                        max(dt_from, day_start),
-                        min(dt_to, day_end),
-                    ))
-
-            merged = merge_intervals(busy_intervals)
-
-            free_slots: list[tuple[datetime, datetime]] = []
-            cursor = day_start
-            for b_start, b_end in merged:
-                if cursor < b_start:
-                    free_slots.append((cursor, b_start))
-                cursor = max(cursor, b_end)
-            if cursor < day_end:
-                free_slots.append((cursor, day_end))
-
-            free_slots = [
-                (s, e) for s, e in free_slots if (e - s) >= timedelta(minutes=30)
-            ]
-
-            day_label = f"{DAY_NAMES_RU[day.weekday()]}, {day.strftime('%d.%m')}"
-            if not free_slots:
-                lines.append(f"{day_label}:")
-                lines.append("  нет свободных слотов")
-            else:
-                lines.append(f"{day_label}:")
-                for slot_start, slot_end in free_slots:
-                    s = slot_start.strftime("%H:%M")
-                    e = slot_end.strftime("%H:%M")
-                    suffix = " (весь день)" if s == "09:00" and e == "19:00" else ""
-                    lines.append(f"  {s}–{e}{suffix}")
+        if limit:
+            first = sorted(slot for slots in free_by_day.values() for slot in slots)[:limit]
+            lines.append(
+                f"📅 Ближайшие слоты от {min_minutes} мин для {', '.join(user_names)}:"
+            )
+            if not_found:
+                lines.append(f"⚠️ Не найден: {', '.join(not_found)}")
+            lines.append("")
+            for slot_start, slot_end in first:
+                day_label = f"{DAY_NAMES_RU[slot_start.weekday()]}, {slot_start.strftime('%d.%m')}"
+                lines.append(f"{day_label} {slot_start.strftime('%H:%M')}–{slot_end.strftime('%H:%M')}")
+            if not first:
+                lines.append(f"нет общих слотов на ближайшие {days_count} рабочих дней")
+        else:
+            lines.append(f"📅 Свободные слоты для {', '.join(user_names)}:")
+            if not_found:
+                lines.append(f"⚠️ Не найден: {', '.join(not_found)}")
             lines.append("")
 
-        await event.reply("\n".join(lines).rstrip())
+            full_day = (f"{settings.work_day_start:02d}:00", f"{settings.work_day_end:02d}:00")
+            for day in work_days:
+                free_slots = free_by_day.get(day, [])
+                day_label = f"{DAY_NAMES_RU[day.weekday()]}, {day.strftime('%d.%m')}"
+                if not free_slots:
+                    lines.append(f"{day_label}:")
+                    lines.append("  нет свободных слотов")
+                else:
+                    lines.append(f"{day_label}:")
+                    for slot_start, slot_end in free_slots:
+                        s = slot_start.strftime("%H:%M")
+                        e = slot_end.strftime("%H:%M")
+                        suffix = " (весь день)" if (s, e) == full_day else ""
+                        lines.append(f"  {s}–{e}{suffix}")
+                lines.append("")
+
+        # на длинном горизонте список по дням не влезает в одно сообщение
+        for page in TelegramService.split_text("\n".join(lines).rstrip()):
+            await SendQueue.get().reply(event, page)
         logger.info("*** SENT free slots for %s", user_names)
     except Exception as e:
         logger.error("*** ERROR finding free time: %s", e, exc_info=True)
-        await event.reply(f"❌ Не удалось найти свободное время: {e}")
+        await SendQueue.get().reply(event, f"❌ Не удалось найти свободное время: {e}")
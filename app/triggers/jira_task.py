@@ -5,6 +5,7 @@ from telethon import events
 
 from app.config import settings
 from app.services.jira_client import JiraClient
+from app.services.send_queue import SendQueue
 
 logger = logging.getLogger("smartsummary")
 
@@ -18,13 +19,13 @@ async def handle_create_task(event: events.NewMessage.Event):
         body = re.sub(r"(?i)^(сделай|создай)\s+задачу\s*", "", text).strip()
         key_match = re.search(r"\b([A-Z][A-Z0-9]{1,9})\b", body)
         if not key_match:
-            await event.reply("❌ Укажи проект: Создай задачу DC")
+            await SendQueue.get().reply(event, "❌ Укажи проект: Создай задачу DC")
             return
         project_key = key_match.group(1)
 
         reply_msg = await event.get_reply_message()
         if not reply_msg or not reply_msg.raw_text:
-            await event.reply("❌ Реплайни на сообщение с текстом задачи")
+            await SendQueue.get().reply(event, "❌ Реплайни на сообщение с текстом задачи")
             return
 
         full_text = reply_msg.raw_text.strip()
@@ -36,7 +37,8 @@ async def handle_create_task(event: events.NewMessage.Event):
         result = await jira.create_issue(project_key, summary, description)
         issue_key = result["key"]
         jira_base = settings.jira_url.rstrip("/")
-        await event.reply(
+        await SendQueue.get().reply(
+            event,
             f"✅ Задача создана: {issue_key}\n"
             f"📝 {summary}\n"
             f"🔗 {jira_base}/browse/{issue_key}"
@@ -44,4 +46,4 @@ async def handle_create_task(event: events.NewMessage.Event):
         logger.info("*** Jira issue created: %s", issue_key)
     except Exception as e:
         logger.error("*** ERROR creating Jira issue: %s", e, exc_info=True)
-        await event.reply(f"❌ Ошибка создания задачи: {e}")
+        await SendQueue.get().reply(event, f"❌ Ошибка создания задачи: {e}")
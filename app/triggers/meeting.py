@@ -1,8 +1,10 @@
+import asyncio
 import logging
 
 from telethon import events
 
 from app.services.bitrix_client import BitrixClient
+from app.services.send_queue import SendQueue
 from app.utils import parse_attendees, parse_meeting_time
 
 logger = logging.getLogger("smartsummary")
@@ -16,7 +18,7 @@ async def handle_create_meeting(event: events.NewMessage.Event):
     try:
         dt, err = parse_meeting_time(text)
         if err:
-            await event.reply(err)
+            await SendQueue.get().reply(event, err)
             return
 
         context = ""
@@ -32,8 +34,13 @@ async def handle_create_meeting(event: events.NewMessage.Event):
         not_found: list[str] = []
         external_emails: list[str] = []
 
-        for nick in nicknames:
-            uid, full_name = await bitrix.find_user_by_nickname(nick)
+        # все поиски разом — BitrixClient склеит их в один-два batch-запроса
+        nick_lookups, email_lookups = await asyncio.gather(
+            asyncio.gather(*(bitrix.find_user_by_nickname(n) for n in nicknames)),
+            asyncio.gather(*(bitrix.resolve_email_user(e) for e in emails), return_exceptions=True),
+        )
+
+        for nick, (uid, full_name) in zip(nicknames, nick_lookups):
             if uid:
                 attendee_ids.append(uid)
                 found_names.append(full_name or nick)
@@ -41,16 +48,16 @@ async def handle_create_meeting(event: events.NewMessage.Event):
                 not_found.append(f"@{nick}")
 
         invite_emails: list[str] = []
-        for email in emails:
-            try:
-                uid, name = await bitrix.resolve_email_user(email)
-                if uid:
-                    attendee_ids.append(uid)
-                    external_emails.append(f"{name} ({email})" if name else email)
-                else:
-                    invite_emails.append(email)
-            except Exception as e:
-                logger.error("Failed to find user by email %s: %s", email, e)
+        for email, lookup in zip(emails, email_lookups):
+            if isinstance(lookup, Exception):
+                logger.error("Failed to find user by email %s: %s", email, lookup)
+                invite_emails.append(email)
+                continue
+            uid, name = lookup
+            if uid:
+                attendee_ids.append(uid)
+                external_emails.append(f"{name} ({email})" if name else email)
+            else:
                 invite_emails.append(email)
 
         title = context[:80] if context else "Встреча"
@@ -76,7 +83,7 @@ async def handle_create_meeting(event: events.NewMessage.Event):
             reply_text += f"\n⚠️ Не найден: {', '.join(not_found)}"
         if context:
             reply_text += f"\n📝 {context}"
-        await event.reply(reply_text)
+        await SendQueue.get().reply(event, reply_text)
         logger.info("*** SENT meeting reply: %s", reply_text)
     except Exception as e:
         logger.error("*** ERROR creating meeting: %s", e, exc_info=True)
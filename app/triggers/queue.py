@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+
+from app.config import settings
+from app.metrics import TRIGGER_QUEUE_DEPTH, TRIGGER_QUEUE_DROPPED, TRIGGER_QUEUE_WAIT_SECONDS
+
+logger = logging.getLogger("smartsummary")
+
+Job = Callable[[], Awaitable]
+
+
+class ChatTaskQueue:
+    """Per-chat FIFO queues of trigger jobs, drained off the update path.
+
+    Jobs of one chat run strictly in order; different chats run concurrently,
+    with at most `max_workers` jobs running at once. `submit` never blocks:
+    when a chat's queue (or the total backlog) is full the job is rejected.
+    """
+
+    def __init__(self, max_workers: int, max_depth: int, max_total: int):
+        self._slots = asyncio.Semaphore(max_workers)
+        self._max_depth = max_depth
+        self._max_total = max_total
+        self._queues: dict[int, asyncio.Queue] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._pending = 0
+        self._running = 0
+        self.dropped = 0
+
+    def submit(self, chat_id: int, name: str, job: Job) -> bool:
+        if self._pending >= self._max_total:
+            return self._reject(chat_id, name, "total backlog full")
+
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = self._queues[chat_id] = asyncio.Queue(maxsize=self._max_depth)
+        try:
+            queue.put_nowait((time.monotonic(), name, job))
+        except asyncio.QueueFull:
+            return self._reject(chat_id, name, "chat queue full")
+
+        self._pending += 1
+        TRIGGER_QUEUE_DEPTH.inc()
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._drain(chat_id, queue))
+        return True
+
+    def _reject(self, chat_id: int, name: str, reason: str) -> bool:
+        self.dropped += 1
+        TRIGGER_QUEUE_DROPPED.inc()
+        logger.warning("Trigger %s in chat=%s dropped: %s", name, chat_id, reason)
+        return False
+
+    async def _drain(self, chat_id: int, queue: asyncio.Queue):
+        try:
+            while not queue.empty():
+                enqueued_at, name, job = queue.get_nowait()
+                async with self._slots:
+                    self._pending -= 1
+                    self._running += 1
+                    TRIGGER_QUEUE_DEPTH.dec()
+                    TRIGGER_QUEUE_WAIT_SECONDS.observe(time.monotonic() - enqueued_at, trigger=name)
+                    try:
+                        await job()
+                    except Exception as e:
+                        logger.error("*** ERROR in trigger %s (chat=%s): %s", name, chat_id, e, exc_info=True)
+                    finally:
+                        self._running -= 1
+        finally:
+            # очередь пуста (или задача отменена) — следующая задача чата заведёт нового воркера
+            self._workers.pop(chat_id, None)
+            self._queues.pop(chat_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "pending": self._pending,
+            "dropped": self.dropped,
+            "chats": {str(chat_id): q.qsize() for chat_id, q in self._queues.items() if q.qsize()},
+        }
+
+    async def close(self):
+        workers = list(self._workers.values())
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+trigger_queue = ChatTaskQueue(
+    max_workers=settings.trigger_workers,
+    max_depth=settings.trigger_queue_depth,
+    max_total=settings.trigger_queue_total,
+)
@@ -2,6 +2,10 @@ import logging
 
 from telethon import events
 
+from app.config import settings
+from app.services.send_queue import SendQueue
+from app.services.telegram_service import StreamingReply
+
 logger = logging.getLogger("smartsummary")
 
 
@@ -12,8 +16,25 @@ async def handle_summarize(event: events.NewMessage.Event):
     try:
         from app.summarizer import summarize_chat_for_trigger
 
-        summary = await summarize_chat_for_trigger(chat_id)
-        await event.reply(f"#summary\n\n{summary}", parse_mode="html")
-        logger.info("*** SENT summary reply to chat=%s", chat_id)
+        if not settings.summary_streaming:
+            summary = await summarize_chat_for_trigger(chat_id)
+            await SendQueue.get().reply(event, f"#summary\n\n{summary}", parse_mode="html")
+            logger.info("*** SENT summary reply to chat=%s", chat_id)
+            return
+
+        reply = StreamingReply(
+            event,
+            header="#summary\n\n",
+            placeholder="⏳ Готовлю саммари...",
+            edit_interval=settings.telegram_edit_interval,
+        )
+        await reply.start()
+        try:
+            summary = await summarize_chat_for_trigger(chat_id, on_progress=reply.update)
+        except Exception:
+            await reply.finish("❌ Не удалось сделать саммари")
+            raise
+        await reply.finish(summary)
+        logger.info("*** SENT streamed summary reply to chat=%s", chat_id)
     except Exception as e:
         logger.error("*** ERROR summarizing: %s", e, exc_info=True)
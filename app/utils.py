@@ -84,6 +84,43 @@ def parse_attendees(text: str) -> tuple[list[str], list[str]]:
     return nicknames, emails
 
 
+HORIZON_RE = re.compile(
+    r"\bна\s+(?:(\d+)\s*)?(недел[юиь]|месяц\w*|(?:рабоч\w*\s+)?(?:день|дня|дней)\b)", re.IGNORECASE
+)
+DURATION_RE = re.compile(r"\b(\d+(?:[.,]\d+)?)\s*(мин|час|ч\b)|\bна\s+(час|полчаса)\b", re.IGNORECASE)
+FIRST_SLOTS_RE = re.compile(r"\bперв\w*\s+(?:(\d+)\s+)?слот", re.IGNORECASE)
+
+
+def parse_find_time_options(text: str) -> tuple[int | None, int | None, int | None]:
+    """Parse 'Найди время @a @b на 2 недели первый слот 90 минут'.
+
+    Returns (horizon_business_days, min_minutes, slot_limit); None where not given.
+    """
+    cleaned = NICK_RE.sub("", EMAIL_RE.sub("", text))
+
+    horizon = None
+    m = HORIZON_RE.search(cleaned)
+    if m:
+        count = int(m.group(1) or 1)
+        unit = m.group(2).lower()
+        horizon = count * 5 if unit.startswith("недел") else count * 21 if unit.startswith("месяц") else count
+
+    minutes = None
+    m = DURATION_RE.search(cleaned)
+    if m and m.group(1):
+        value = float(m.group(1).replace(",", "."))
+        minutes = round(value if m.group(2).lower() == "мин" else value * 60)
+    elif m:
+        minutes = 60 if m.group(3).lower() == "час" else 30  # "на час", "на полчаса"
+
+    limit = None
+    m = FIRST_SLOTS_RE.search(cleaned)
+    if m:
+        limit = int(m.group(1) or 1)
+
+    return horizon, minutes, limit
+
+
 def parse_bitrix_dt(s: str) -> datetime:
     """Parse Bitrix datetime string like '17.02.2026 09:00:00' or '2026-02-17T09:00:00+07:00'."""
     for fmt in ("%d.%m.%Y %H:%M:%S", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%d %H:%M:%S"):
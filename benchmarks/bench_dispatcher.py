@@ -0,0 +1,103 @@
+"""Trigger matching throughput on a realistic, mostly non-matching message corpus.
+
+Compares the previous per-trigger checks (repeated lower() and inline
+re.match calls) with the single-pass TriggerDispatcher.
+
+    python -m benchmarks.bench_dispatcher [--messages 200000]
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "benchmark")
+
+from app.triggers import dispatcher  # noqa: E402
+
+WORDS = (
+    "привет как дела сегодня завтра встреча задача время созвон отчёт проект "
+    "клиент договор сделали посмотри пожалуйста спасибо ок да нет можно нужно "
+    "вчера релиз баг фикс деплой сервер база данных ссылка файл документ "
+    "давай потом позже сейчас готово проверил согласовали бюджет срок "
+    "ok thanks please deploy merge review ticket PR link"
+).split()
+EXTRAS = ["🙂", "👍", "🔥", "https://example.com/some/long/path?id=123", "@ivan", "10:30", "DC-1234"]
+
+
+def make_corpus(n: int, hit_rate: float, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    hits = [
+        "Суммаризация", "Найди время @ivan @petrov", "создай задачу DC",
+        "Сделай встречу 16:00 18.02 @ivan", "а где Ситников?",
+    ]
+    corpus = []
+    for _ in range(n):
+        if rng.random() < hit_rate:
+            corpus.append(rng.choice(hits))
+            continue
+        length = max(1, int(rng.lognormvariate(2.0, 1.0)))
+        words = [rng.choice(WORDS) if rng.random() > 0.05 else rng.choice(EXTRAS) for _ in range(length)]
+        text = " ".join(words)
+        corpus.append(text.capitalize() if rng.random() < 0.5 else text)
+    return corpus
+
+
+def legacy_match(text: str) -> list[str]:
+    hits = []
+    if text.lower().strip() == "суммаризация":
+        return ["summarize"]
+    if "ситников" in text.lower():
+        hits.append("sitnikov")
+    if "гринкеев" in text.lower():
+        hits.append("greenkeev")
+    if re.match(r"(?i)(сделай|создай)\s+задачу", text):
+        return hits + ["create_task"]
+    if re.match(r"(?i)найди\s+время", text):
+        return hits + ["find_time"]
+    if re.match(r"(?i)(сделай|создай)\s+встречу", text):
+        return hits + ["create_meeting"]
+    return hits
+
+
+def dispatcher_match(text: str) -> list[str]:
+    names = []
+    for trigger in dispatcher.match(text):
+        names.append(trigger.name)
+        if trigger.exclusive:
+            break
+    return names
+
+
+def run(fn, corpus: list[str], repeat: int = 3) -> float:
+    """Best-of-`repeat` throughput in messages per second."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--hit-rate", type=float, default=0.001)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.messages, args.hit_rate)
+    mismatches = [t for t in corpus if legacy_match(t) != dispatcher_match(t)]
+    if mismatches:
+        raise SystemExit(f"Dispatcher disagrees with legacy matching on: {mismatches[:5]}")
+
+    avg_len = sum(map(len, corpus)) / len(corpus)
+    print(f"corpus: {len(corpus)} messages, avg {avg_len:.0f} chars, hit rate {args.hit_rate}")
+    for name, fn in (("legacy", legacy_match), ("dispatcher", dispatcher_match)):
+        print(f"{name:>10}: {run(fn, corpus):,.0f} msg/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Common free-slot search: per-day interval merging vs the AvailabilityGrid bitmaps.
+
+Generates synthetic `calendar.accessibility.get` data and checks that both
+implementations agree before timing them.
+
+    python -m benchmarks.bench_free_slots [--users 50] [--days 20]
+"""
+
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "benchmark")
+
+from app.availability import AvailabilityGrid, parse_busy_intervals  # noqa: E402
+from app.utils import merge_intervals, parse_bitrix_dt  # noqa: E402
+
+TZ = ZoneInfo("Asia/Novosibirsk")
+
+
+def work_days(start: date, count: int) -> list[date]:
+    days, d = [], start
+    while len(days) < count:
+        if d.weekday() < 5:
+            days.append(d)
+        d += timedelta(days=1)
+    return days
+
+
+def make_accessibility(user_ids: list[int], days: list[date], per_day: int, seed: int = 7) -> dict:
+    rng = random.Random(seed)
+    result = {}
+    for uid in user_ids:
+        slots = []
+        for day in days:
+            for _ in range(rng.randint(0, per_day)):
+                start = datetime.combine(day, datetime.min.time()) + timedelta(
+                    minutes=rng.randrange(8 * 60, 19 * 60, 15)
+                )
+                end = start + timedelta(minutes=rng.choice((15, 30, 45, 60, 90)))
+                slots.append({
+                    "DATE_FROM": start.strftime("%d.%m.%Y %H:%M:%S"),
+                    "DATE_TO": end.strftime("%d.%m.%Y %H:%M:%S"),
+                    "ACCESSIBILITY": rng.choice(("busy", "busy", "absent", "free")),
+                })
+        result[str(uid)] = slots
+    return result
+
+
+def legacy_free_slots(accessibility: dict, user_ids: list[int], days: list[date]) -> dict:
+    """The previous handle_find_time loop: every slot is re-parsed for every day."""
+    result = {}
+    for day in days:
+        day_start = datetime.combine(day, datetime.min.time().replace(hour=9))
+        day_end = datetime.combine(day, datetime.min.time().replace(hour=19))
+        busy = []
+        for uid in user_ids:
+            for slot in accessibility.get(str(uid), []):
+                if slot.get("ACCESSIBILITY", "busy") == "free":
+                    continue
+                dt_from = parse_bitrix_dt(slot["DATE_FROM"])
+                dt_to = parse_bitrix_dt(slot["DATE_TO"])
+                if dt_to <= day_start or dt_from >= day_end:
+                    continue
+                busy.append((max(dt_from, day_start), min(dt_to, day_end)))
+        free, cursor = [], day_start
+        for b_start, b_end in merge_intervals(busy):
+            if cursor < b_start:
+                free.append((cursor, b_start))
+            cursor = max(cursor, b_end)
+        if cursor < day_end:
+            free.append((cursor, day_end))
+        result[day] = [(s, e) for s, e in free if e - s >= timedelta(minutes=30)]
+    return result
+
+
+def grid_free_slots(accessibility: dict, user_ids: list[int], days: list[date]) -> dict:
+    grid = AvailabilityGrid(days, TZ)
+    busy = {uid: parse_busy_intervals(accessibility.get(str(uid), [])) for uid in user_ids}
+    return grid.common_free(busy, min_minutes=30)
+
+
+def timed(fn, *args, repeat: int = 5) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--meetings-per-day", type=int, default=3)
+    args = parser.parse_args()
+
+    user_ids = list(range(1, args.users + 1))
+    days = work_days(date(2026, 3, 2), args.days)
+    accessibility = make_accessibility(user_ids, days, args.meetings_per_day)
+    total_slots = sum(map(len, accessibility.values()))
+
+    # при плотном календаре пересечение пустое — сравниваем и на небольшой группе
+    for n in (3, args.users):
+        legacy = legacy_free_slots(accessibility, user_ids[:n], days)
+        grid = grid_free_slots(accessibility, user_ids[:n], days)
+        if legacy != grid:
+            raise SystemExit(f"Results differ for {n} users")
+
+    print(f"{args.users} users × {args.days} working days, {total_slots} calendar slots")
+    for name, fn in (("legacy", legacy_free_slots), ("grid", grid_free_slots)):
+        ms, _ = timed(fn, accessibility, user_ids, days)
+        print(f"{name:>7}: {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Replay load generator for the update path: how many messages/s can it absorb?
+
+Feeds NewMessage events into the handler `register_all` installs, one task
+per update as Telethon dispatches them, at fixed rates in steps (one step
+per `--rates` entry, `--duration` seconds each). Triggers fire for real
+against the fakes of bench_suite. Per step it reports:
+
+- handling latency of every event, from its scheduled arrival to handler return
+- event-loop lag: how late a 10 ms ticker wakes up
+- memory: process RSS, ChatState sets, DialogIndex size, trigger backlog, sampled once a second
+
+Events are synthetic (bench_dispatcher's corpus: log-normal text lengths,
+`--hit-rate` of trigger phrases, `--chats` chats, 1 in 5 a group) or
+recorded, one JSON object per line with `chat_id` and `text`
+(`sender_id` optional), cycled as needed:
+
+    sqlite3 -json data/messages.db "SELECT chat_id, sender_id, text FROM messages" \\
+        | python -c "import json,sys; [print(json.dumps(m, ensure_ascii=False)) for m in json.load(sys.stdin)]" \\
+        > events.jsonl
+
+The first step whose p99 loop lag exceeds `--max-lag-ms`, or that handles
+under 95% of the offered rate, is reported as saturated.
+
+    python -m benchmarks.bench_replay [--rates 500,1000,2000,5000] [--duration 10] [--input events.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from telethon import events  # noqa: E402
+
+from benchmarks.bench_dispatcher import make_corpus  # noqa: E402
+from benchmarks.bench_suite import Suite, add_fake_arguments  # noqa: E402
+
+LAG_TICK = 0.01
+
+
+def percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": None, "p99": None, "max": None}
+    ms = sorted(v * 1000 for v in values)
+    p99 = statistics.quantiles(ms, n=100, method="inclusive")[98] if len(ms) > 1 else ms[0]
+    return {"p50": round(statistics.median(ms), 3), "p99": round(p99, 3), "max": round(ms[-1], 3)}
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # не Linux: только пиковое значение (байты на macOS, КиБ на прочих)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def chat_state_bytes() -> int:
+    from app.chat_state import state
+
+    sets = (state.monitored, state.today_active, state.today_incoming)
+    return sum(sys.getsizeof(s) + sum(sys.getsizeof(x) for x in s) for s in sets)
+
+
+def memory_sample(started: float) -> dict:
+    from app.chat_state import state
+    from app.dialog_index import DialogIndex
+    from app.triggers.queue import trigger_queue
+
+    queue = trigger_queue.stats()
+    return {
+        "t": round(time.perf_counter() - started, 1),
+        "rss_mb": round(rss_bytes() / 2**20, 1),
+        "chat_state_bytes": chat_state_bytes(),
+        "chat_state_chats": len(state.today_active | state.today_incoming),
+        "dialog_index": len(DialogIndex.get()),
+        "trigger_pending": queue["pending"] + queue["running"],
+    }
+
+
+def load_messages(args: argparse.Namespace) -> list[tuple[int, int | None, str]]:
+    """(chat_id, sender_id, text) to replay, recorded or synthetic."""
+    if args.input:
+        messages = []
+        for line in args.input.read_text().splitlines():
+            if line.strip():
+                m = json.loads(line)
+                messages.append((int(m["chat_id"]), m.get("sender_id"), m["text"]))
+        return messages
+
+    rng = random.Random(5)
+    chats = [1000 + i if rng.random() < 0.8 else -(2000 + i) for i in range(1, args.chats + 1)]
+    count = int(max(args.rates) * args.duration)
+    return [(rng.choice(chats), None, text) for text in make_corpus(count, hit_rate=args.hit_rate)]
+
+
+class Replay:
+    def __init__(self, suite: Suite, handler, messages: list[tuple[int, int | None, str]]):
+        self.suite = suite
+        self.handler = handler
+        self.messages = messages
+        self.cursor = 0
+
+    async def step(self, rate: int, duration: float) -> dict:
+        from app.triggers.queue import trigger_queue
+
+        total = int(rate * duration)
+        latencies: list[float] = []
+        lags: list[float] = []
+        samples: list[dict] = []
+        errors = 0
+        dropped = trigger_queue.dropped
+        tasks: set[asyncio.Task] = set()
+        stop = asyncio.Event()
+
+        async def handle(event, scheduled: float):
+            nonlocal errors
+            try:
+                await self.handler(event)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - scheduled)
+
+        async def ticker():
+            expected = time.perf_counter() + LAG_TICK
+            while not stop.is_set():
+                await asyncio.sleep(LAG_TICK)
+                now = time.perf_counter()
+                lags.append(max(0.0, now - expected))
+                expected = now + LAG_TICK
+
+        async def sampler():
+            while not stop.is_set():
+                samples.append(memory_sample(started))
+                try:
+                    await asyncio.wait_for(stop.wait(), 1.0)
+                except TimeoutError:
+                    pass
+
+        started = time.perf_counter()
+        monitors = [asyncio.create_task(ticker()), asyncio.create_task(sampler())]
+        for i in range(total):
+            scheduled = started + i / rate
+            # отстали от графика — всё равно уступаем циклу, как при чтении апдейтов из сети
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            chat_id, sender_id, text = self.messages[self.cursor % len(self.messages)]
+            self.cursor += 1
+            event = self.suite.tg.event(chat_id, text, sender_id=sender_id)
+            task = asyncio.create_task(handle(event, scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        offered_for = time.perf_counter() - started
+        await asyncio.gather(*tasks)
+        handled_for = time.perf_counter() - started
+
+        # триггеры, поставленные в очередь за шаг, доедаем до следующего шага
+        while trigger_queue.stats()["pending"] or trigger_queue.stats()["running"]:
+            await asyncio.sleep(0.05)
+        stop.set()
+        await asyncio.gather(*monitors)
+        samples.append(memory_sample(started))
+
+        return {
+            "rate": rate,
+            "events": total,
+            "errors": errors,
+            "achieved_rate": round(total / handled_for, 1),
+            "send_behind_s": round(max(0.0, offered_for - duration), 3),
+            "latency_ms": percentiles(latencies),
+            "loop_lag_ms": percentiles(lags),
+            "triggers_dropped": trigger_queue.dropped - dropped,
+            "memory": {
+                "rss_growth_mb": round(samples[-1]["rss_mb"] - samples[0]["rss_mb"], 1),
+                "chat_state_growth_bytes": samples[-1]["chat_state_bytes"] - samples[0]["chat_state_bytes"],
+                "samples": samples,
+            },
+        }
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    from app.triggers import register_all
+
+    suite = Suite(args)
+    await suite.setup()
+    suite.reset_state("replay")
+    register_all(suite.tg)
+    handler = next(h for e, h in suite.tg.handlers if type(e) is events.NewMessage)  # MessageEdited — подкласс
+    replay = Replay(suite, handler, load_messages(args))
+
+    steps = []
+    saturated_at = None
+    try:
+        for rate in args.rates:
+            step = await replay.step(rate, args.duration)
+            steps.append(step)
+            print(
+                f"{rate}/s: latency p99 {step['latency_ms']['p99']} ms, "
+                f"loop lag p99 {step['loop_lag_ms']['p99']} ms, achieved {step['achieved_rate']}/s",
+                file=sys.stderr,
+            )
+            if step["loop_lag_ms"]["p99"] > args.max_lag_ms or step["achieved_rate"] < 0.95 * rate:
+                saturated_at = rate
+                break
+    finally:
+        await suite.teardown()
+
+    config = {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items() if k != "output"}
+    return {"config": config, "saturated_at": saturated_at, "steps": steps}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rates", type=lambda s: [int(r) for r in s.split(",")], default=[500, 1000, 2000, 5000])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per rate step")
+    parser.add_argument("--input", type=Path, help="recorded events, JSON lines with chat_id and text")
+    parser.add_argument("--chats", type=int, default=300, help="distinct chats in the synthetic stream")
+    parser.add_argument("--hit-rate", type=float, default=0.01, help="share of trigger phrases")
+    parser.add_argument("--max-lag-ms", type=float, default=50)
+    add_fake_arguments(parser)
+    parser.add_argument("--output", type=Path, help="also write the JSON here")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger("smartsummary").setLevel(logging.ERROR)  # отброшенные триггеры — в отчёте
+    result = json.dumps(asyncio.run(main_async(args)), indent=2, ensure_ascii=False)
+    print(result)
+    if args.output:
+        args.output.write_text(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Cold start: `import app.main` time and lifespan time-to-serving / time-to-ready.
+
+Import time is measured in fresh interpreters (best and median of N); the
+startup part runs the real lifespan against a fake Telegram client whose
+connect takes `--telegram-latency` seconds, with state files (stores, LLM
+cache, Bitrix files, tiktoken cache) in a temp dir removed afterwards.
+
+    python -m benchmarks.bench_startup [--runs 5] [--telegram-latency 1.0]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ENV = {"API_ID": "1", "API_HASH": "benchmark", "OPENAI_API_KEY": "sk-benchmark"}
+for key, value in ENV.items():
+    os.environ.setdefault(key, value)
+
+HEAVY = ("openai", "numpy", "telethon", "httpx", "fastapi", "apscheduler")
+
+IMPORT_PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(elapsed, ",".join(m for m in {HEAVY!r} if m in sys.modules))
+"""
+
+
+def measure_import(runs: int) -> tuple[list[float], str]:
+    times, loaded = [], ""
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE],
+            capture_output=True, text=True, check=True, env={**os.environ, **ENV},
+        ).stdout.split()
+        times.append(float(out[0]) * 1000)
+        loaded = out[1] if len(out) > 1 else ""
+    return times, loaded
+
+
+async def measure_startup(latency: float) -> tuple[float, float]:
+    from app import main, tokenizer
+    from app.config import settings
+    from app.dialog_index import DialogIndex
+    from app.message_store import MessageStore
+    from app.readiness import readiness
+    from app.services import bitrix_client, bitrix_directory, llm_cache
+    from app.services.telegram_service import TelegramService
+    from benchmarks.fakes import FakeTelegramClient
+
+    tmp = Path(tempfile.mkdtemp(prefix="smartsummary-bench-"))
+    settings.catch_up_enabled = False
+    llm_cache.CACHE_FILE = tmp / "llm_cache.db"
+    tokenizer.CACHE_DIR = tmp / "tiktoken"
+    bitrix_client.TOKENS_FILE = tmp / "bitrix_tokens.json"
+    bitrix_client.EMAIL_GUESTS_FILE = tmp / "bitrix_email_guests.json"
+    bitrix_directory.DIRECTORY_FILE = tmp / "bitrix_users.json"
+    MessageStore._instance = MessageStore(tmp / "messages.db")
+    DialogIndex._instance = DialogIndex(tmp / "dialogs.json")
+    tg = TelegramService.__new__(TelegramService)
+    tg._client = FakeTelegramClient(private_chats=0, groups=0, connect_latency=latency)
+    TelegramService._instance = tg
+
+    try:
+        start = time.perf_counter()
+        async with main.lifespan(main.app):
+            serving = time.perf_counter() - start
+            while not readiness.ready:
+                await asyncio.sleep(0.005)
+            ready = time.perf_counter() - start
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return serving * 1000, ready * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--telegram-latency", type=float, default=1.0)
+    args = parser.parse_args()
+
+    times, loaded = measure_import(args.runs)
+    print(f"import app.main: best {min(times):.0f} ms, median {statistics.median(times):.0f} ms")
+    print(f"  heavy modules loaded at import: {loaded or '-'}")
+
+    serving, ready = asyncio.run(measure_startup(args.telegram_latency))
+    print(f"lifespan → serving: {serving:.0f} ms")
+    print(f"lifespan → ready:   {ready:.0f} ms (Telegram connect {args.telegram_latency * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
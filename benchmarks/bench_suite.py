@@ -0,0 +1,308 @@
+"""End-to-end scenarios against local fakes, reported as JSON.
+
+Runs the real handlers and jobs with OpenAI, Bitrix and Jira served by an
+in-process stub (see benchmarks/fakes.py) and a fake Telegram client; all
+state files go to a temp dir. For each scenario prints p50/p99/mean/max
+latency in ms and throughput in ops/s:
+
+- dispatcher: `on_new_message` over a non-matching message corpus
+- find_time: `handle_find_time` for 3 random users, mixed horizons
+- create_meeting: `handle_create_meeting` with nicknames and an email guest
+- create_task: `handle_create_task` replying to a message
+- daily_summary: `daily_summary_job` from a cold message store
+
+Telegram send pacing is off unless `--real-pacing` (it would dominate the
+numbers otherwise); the OpenAI rate limits are the configured ones unless
+overridden, and every daily_summary run starts with full buckets.
+
+    python -m benchmarks.bench_suite [--scenarios find_time,daily_summary] [--output result.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from app.config import settings  # noqa: E402
+from benchmarks.bench_dispatcher import make_corpus  # noqa: E402
+from benchmarks.fakes import FakeTelegramClient, StubServer, SyntheticBitrix  # noqa: E402
+
+SCENARIOS = ("dispatcher", "find_time", "create_meeting", "create_task", "daily_summary")
+
+
+def report(latencies: list[float], wall: float, errors: int, **extra) -> dict:
+    ms = sorted(x * 1000 for x in latencies)
+    p99 = statistics.quantiles(ms, n=100, method="inclusive")[98] if len(ms) > 1 else ms[0]
+    return {
+        "ops": len(ms),
+        "errors": errors,
+        "p50_ms": round(statistics.median(ms), 3),
+        "p99_ms": round(p99, 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "max_ms": round(ms[-1], 3),
+        "throughput_per_s": round(len(ms) / wall, 2),
+        **extra,
+    }
+
+
+async def run(op: Callable[[int], Awaitable[bool]], ops: int, concurrency: int, **extra) -> dict:
+    """Run `op(i)` for i in range(ops) on `concurrency` workers; op returns False on error."""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(ops))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = await op(i)
+            except Exception:
+                logging.getLogger("smartsummary").exception("Scenario op %d failed", i)
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return report(latencies, time.perf_counter() - start, errors, concurrency=concurrency, **extra)
+
+
+class Suite:
+    """The fake environment (stubs, fake Telegram client, temp state) and the scenarios run in it."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.tmp = Path(tempfile.mkdtemp(prefix="smartsummary-bench-"))
+        self.stub = StubServer(
+            SyntheticBitrix(users=args.bitrix_users),
+            latency={"openai": args.openai_latency, "bitrix": args.bitrix_latency, "jira": args.jira_latency},
+        )
+        self.tg = FakeTelegramClient(
+            private_chats=args.private_chats,
+            groups=args.groups,
+            messages_per_chat=args.messages_per_chat,
+            latency=args.telegram_latency,
+        )
+        self.rng = random.Random(11)
+
+    async def setup(self):
+        """Point every client at the fakes and keep all state under the temp dir."""
+        await self.stub.start()
+        os.environ["OPENAI_BASE_URL"] = self.stub.openai_url
+
+        from app.services import bitrix_client
+        from app.services.ai_client import AIClient
+        from app.services.bitrix_directory import BitrixDirectory
+        from app.services.telegram_service import TelegramService
+
+        settings.llm_cache_enabled = False  # каждый вызов доходит до заглушки
+        settings.catch_up_enabled = False
+        settings.jira_url = self.stub.jira_url
+        settings.openai_rpm = self.args.openai_rpm
+        settings.openai_tpm = self.args.openai_tpm
+        settings.report_group_ids = list(self.tg.entities)[-self.args.groups:] if self.args.groups else []
+        if not self.args.real_pacing:
+            settings.telegram_peer_interval = settings.telegram_group_interval = 0
+            settings.telegram_send_per_second = 10_000
+
+        bitrix_client.TOKENS_FILE = self.tmp / "bitrix_tokens.json"
+        bitrix_client.EMAIL_GUESTS_FILE = self.tmp / "bitrix_email_guests.json"
+        bitrix = bitrix_client.BitrixClient.get()
+        bitrix.directory = BitrixDirectory(self.tmp / "bitrix_users.json")
+        bitrix._tokens = {
+            "access_token": "bench",
+            "refresh_token": "bench",
+            "client_endpoint": self.stub.bitrix_endpoint,
+            "expires_at": time.time() + 86400,
+        }
+
+        tg = TelegramService.__new__(TelegramService)
+        tg._client = self.tg
+        TelegramService._instance = tg
+        self.reset_state("setup")
+
+        # то же, что прогрев и фоновые задачи делают после старта сервиса
+        AIClient.get()
+        await bitrix.sync_directory()
+        await bitrix.refresh_email_guests()
+
+    def reset_state(self, name: str):
+        from app.dialog_index import DialogIndex
+        from app.message_store import MessageStore
+
+        if MessageStore._instance is not None:
+            MessageStore._instance.close()
+        MessageStore._instance = MessageStore(self.tmp / f"messages-{name}.db")
+        DialogIndex._instance = DialogIndex(self.tmp / f"dialogs-{name}.json")
+
+    async def teardown(self):
+        from app.services.ai_client import AIClient
+        from app.services.bitrix_client import BitrixClient
+        from app.services.jira_client import JiraClient
+        from app.services.send_queue import SendQueue
+
+        for cls in (AIClient, BitrixClient, JiraClient):
+            if cls._instance is not None:
+                await cls._instance.close()
+        await SendQueue.get().close()
+        await self.stub.stop()
+
+    # ── Scenarios ─────────────────────────────────────────────────
+
+    def _chat(self) -> int:
+        return self.rng.choice(list(self.tg.entities))
+
+    def _nicks(self, count: int) -> str:
+        return " ".join(f"@user{u}" for u in self.rng.sample(range(2, self.args.bitrix_users + 1), count))
+
+    async def dispatcher(self) -> dict:
+        from app.triggers import on_new_message
+
+        self.reset_state("dispatcher")
+        corpus = make_corpus(self.args.messages, hit_rate=0.0)
+        events = [self.tg.event(self._chat(), text) for text in corpus]
+
+        async def op(i: int) -> bool:
+            await on_new_message(events[i])
+            return True
+
+        return await run(op, len(events), concurrency=1)
+
+    async def find_time(self) -> dict:
+        from app.triggers.free_slots import handle_find_time
+
+        options = ("", " на 2 недели", " первый слот 60 минут на месяц", " на 3 дня 90 минут")
+        events = [
+            self.tg.event(self._chat(), f"Найди время {self._nicks(3)}{self.rng.choice(options)}")
+            for _ in range(self.args.requests)
+        ]
+
+        async def op(i: int) -> bool:
+            await handle_find_time(events[i])
+            return bool(events[i].replies) and not events[i].replies[-1].startswith("❌")
+
+        return await run(op, len(events), self.args.concurrency)
+
+    async def create_meeting(self) -> dict:
+        from app.triggers.meeting import handle_create_meeting
+
+        day = datetime.now(ZoneInfo(settings.timezone)) + timedelta(days=1)
+        guests = len(self.stub.bitrix.guests)
+        events = []
+        for i in range(self.args.requests):
+            context = self.tg.messages[self._chat()][i % self.args.messages_per_chat] if i % 2 else None
+            text = f"Сделай встречу 16:00 {day:%d.%m} {self._nicks(2)} guest{i % guests + 1}@example.org"
+            events.append(self.tg.event(self._chat(), text, reply_to=context))
+
+        async def op(i: int) -> bool:
+            await handle_create_meeting(events[i])
+            return bool(events[i].replies) and events[i].replies[-1].startswith("✅")
+
+        return await run(op, len(events), self.args.concurrency)
+
+    async def create_task(self) -> dict:
+        from app.triggers.jira_task import handle_create_task
+
+        events = [
+            self.tg.event(self._chat(), "Создай задачу DC", reply_to=self.tg.messages[self._chat()][i % 50])
+            for i in range(self.args.requests)
+        ]
+
+        async def op(i: int) -> bool:
+            await handle_create_task(events[i])
+            return bool(events[i].replies) and events[i].replies[-1].startswith("✅")
+
+        return await run(op, len(events), self.args.concurrency)
+
+    async def daily_summary(self) -> dict:
+        from app.main import daily_summary_job
+        from app.services.ai_client import AIClient
+        from app.transcript import compaction_report
+
+        async def op(i: int) -> bool:
+            self.reset_state(f"daily-{i}")  # холодный старт: ни покрытия, ни чекпоинтов
+            if AIClient._instance is not None:
+                await AIClient._instance.close()  # и полные бакеты лимитов OpenAI
+                AIClient._instance = None
+            sent = len(self.tg.sent)
+            await daily_summary_job()
+            return len(self.tg.sent) > sent
+
+        chats = len(self.tg.entities)
+        result = await run(op, self.args.jobs, concurrency=1, chats=chats)
+        result["transcript"] = compaction_report.snapshot()["total"]
+        usage = AIClient.get().usage_stats()
+        result["ai_usage_last_run"] = {k: v for k, v in usage.items() if k != "recent"}
+        return result
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    suite = Suite(args)
+    await suite.setup()
+    results = {}
+    try:
+        for name in args.scenarios:
+            calls = suite.stub.calls.copy()
+            results[name] = await getattr(suite, name)()
+            results[name]["stub_calls"] = dict(suite.stub.calls - calls)
+            print(f"{name}: p50 {results[name]['p50_ms']} ms, p99 {results[name]['p99_ms']} ms",
+                  file=sys.stderr)
+    finally:
+        await suite.teardown()
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    return {"config": config, "scenarios": results}
+
+
+def add_fake_arguments(parser: argparse.ArgumentParser):
+    """Options of the fake environment (sizes and latencies), shared with the other suites."""
+    parser.add_argument("--private-chats", type=int, default=20)
+    parser.add_argument("--groups", type=int, default=5)
+    parser.add_argument("--messages-per-chat", type=int, default=200)
+    parser.add_argument("--bitrix-users", type=int, default=200)
+    parser.add_argument("--openai-latency", type=float, default=0.5)
+    parser.add_argument("--bitrix-latency", type=float, default=0.05)
+    parser.add_argument("--jira-latency", type=float, default=0.1)
+    parser.add_argument("--telegram-latency", type=float, default=0.02)
+    parser.add_argument("--openai-rpm", type=int, default=settings.openai_rpm)
+    parser.add_argument("--openai-tpm", type=int, default=settings.openai_tpm)
+    parser.add_argument("--real-pacing", action="store_true", help="keep Telegram send pacing")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", type=lambda s: s.split(","), default=list(SCENARIOS))
+    parser.add_argument("--messages", type=int, default=20000, help="dispatcher messages")
+    parser.add_argument("--requests", type=int, default=100, help="requests per trigger scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent trigger requests")
+    parser.add_argument("--jobs", type=int, default=3, help="daily_summary_job runs")
+    add_fake_arguments(parser)
+    parser.add_argument("--output", type=Path, help="also write the JSON here")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    logging.basicConfig(level=logging.WARNING)  # до app.main, чьё basicConfig тогда ничего не меняет
+    result = json.dumps(asyncio.run(main_async(args)), indent=2, ensure_ascii=False)
+    print(result)
+    if args.output:
+        args.output.write_text(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,538 @@
+"""Local fakes for the offline benchmarks.
+
+`StubServer` is one in-process HTTP server speaking the OpenAI chat
+completions API (plain and streaming), the Bitrix REST API (including
+`batch`) and Jira issue creation, each with its own configurable latency.
+`FakeTelegramClient` stands in for the Telethon client with synthetic
+dialogs and today's messages; `FakeEvent` is a NewMessage event on it.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import parse_qsl
+from zoneinfo import ZoneInfo
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from telethon.tl.types import Chat, ChatPhotoEmpty, User
+
+from app.config import settings
+from app.services.bitrix_directory import NICKNAME_FIELD
+
+WORDS = (
+    "привет как дела сегодня завтра встреча задача время созвон отчёт проект "
+    "клиент договор сделали посмотри пожалуйста спасибо ок да нет можно нужно "
+    "вчера релиз баг фикс деплой сервер база данных ссылка файл документ "
+    "давай потом позже сейчас готово проверил согласовали бюджет срок"
+).split()
+
+
+def sentence(rng: random.Random, min_words: int = 3, max_words: int = 25) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))).capitalize()
+
+
+# ── Bitrix ────────────────────────────────────────────────────────
+
+
+def decode_query(query: str) -> dict:
+    """Inverse of BitrixClient's PHP-style encoding: filter[NAME]=x → {"filter": {"NAME": "x"}}."""
+    params: dict = {}
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        parts = key.replace("]", "").split("[")
+        node = params
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = value
+
+    def lists(node):
+        if not isinstance(node, dict):
+            return node
+        if node and all(k.isdigit() for k in node):
+            return [lists(node[k]) for k in sorted(node, key=int)]
+        return {k: lists(v) for k, v in node.items()}
+
+    return lists(params)
+
+
+class SyntheticBitrix:
+    """Users, email guests and calendars of a made-up Bitrix24 portal.
+
+    Users are `user<N>` / user<N>@example.com with IDs 1..users; email
+    guests follow them as guest<N>@example.org. Busy slots are derived from
+    (user, day), so every request sees the same calendar.
+    """
+
+    PAGE = 50
+
+    def __init__(self, users: int = 200, guests: int = 20, meetings_per_day: int = 4):
+        self.users = [
+            {
+                "ID": str(i),
+                "NAME": f"User{i}",
+                "LAST_NAME": f"Test{i}",
+                NICKNAME_FIELD: f"user{i}",
+                "EMAIL": f"user{i}@example.com",
+                "TIME_ZONE": "",
+                "TIMESTAMP_X": "2024-01-01T00:00:00+00:00",
+            }
+            for i in range(1, users + 1)
+        ]
+        self.guests = {
+            users + i: {
+                "id": users + i,
+                "name": f"Guest{i}",
+                "email": f"guest{i}@example.org",
+                "external_auth_id": "email",
+            }
+            for i in range(1, guests + 1)
+        }
+        self.meetings_per_day = meetings_per_day
+        self._event_ids = itertools.count(1)
+
+    def call(self, method: str, params: dict) -> dict:
+        handler = getattr(self, "_" + method.replace(".", "_"), None)
+        if handler is None:
+            raise LookupError(method)
+        return handler(params)
+
+    def _user_get(self, params: dict) -> dict:
+        users = self.users
+        for key, value in (params.get("filter") or {}).items():
+            if key == ">ID":
+                users = [u for u in users if int(u["ID"]) > int(value)]
+            elif key == ">TIMESTAMP_X":
+                since = datetime.fromisoformat(value)
+                users = [u for u in users if datetime.fromisoformat(u["TIMESTAMP_X"]) > since]
+            else:
+                users = [u for u in users if u.get(key, "").lower() == str(value).lower()]
+        start = int(params.get("start") or 0)
+        page = users[start:start + self.PAGE]
+        result = {"result": page, "total": len(users)}
+        if start + self.PAGE < len(users):
+            result["next"] = start + self.PAGE
+        return result
+
+    def _im_user_list_get(self, params: dict) -> dict:
+        found = {}
+        for uid in map(int, params.get("ID") or []):
+            if uid in self.guests:
+                found[str(uid)] = self.guests[uid]
+            elif uid <= len(self.users):
+                user = self.users[uid - 1]
+                found[str(uid)] = {"id": uid, "name": user["NAME"], "email": user["EMAIL"]}
+        return {"result": found}
+
+    def _profile(self, params: dict) -> dict:
+        return {"result": {"ID": "1", "NAME": "User1"}}
+
+    def _calendar_event_add(self, params: dict) -> dict:
+        return {"result": next(self._event_ids)}
+
+    def _calendar_accessibility_get(self, params: dict) -> dict:
+        first = date.fromisoformat(params["from"])
+        last = date.fromisoformat(params["to"])
+        days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        return {"result": {str(uid): self.busy_slots(int(uid), days) for uid in params.get("users") or []}}
+
+    def busy_slots(self, uid: int, days: list[date]) -> list[dict]:
+        slots = []
+        for day in days:
+            if day.weekday() >= 5:
+                continue
+            rng = random.Random(f"{uid}:{day}")
+            for _ in range(rng.randint(0, self.meetings_per_day)):
+                start = datetime.combine(day, datetime.min.time()) + timedelta(
+                    minutes=rng.randrange(9 * 60, 18 * 60, 15)
+                )
+                end = start + timedelta(minutes=rng.choice((30, 45, 60, 90)))
+                slots.append({
+                    "DATE_FROM": start.strftime("%d.%m.%Y %H:%M:%S"),
+                    "DATE_TO": end.strftime("%d.%m.%Y %H:%M:%S"),
+                    "ACCESSIBILITY": "busy",
+                })
+        return slots
+
+
+# ── HTTP stub ─────────────────────────────────────────────────────
+
+
+class StubServer:
+    """OpenAI, Bitrix and Jira stubs on one local uvicorn server.
+
+    `latency` maps "openai" / "bitrix" / "jira" to seconds added to every
+    request; `calls` counts requests per endpoint (Bitrix per method).
+    """
+
+    def __init__(
+        self,
+        bitrix: SyntheticBitrix | None = None,
+        latency: dict[str, float] | None = None,
+        completion_words: int = 150,
+    ):
+        self.bitrix = bitrix or SyntheticBitrix()
+        self.latency = {"openai": 0.5, "bitrix": 0.05, "jira": 0.1, **(latency or {})}
+        self.completion_words = completion_words
+        self.calls: Counter = Counter()
+        self._issue_ids = itertools.count(1)
+        self._server = None
+        self._task: asyncio.Task | None = None
+        self.url = ""
+
+    @property
+    def openai_url(self) -> str:
+        return f"{self.url}/openai/v1"
+
+    @property
+    def bitrix_endpoint(self) -> str:
+        return f"{self.url}/bitrix/rest/"
+
+    @property
+    def jira_url(self) -> str:
+        return f"{self.url}/jira"
+
+    async def start(self):
+        import uvicorn
+
+        config = uvicorn.Config(self._app(), host="127.0.0.1", port=0, log_level="warning", lifespan="off")
+        self._server = uvicorn.Server(config)
+        self._task = asyncio.create_task(self._server.serve())
+        while not self._server.started:
+            if self._task.done():
+                self._task.result()
+            await asyncio.sleep(0.01)
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.should_exit = True
+            await self._task
+
+    # ── Routes ────────────────────────────────────────────────────
+
+    def _app(self) -> FastAPI:
+        app = FastAPI()
+        app.post("/openai/v1/chat/completions")(self._chat_completions)
+        app.post("/bitrix/rest/{method}")(self._bitrix)
+        app.post("/jira/rest/api/2/issue")(self._jira_issue)
+        return app
+
+    async def _chat_completions(self, request: Request):
+        body = await request.json()
+        self.calls["openai"] += 1
+        await asyncio.sleep(self.latency["openai"])
+
+        prompt = " ".join(str(m.get("content", "")) for m in body["messages"])
+        words = min(self.completion_words, body.get("max_completion_tokens") or self.completion_words)
+        rng = random.Random(len(prompt))
+        text = "**Итоги**\n" + "\n".join(
+            f"- {sentence(rng, 5, 12)}" for _ in range(max(1, words // 8))
+        )
+        usage = {
+            "prompt_tokens": len(prompt) // 3,
+            "completion_tokens": len(text) // 3,
+            "total_tokens": (len(prompt) + len(text)) // 3,
+        }
+        base = {"id": "chatcmpl-bench", "created": 0, "model": body["model"]}
+
+        if not body.get("stream"):
+            return {
+                **base,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        async def events():
+            chunk = {**base, "object": "chat.completion.chunk"}
+            for line in text.splitlines(keepends=True):
+                delta = {"index": 0, "delta": {"content": line}, "finish_reason": None}
+                yield f"data: {json.dumps({**chunk, 'choices': [delta]})}\n\n"
+                await asyncio.sleep(0)
+            stop = {"index": 0, "delta": {}, "finish_reason": "stop"}
+            yield f"data: {json.dumps({**chunk, 'choices': [stop]})}\n\n"
+            yield f"data: {json.dumps({**chunk, 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def _bitrix(self, method: str, request: Request):
+        body = await request.json()
+        self.calls[f"bitrix:{method}"] += 1
+        await asyncio.sleep(self.latency["bitrix"])
+
+        if method != "batch":
+            try:
+                return self.bitrix.call(method, body)
+            except LookupError:
+                return JSONResponse(
+                    {"error": "ERROR_METHOD_NOT_FOUND", "error_description": method}, status_code=404
+                )
+
+        results, errors, totals, nexts = {}, {}, {}, {}
+        for key, command in body["cmd"].items():
+            name, _, query = command.partition("?")
+            self.calls[f"bitrix:{name}"] += 1
+            try:
+                data = self.bitrix.call(name, decode_query(query))
+            except LookupError:
+                errors[key] = {"error": "ERROR_METHOD_NOT_FOUND", "error_description": name}
+                continue
+            results[key] = data["result"]
+            if "total" in data:
+                totals[key] = data["total"]
+            if "next" in data:
+                nexts[key] = data["next"]
+        return {"result": {
+            "result": results, "result_error": errors, "result_total": totals, "result_next": nexts,
+        }}
+
+    async def _jira_issue(self, request: Request):
+        body = await request.json()
+        self.calls["jira"] += 1
+        await asyncio.sleep(self.latency["jira"])
+        key = f"{body['fields']['project']['key']}-{next(self._issue_ids)}"
+        return JSONResponse({"id": key, "key": key}, status_code=201)
+
+
+# ── Telegram ──────────────────────────────────────────────────────
+
+
+@dataclass
+class FakeSender:
+    id: int
+    first_name: str
+
+
+@dataclass
+class FakeMessage:
+    id: int
+    chat_id: int
+    sender_id: int
+    sender: FakeSender | None
+    raw_text: str
+    date: datetime
+    out: bool = False
+    client: "FakeTelegramClient | None" = field(default=None, repr=False)
+
+    @property
+    def text(self) -> str:
+        return self.raw_text
+
+    async def edit(self, text: str, **kwargs):
+        if self.client is not None:
+            await self.client.rpc()
+            self.client.edits += 1
+        self.raw_text = text
+        return self
+
+
+@dataclass
+class FakeEvent(FakeMessage):
+    """A NewMessage event: the message plus its chat, reply target and the replies sent."""
+
+    chat: object = None
+    reply_to: FakeMessage | None = None
+    replies: list[str] = field(default_factory=list)
+
+    @property
+    def is_private(self) -> bool:
+        return self.chat_id > 0
+
+    @property
+    def is_group(self) -> bool:
+        return self.chat_id < 0
+
+    async def get_reply_message(self) -> FakeMessage | None:
+        return self.reply_to
+
+    async def reply(self, text: str, **kwargs) -> FakeMessage:
+        self.replies.append(text)
+        return await self.client.send_message(self.chat_id, text, **kwargs)
+
+
+@dataclass
+class FakeDialog:
+    id: int
+    name: str
+    entity: object
+    date: datetime
+    is_user: bool
+    is_group: bool
+    is_channel: bool = False
+    unread_count: int = 0
+    pinned: bool = False
+
+
+class FakeTelegramClient:
+    """The parts of TelegramClient the service uses, over synthetic chats.
+
+    `private_chats` 1-on-1 dialogs (peer ids 1001..) and `groups` basic
+    groups (peer ids -2001..), each with `messages_per_chat` messages spread
+    over today in settings.timezone. Every request waits `latency` seconds;
+    `connect` waits `connect_latency`.
+    """
+
+    def __init__(
+        self,
+        private_chats: int = 20,
+        groups: int = 5,
+        messages_per_chat: int = 200,
+        latency: float = 0.0,
+        connect_latency: float = 0.0,
+        seed: int = 3,
+    ):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.sent: list[tuple[object, str]] = []
+        self.edits = 0
+        self.handlers: list[tuple[object, Callable]] = []
+        self._ids = itertools.count(1_000_000)
+        rng = random.Random(seed)
+
+        self.entities: dict[int, object] = {}
+        for i in range(1, private_chats + 1):
+            self.entities[1000 + i] = User(
+                id=1000 + i, first_name=f"Contact{i}", last_name=None, username=f"contact{i}"
+            )
+        epoch = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        for i in range(1, groups + 1):
+            self.entities[-(2000 + i)] = Chat(
+                id=2000 + i, title=f"Group {i}", photo=ChatPhotoEmpty(),
+                participants_count=10, date=epoch, version=1,
+            )
+
+        tz = ZoneInfo(settings.timezone)
+        now = datetime.now(tz)
+        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        span = (now - start_of_day).total_seconds()
+        self.messages: dict[int, list[FakeMessage]] = {}
+        for chat_id in self.entities:
+            others = [chat_id] if chat_id > 0 else [3000 + k for k in range(5)]
+            msgs = []
+            for n in range(1, messages_per_chat + 1):
+                out = rng.random() < 0.3
+                sender_id = settings.my_user_id if out else rng.choice(others)
+                when = start_of_day + timedelta(seconds=span * n / (messages_per_chat + 1))
+                msgs.append(FakeMessage(
+                    id=n,
+                    chat_id=chat_id,
+                    sender_id=sender_id,
+                    sender=FakeSender(sender_id, "Я" if out else f"Person{sender_id}"),
+                    raw_text=sentence(rng),
+                    date=when.astimezone(timezone.utc),
+                    out=out,
+                    client=self,
+                ))
+            self.messages[chat_id] = msgs
+
+    async def rpc(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    # ── Connection ────────────────────────────────────────────────
+
+    def on(self, event):
+        def register(handler):
+            self.handlers.append((event, handler))
+            return handler
+
+        return register
+
+    async def connect(self):
+        await asyncio.sleep(self.connect_latency)
+
+    async def disconnect(self):
+        pass
+
+    async def is_user_authorized(self) -> bool:
+        return True
+
+    # ── Reads ─────────────────────────────────────────────────────
+
+    async def get_entity(self, chat_id: int):
+        await self.rpc()
+        if chat_id not in self.entities:
+            raise ValueError(f"Could not find the input entity for {chat_id}")
+        return self.entities[chat_id]
+
+    async def iter_dialogs(self, limit: int | None = None):
+        await self.rpc()
+        dialogs = sorted(
+            (
+                FakeDialog(
+                    id=chat_id,
+                    name=getattr(entity, "title", None) or entity.first_name,
+                    entity=entity,
+                    date=self.messages[chat_id][-1].date if self.messages[chat_id] else None,
+                    is_user=chat_id > 0,
+                    is_group=chat_id < 0,
+                )
+                for chat_id, entity in self.entities.items()
+            ),
+            key=lambda d: d.date or datetime.min.replace(tzinfo=timezone.utc),
+            reverse=True,
+        )
+        for dialog in dialogs[:limit]:
+            yield dialog
+
+    async def iter_messages(
+        self, entity, limit: int | None = None, offset_date: datetime | None = None,
+        min_id: int = 0, max_id: int = 0,
+    ):
+        chat_id = entity if isinstance(entity, int) else next(
+            cid for cid, e in self.entities.items() if e is entity
+        )
+        count = 0
+        for i, msg in enumerate(reversed(self.messages.get(chat_id, []))):
+            if i % 100 == 0:
+                await self.rpc()  # Telethon читает историю страницами по 100
+            if offset_date and msg.date >= offset_date:
+                continue
+            if max_id and msg.id >= max_id:
+                continue
+            if msg.id <= min_id or (limit is not None and count >= limit):
+                return
+            count += 1
+            yield msg
+
+    async def get_messages(self, entity, limit: int | None = None) -> list[FakeMessage]:
+        return [m async for m in self.iter_messages(entity, limit=limit)]
+
+    # ── Sends ─────────────────────────────────────────────────────
+
+    async def send_message(self, entity, text: str, **kwargs) -> FakeMessage:
+        await self.rpc()
+        self.sent.append((entity, text))
+        chat_id = entity if isinstance(entity, int) else settings.my_user_id
+        return FakeMessage(
+            id=next(self._ids), chat_id=chat_id, sender_id=settings.my_user_id, sender=None,
+            raw_text=text, date=datetime.now(timezone.utc), out=True, client=self,
+        )
+
+    def event(
+        self, chat_id: int, text: str, sender_id: int | None = None, reply_to: FakeMessage | None = None,
+    ) -> FakeEvent:
+        """A new incoming message in `chat_id`, as the update handler would receive it."""
+        sender_id = sender_id or (chat_id if chat_id > 0 else 3000)
+        return FakeEvent(
+            id=next(self._ids),
+            chat_id=chat_id,
+            sender_id=sender_id,
+            sender=FakeSender(sender_id, f"Person{sender_id}"),
+            raw_text=text,
+            date=datetime.now(timezone.utc),
+            client=self,
+            chat=self.entities.get(chat_id),
+            reply_to=reply_to,
+        )
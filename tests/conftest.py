@@ -0,0 +1,6 @@
+import os
+
+# app.config требует учётные данные Telegram — тестам хватает заглушек
+os.environ.setdefault("API_ID", "1")
+os.environ.setdefault("API_HASH", "test")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
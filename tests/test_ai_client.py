@@ -0,0 +1,68 @@
+from types import SimpleNamespace as NS
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import ai_client
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "llm_cache_enabled", False)
+    monkeypatch.setattr(ai_client, "backoff_delay", lambda attempt: 0)
+    return ai_client.AIClient()
+
+
+def chunk(text=None, finish_reason=None, usage=None):
+    choices = [NS(finish_reason=finish_reason, delta=NS(content=text))] if text or finish_reason else []
+    return NS(usage=usage, choices=choices)
+
+
+def serve(client, *attempts):
+    """Make chat.completions.create stream `attempts` in turn (an exception item is raised mid-stream)."""
+    calls = []
+
+    async def create(**kwargs):
+        items = attempts[len(calls)]
+        calls.append(kwargs)
+
+        async def stream():
+            for item in items:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+
+        return stream()
+
+    client._client = NS(chat=NS(completions=NS(create=create)))
+    return calls
+
+
+async def collect(client) -> list[tuple[str, int]]:
+    return [(delta, client._concurrency.in_flight) async for delta in client.stream("hi", max_tokens=50)]
+
+
+async def test_stream_holds_slot_until_consumed(client):
+    usage = NS(prompt_tokens=3, completion_tokens=2)
+    serve(client, [chunk("a"), chunk("b"), chunk(finish_reason="stop"), chunk(usage=usage)])
+
+    assert await collect(client) == [("a", 1), ("b", 1)]
+    assert client._concurrency.in_flight == 0
+    assert client.usage_stats()["completion_tokens"] == 2
+
+
+async def test_stream_retries_failure_before_first_delta(client):
+    calls = serve(client, [httpx.ReadError("reset")], [chunk("ok"), chunk(finish_reason="stop")])
+
+    assert await collect(client) == [("ok", 1)]
+    assert len(calls) == 2
+
+
+async def test_stream_raises_failure_after_first_delta(client):
+    calls = serve(client, [chunk("a"), httpx.RemoteProtocolError("closed")], [chunk("a")])
+
+    with pytest.raises(httpx.RemoteProtocolError):
+        await collect(client)
+    assert len(calls) == 1
+    assert client._concurrency.in_flight == 0
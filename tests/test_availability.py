@@ -0,0 +1,62 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from app.availability import AvailabilityGrid, parse_busy_intervals
+
+TZ = ZoneInfo("Europe/Moscow")
+MONDAY = date(2026, 2, 16)
+TUESDAY = date(2026, 2, 17)
+
+
+def at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime(day.year, day.month, day.day, hour, minute)
+
+
+def test_parse_busy_intervals_skips_free_and_broken_slots():
+    slots = [
+        {"DATE_FROM": "16.02.2026 10:00:00", "DATE_TO": "16.02.2026 11:00:00"},
+        {"DATE_FROM": "16.02.2026 12:00:00", "DATE_TO": "16.02.2026 13:00:00", "ACCESSIBILITY": "free"},
+        {"DATE_FROM": "garbage", "DATE_TO": "16.02.2026 13:00:00"},
+        {
+            "DATE_FROM": "16.02.2026 15:00:00", "DATE_TO": "16.02.2026 16:00:00",
+            "~USER_OFFSET_FROM": "3600", "~USER_OFFSET_TO": "3600",
+        },
+    ]
+    assert parse_busy_intervals(slots) == [
+        (at(MONDAY, 10), at(MONDAY, 11)),
+        (at(MONDAY, 14), at(MONDAY, 15)),
+    ]
+
+
+def test_common_free_is_the_gap_shared_by_everyone():
+    grid = AvailabilityGrid([MONDAY], TZ, work_start=9, work_end=18)
+    busy = {
+        1: [(at(MONDAY, 9), at(MONDAY, 12))],
+        2: [(at(MONDAY, 11), at(MONDAY, 13)), (at(MONDAY, 15), at(MONDAY, 18))],
+    }
+    assert grid.common_free(busy, min_minutes=30) == {MONDAY: [(at(MONDAY, 13), at(MONDAY, 15))]}
+
+
+def test_short_gaps_are_filtered_out():
+    grid = AvailabilityGrid([MONDAY], TZ, work_start=9, work_end=11)
+    busy = {1: [(at(MONDAY, 9, 20), at(MONDAY, 10, 30))]}
+    assert grid.common_free(busy, min_minutes=30) == {MONDAY: [(at(MONDAY, 10, 30), at(MONDAY, 11))]}
+
+
+def test_not_before_hides_past_time():
+    grid = AvailabilityGrid([MONDAY, TUESDAY], TZ, work_start=9, work_end=18)
+    free = grid.common_free({1: []}, not_before=at(MONDAY, 17, 45))
+    assert free == {MONDAY: [], TUESDAY: [(at(TUESDAY, 9), at(TUESDAY, 18))]}
+
+
+def test_working_hours_follow_each_users_timezone():
+    grid = AvailabilityGrid([MONDAY], TZ, work_start=9, work_end=18)
+    # 09:00–18:00 в Екатеринбурге (UTC+5) — 07:00–16:00 по Москве
+    free = grid.common_free({1: [], 2: []}, user_tz={2: ZoneInfo("Asia/Yekaterinburg")})
+    assert free == {MONDAY: [(at(MONDAY, 9), at(MONDAY, 16))]}
+
+
+def test_busy_intervals_outside_the_horizon_are_clipped():
+    grid = AvailabilityGrid([MONDAY], TZ)
+    row = grid.busy_row([(datetime(2026, 2, 15, 22), at(MONDAY, 1)), (at(MONDAY, 23), datetime(2026, 2, 17, 2))])
+    assert row.sum() == 60 + 60
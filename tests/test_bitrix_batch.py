@@ -0,0 +1,84 @@
+import asyncio
+from urllib.parse import parse_qsl
+
+import pytest
+
+from app.config import settings
+from app.services import bitrix_client
+from app.services.bitrix_client import BATCH_LIMIT, BitrixClient, _encode_query
+
+
+@pytest.fixture
+async def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(bitrix_client, "EMAIL_GUESTS_FILE", tmp_path / "guests.json")
+    monkeypatch.setattr(settings, "bitrix_batching", True)
+    monkeypatch.setattr(settings, "bitrix_batch_window", 0.01)
+    client = BitrixClient()
+    client.sent = []
+
+    async def send(method, params=None):
+        client.sent.append((method, params))
+        if method != "batch":
+            return {"result": {"method": method}}
+        results, errors = {}, {}
+        for key, command in params["cmd"].items():
+            method, _, query = command.partition("?")
+            if method == "fail":
+                errors[key] = {"error": "ERROR_CORE", "error_description": "nope"}
+            else:
+                results[key] = dict(parse_qsl(query))
+        return {"result": {"result": results, "result_error": errors, "result_total": {"c0": 7}}}
+
+    client._send = send
+    yield client
+    await client.close()
+
+
+def test_encode_query_matches_php_http_build_query():
+    query = _encode_query({"filter": {">ID": 5}, "users": [1, 2], "halt": False, "x": None})
+    assert parse_qsl(query, keep_blank_values=True) == [
+        ("filter[>ID]", "5"), ("users[0]", "1"), ("users[1]", "2"), ("halt", "0"), ("x", ""),
+    ]
+
+
+async def test_concurrent_calls_share_one_batch(client):
+    results = await asyncio.gather(*(client._request("user.get", {"ID": i}) for i in range(3)))
+
+    assert [m for m, _ in client.sent] == ["batch"]
+    assert [r["result"] for r in results] == [{"ID": "0"}, {"ID": "1"}, {"ID": "2"}]
+    assert results[0]["total"] == 7
+
+
+async def test_single_call_is_sent_without_batch(client):
+    result = await client._request("profile")
+
+    assert client.sent == [("profile", None)]
+    assert result == {"result": {"method": "profile"}}
+
+
+async def test_command_error_fails_only_its_caller(client):
+    ok, failed = await asyncio.gather(
+        client._request("user.get", {"ID": 1}), client._request("fail"), return_exceptions=True
+    )
+
+    assert ok["result"] == {"ID": "1"}
+    assert isinstance(failed, RuntimeError) and "ERROR_CORE" in str(failed)
+
+
+async def test_calls_over_the_limit_are_split(client):
+    await asyncio.gather(*(client._request("user.get", {"ID": i}) for i in range(BATCH_LIMIT + 1)))
+
+    sizes = [len(params["cmd"]) if method == "batch" else 1 for method, params in client.sent]
+    assert sorted(sizes) == [1, BATCH_LIMIT]
+    assert not client._flush_tasks
+
+
+async def test_transport_failure_fails_every_caller(client):
+    async def down(method, params=None):
+        raise RuntimeError("connection refused")
+
+    client._send = down
+    results = await asyncio.gather(
+        *(client._request("user.get", {"ID": i}) for i in range(2)), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
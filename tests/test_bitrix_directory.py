@@ -0,0 +1,43 @@
+from app.services.bitrix_directory import NICKNAME_FIELD, BitrixDirectory
+from benchmarks.fakes import SyntheticBitrix
+
+
+def make_request(portal: SyntheticBitrix, calls: list):
+    async def request(method, params=None):
+        calls.append((method, params))
+        return portal.call(method, params or {})
+
+    return request
+
+
+async def test_refresh_rereads_only_changed_users(tmp_path):
+    portal = SyntheticBitrix(users=120)
+    calls = []
+    request = make_request(portal, calls)
+    directory = BitrixDirectory(tmp_path / "users.json")
+    await directory.refresh(request, full_sync_interval=3600)
+    assert len(directory) == 120
+
+    # ник переименован на портале: TIMESTAMP_X свежее последней синхронизации
+    portal.users[4][NICKNAME_FIELD] = "renamed"
+    portal.users[4]["TIMESTAMP_X"] = "2099-01-01T00:00:00+00:00"
+    calls.clear()
+    await directory.refresh(request, full_sync_interval=3600)
+
+    assert len(calls) == 1
+    assert list(calls[0][1]["filter"]) == [">TIMESTAMP_X"]
+    assert directory.find_by_nickname("user5") is None
+    assert directory.find_by_nickname("@Renamed")["id"] == 5
+
+
+async def test_sync_time_survives_restart(tmp_path):
+    portal = SyntheticBitrix(users=10)
+    calls = []
+    request = make_request(portal, calls)
+    await BitrixDirectory(tmp_path / "users.json").refresh(request, full_sync_interval=3600)
+
+    calls.clear()
+    await BitrixDirectory(tmp_path / "users.json").refresh(request, full_sync_interval=3600)
+
+    # после рестарта — инкрементальная выборка, а не полный скан
+    assert list(calls[0][1]["filter"]) == [">TIMESTAMP_X"]
@@ -0,0 +1,69 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.message_store import MessageStore
+
+NOW = datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = MessageStore(tmp_path / "messages.db")
+    yield store
+    store.close()
+
+
+def committed(path) -> list[tuple]:
+    """Rows visible to another connection, i.e. already committed."""
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT chat_id, msg_id, text FROM messages ORDER BY chat_id, msg_id").fetchall()
+
+
+def test_live_messages_are_committed_by_flush(store, tmp_path):
+    store.add(1, 10, 5, "Ann", "hello", NOW)
+    store.mark_handled(1, 11)
+
+    # читается сразу, на диск — только после flush
+    assert [m["text"] for m in store.get_recent(1)] == ["hello"]
+    assert committed(tmp_path / "messages.db") == []
+
+    store.flush()
+    assert committed(tmp_path / "messages.db") == [(1, 10, "hello")]
+    assert store.handled_marks() == {1: 11}
+
+
+def test_edit_and_delete(store):
+    store.add(1, 10, 5, "Ann", "hello", NOW)
+    store.add(1, 11, 5, "Ann", "typo", NOW)
+    store.add(-1001234567890, 11, 5, "Ann", "channel post", NOW)
+
+    store.edit(1, 10, "hello, world")
+    store.edit(1, 99, "not stored")
+    assert [m["text"] for m in store.get_recent(1)] == ["hello, world", "typo"]
+
+    # без чата — только личные чаты и обычные группы, не каналы
+    store.delete(None, [11])
+    assert [m["text"] for m in store.get_recent(1)] == ["hello, world"]
+    assert [m["text"] for m in store.get_recent(-1001234567890)] == ["channel post"]
+
+    store.delete(-1001234567890, [11])
+    store.edit(1, 10, "")
+    assert store.get_recent(-1001234567890) == store.get_recent(1) == []
+
+
+def test_prune_drops_old_messages_and_coverage(store):
+    old, recent = NOW - timedelta(days=10), NOW - timedelta(hours=1)
+    store.add(1, 1, 5, "Ann", "old", old)
+    store.add(1, 2, 5, "Ann", "recent", recent)
+    store.mark_covered(1, old - timedelta(hours=1))
+    store.save_checkpoint(1, old.date(), 1, "old summary")
+    assert store.covers(1, old)
+
+    store.prune(NOW - timedelta(days=7))
+
+    assert [m["text"] for m in store.get_recent(1)] == ["recent"]
+    assert store.get_checkpoint(1, old.date()) is None
+    assert not store.covers(1, old)
+    assert store.covers(1, recent)
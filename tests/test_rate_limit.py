@@ -0,0 +1,78 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from app.services.rate_limit import AdaptiveConcurrency, TokenBucket, backoff_delay, retry_after_seconds
+
+
+async def test_token_bucket_serves_burst_then_waits_for_refill():
+    bucket = TokenBucket(rate_per_minute=600, capacity=2)  # 10 в секунду
+    started = time.monotonic()
+    await bucket.acquire()
+    await bucket.acquire()
+    assert time.monotonic() - started < 0.05
+    await bucket.acquire()
+    assert time.monotonic() - started >= 0.08
+
+
+async def test_token_bucket_clamps_oversized_requests():
+    bucket = TokenBucket(rate_per_minute=60, capacity=5)
+    await asyncio.wait_for(bucket.acquire(100), timeout=0.1)
+
+
+async def test_adaptive_concurrency_limits_in_flight():
+    limiter = AdaptiveConcurrency(initial=2, minimum=1, maximum=4)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        async with limiter:
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(job() for _ in range(6)))
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+def test_adaptive_concurrency_aimd():
+    limiter = AdaptiveConcurrency(initial=4, minimum=1, maximum=5)
+    for _ in range(5):  # +1/limit за успешный вызов — около +1 за `limit` вызовов
+        limiter.on_success()
+    assert limiter.limit == 5
+    for _ in range(20):
+        limiter.on_success()
+    assert limiter.limit == 5
+    limiter.on_throttle()
+    assert limiter.limit == 2
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.limit == 1
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, cap=5) <= 5 for attempt in range(20))
+
+
+@pytest.mark.parametrize(
+    ("headers", "expected"),
+    [
+        (None, None),
+        ({}, None),
+        ({"retry-after-ms": "1500"}, 1.5),
+        ({"retry-after": "7"}, 7.0),
+        ({"x-ratelimit-reset-requests": "1m30s", "x-ratelimit-reset-tokens": "250ms"}, 90.0),
+        ({"retry-after": "soon"}, None),
+    ],
+)
+def test_retry_after_seconds(headers, expected):
+    assert retry_after_seconds(headers) == expected
+
+
+def test_retry_after_http_date():
+    at = datetime.now(timezone.utc) + timedelta(seconds=30)
+    delay = retry_after_seconds({"retry-after": format_datetime(at, usegmt=True)})
+    assert 28 <= delay <= 30
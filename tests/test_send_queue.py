@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+import pytest
+from telethon.errors import FloodWaitError
+
+from app.config import settings
+from app.services.send_queue import BULK, INTERACTIVE, SendQueue
+
+
+@pytest.fixture
+async def queue(monkeypatch):
+    monkeypatch.setattr(settings, "telegram_send_per_second", 1000)
+    monkeypatch.setattr(settings, "telegram_peer_interval", 0.05)
+    monkeypatch.setattr(settings, "telegram_group_interval", 0.1)
+    monkeypatch.setattr(settings, "telegram_max_flood_wait", 5)
+    queue = SendQueue()
+    yield queue
+    await queue.close()
+
+
+def recorder(log: list, name: str, result=None):
+    async def send():
+        log.append((name, time.monotonic()))
+        return result
+    return send
+
+
+async def test_interactive_jumps_ahead_of_bulk(queue):
+    log = []
+    block = asyncio.Event()
+
+    async def first():
+        await block.wait()
+
+    busy = asyncio.create_task(queue.submit(1, first))
+    await asyncio.sleep(0)
+    pending = [
+        asyncio.create_task(queue.submit(1, recorder(log, "bulk"), priority=BULK)),
+        asyncio.create_task(queue.submit(1, recorder(log, "interactive"), priority=INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    block.set()
+    await asyncio.gather(busy, *pending)
+    assert [name for name, _ in log] == ["interactive", "bulk"]
+
+
+async def test_sends_to_one_peer_are_spaced(queue):
+    log = []
+    results = await asyncio.gather(*(queue.submit(1, recorder(log, n, result=n)) for n in range(3)))
+    assert results == [0, 1, 2]
+    gaps = [b - a for (_, a), (_, b) in zip(log, log[1:])]
+    assert all(gap >= 0.045 for gap in gaps)
+
+
+async def test_groups_are_spaced_wider_and_peers_do_not_wait_for_each_other(queue):
+    log = []
+    await asyncio.gather(
+        queue.submit(-100, recorder(log, "group")),
+        queue.submit(-100, recorder(log, "group")),
+        queue.submit(2, recorder(log, "user")),
+    )
+    times = {name: [t for n, t in log if n == name] for name in ("group", "user")}
+    assert times["group"][1] - times["group"][0] >= 0.095
+    assert times["user"][0] < times["group"][1]
+
+
+async def test_flood_wait_reschedules_the_send(queue):
+    attempts = []
+
+    async def send():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise FloodWaitError(request=None, capture=1)
+        return "sent"
+
+    assert await queue.submit(1, send) == "sent"
+    assert attempts[1] - attempts[0] >= 0.95
+
+
+async def test_long_flood_wait_fails_the_caller(queue):
+    async def send():
+        raise FloodWaitError(request=None, capture=60)
+
+    with pytest.raises(FloodWaitError):
+        await queue.submit(1, send)
+    assert queue.stats()["queued"] == 0
+
+
+async def test_errors_reach_the_caller(queue):
+    async def send():
+        raise ValueError("bad peer")
+
+    with pytest.raises(ValueError):
+        await queue.submit(1, send)
+    assert await queue.submit(1, recorder([], "next", result="ok")) == "ok"
@@ -0,0 +1,12 @@
+from app import summarizer
+
+
+async def test_nothing_left_after_compaction_skips_the_model(monkeypatch):
+    async def no_model(*args, **kwargs):
+        raise AssertionError("the model must not be called")
+
+    monkeypatch.setattr(summarizer, "_complete", no_model)
+    msgs = [{"id": 1, "sender": "Анна", "text": "👍", "date": "2026-02-16T10:00:00+00:00"}]
+
+    assert await summarizer._summarize_messages(msgs) == summarizer.NOTHING_TO_SUMMARIZE
+    assert await summarizer._summarize_messages(msgs, empty="прежний итог") == "прежний итог"
@@ -0,0 +1,94 @@
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.config import settings
+from app.transcript import CompactionReport, _aliases, compact_transcript, is_noise, shorten_urls
+
+UTC = ZoneInfo("UTC")
+
+
+@pytest.fixture(autouse=True)
+def transcript_settings(monkeypatch):
+    monkeypatch.setattr(settings, "transcript_group_minutes", 10)
+    monkeypatch.setattr(settings, "transcript_alias_min_length", 12)
+    monkeypatch.setattr(settings, "transcript_url_max_length", 40)
+
+
+def msg(sender: str, text: str, at: str, day: str = "2026-02-16") -> dict:
+    return {"sender": sender, "text": text, "date": f"{day}T{at}:00+00:00"}
+
+
+def test_shorten_urls_keeps_short_ones():
+    text = "см. https://a.io/x и https://www.example.com/very/long/path/to/some/document?id=123456"
+    assert shorten_urls(text, 40) == "см. https://a.io/x и example.com/…"
+
+
+@pytest.mark.parametrize(("text", "noise"), [("👍", True), ("!!!", True), ("ок", False), ("+1", False)])
+def test_is_noise(text, noise):
+    assert is_noise(text) is noise
+
+
+def test_aliases_only_for_long_repeated_names():
+    names = ["Константин Петров", "Константин Петров", "Анна", "Анна", "Екатерина Смирнова"]
+    assert _aliases(names, min_length=12) == {"Константин Петров": "КП"}
+
+
+def test_aliases_do_not_collide_with_real_names():
+    names = ["Иван Петров-Сидоров"] * 2 + ["ИП"]
+    assert _aliases(names, min_length=12) == {"Иван Петров-Сидоров": "ИП2"}
+
+
+def test_consecutive_messages_share_a_block():
+    compact = compact_transcript(
+        [msg("Анна", "привет", "10:00"), msg("Анна", "есть минута?", "10:05"), msg("Анна", "ау", "10:30")],
+        UTC,
+    )
+    assert compact.blocks == ["10:00 Анна: привет\nесть минута?", "10:30 Анна: ау"]
+
+
+def test_noise_and_double_sends_are_dropped_but_later_repeats_kept():
+    compact = compact_transcript(
+        [
+            msg("Анна", "да", "10:00"),
+            msg("Анна", "да", "10:01"),
+            msg("Борис", "а завтра?", "10:20"),
+            msg("Анна", "да", "10:40"),
+            msg("Анна", "🔥", "10:41"),
+            msg("Анна", "", "10:42"),
+        ],
+        UTC,
+    )
+    assert compact.blocks == ["10:00 Анна: да", "10:20 Борис: а завтра?", "10:40 Анна: да"]
+    assert compact.dropped == 3
+
+
+def test_legend_and_day_lines():
+    long_name = "Константин Петров"
+    compact = compact_transcript(
+        [
+            msg(long_name, "начнём", "18:00"),
+            msg("Анна", "ок", "18:05"),
+            msg(long_name, "продолжим", "09:00", day="2026-02-17"),
+        ],
+        UTC,
+    )
+    assert compact.legend.startswith("Сокращения имён") and "КП — Константин Петров" in compact.legend
+    assert compact.blocks[0] == "— 16.02 —\n18:00 КП: начнём"
+    assert compact.blocks[2] == "— 17.02 —\n09:00 КП: продолжим"
+
+
+def test_all_noise_gives_no_blocks():
+    compact = compact_transcript([msg("Анна", "👍", "10:00")], UTC)
+    assert compact.blocks == [] and compact.legend == ""
+
+
+def test_compaction_report_totals():
+    report = CompactionReport()
+    report.record(1, messages=10, raw_tokens=200, tokens=150, dropped=2)
+    report.record(None, messages=5, raw_tokens=100, tokens=100, dropped=0)
+    snapshot = report.snapshot()
+    assert snapshot["total"]["saved_pct"] == pytest.approx(16.7)
+    assert snapshot["chats"] == {
+        "1": {"messages": 10, "dropped_messages": 2, "raw_tokens": 200, "tokens": 150, "saved_pct": 25.0}
+    }
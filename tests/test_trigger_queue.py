@@ -0,0 +1,81 @@
+import asyncio
+
+from app.triggers.queue import ChatTaskQueue
+
+
+async def drain(queue: ChatTaskQueue):
+    while queue.stats()["pending"] or queue.stats()["running"]:
+        await asyncio.sleep(0)
+
+
+async def test_jobs_of_one_chat_run_in_order():
+    queue = ChatTaskQueue(max_workers=4, max_depth=10, max_total=100)
+    order = []
+
+    def job(n):
+        async def run():
+            await asyncio.sleep(0.01 if n == 0 else 0)
+            order.append(n)
+        return run
+
+    for n in range(3):
+        assert queue.submit(1, "t", job(n))
+    await drain(queue)
+    assert order == [0, 1, 2]
+
+
+async def test_chats_run_concurrently_within_worker_limit():
+    queue = ChatTaskQueue(max_workers=2, max_depth=10, max_total=100)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        peak = max(peak, queue.stats()["running"])
+        await asyncio.sleep(0.01)
+
+    for chat_id in range(5):
+        queue.submit(chat_id, "t", job)
+    await drain(queue)
+    assert peak == 2
+
+
+async def test_full_chat_queue_and_backlog_reject():
+    queue = ChatTaskQueue(max_workers=1, max_depth=2, max_total=3)
+    release = asyncio.Event()
+
+    async def job():
+        await release.wait()
+
+    assert queue.submit(1, "t", job)
+    assert queue.submit(1, "t", job)
+    assert not queue.submit(1, "t", job)  # очередь чата полна
+    assert queue.submit(2, "t", job)
+    assert not queue.submit(3, "t", job)  # общий бэклог полон
+    assert queue.dropped == 2
+
+    release.set()
+    await drain(queue)
+    assert queue.stats() == {"running": 0, "pending": 0, "dropped": 2, "chats": {}}
+
+
+async def test_failing_job_does_not_stop_the_chat():
+    queue = ChatTaskQueue(max_workers=1, max_depth=10, max_total=10)
+    done = []
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def ok():
+        done.append(True)
+
+    queue.submit(1, "fail", fail)
+    queue.submit(1, "ok", ok)
+    await drain(queue)
+    assert done == [True]
+
+
+async def test_close_cancels_workers():
+    queue = ChatTaskQueue(max_workers=1, max_depth=10, max_total=10)
+    queue.submit(1, "t", lambda: asyncio.sleep(10))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(queue.close(), timeout=1)
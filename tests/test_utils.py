@@ -0,0 +1,24 @@
+import pytest
+
+from app.utils import parse_find_time_options
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Найди время @a @b", (None, None, None)),
+    ("Найди время @a @b на 2 недели первый слот 90 минут", (10, 90, 1)),
+    ("Найди время @a на неделю", (5, None, None)),
+    ("Найди время @a на месяц", (21, None, None)),
+    ("Найди время @a на 3 дня", (3, None, None)),
+    ("Найди время @a на 10 рабочих дней", (10, None, None)),
+    ("Найди время @a на день", (1, None, None)),
+    ("Найди время @a первые 3 слота по 1,5 часа", (None, 90, 3)),
+    # "на днях" — не горизонт
+    ("Найди время @a на днях", (None, None, None)),
+    ("Найди время @a на днях на 2 часа", (None, 120, None)),
+    # "на час" — длительность, а не горизонт
+    ("Найди время @a на час", (None, 60, None)),
+    ("Найди время @a на полчаса на неделю", (5, 30, None)),
+    ("Найди время @a на часок", (None, None, None)),
+])
+def test_parse_find_time_options(text, expected):
+    assert parse_find_time_options(text) == expected